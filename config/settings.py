@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -67,6 +68,26 @@ DATABASES = {
 }
 
 
+# Cache
+# Em arquivo para ser compartilhado entre os workers (cotações, IPCA...)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Testes não leem nem escrevem no cache real (páginas, disjuntores...)
+# Banco de teste em arquivo: os testes de concorrência entre processos
+# (fork) precisam enxergar as mesmas tabelas (travas)
+if len(sys.argv) > 1 and sys.argv[1] == 'test':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -120,6 +141,27 @@ USE_THOUSAND_SEPARATOR = True
 DECIMAL_SEPARATOR = ','
 THOUSAND_SEPARATOR = '.'
 
+# Datas oficiais de divulgação do IPCA (IBGE), opcional: {"2026-10": "2026-11-10"}
+# Sem a data, considera-se o dia 10 do mês seguinte à competência
+IPCA_CALENDARIO_DIVULGACAO = {}
+
+# API de séries temporais do BCB (SGS); nos testes aponta para um servidor local
+BCB_SGS_URL = config('BCB_SGS_URL', default='https://api.bcb.gov.br/dados/serie')
+
+# Histórico diário de preços (um arquivo binário por ticker, lido via memmap)
+HISTORICO_PRECOS_DIR = config('HISTORICO_PRECOS_DIR', default=str(BASE_DIR / 'dados' / 'historico_precos'))
+
+# Threads por processo que executam a fila de valuations (services.fila_valuation)
+VALUATION_WORKERS = config('VALUATION_WORKERS', default=2, cast=int)
+
+# Cache das respostas da OpenAI (services.cache_llm): 'normal', 'replay'
+# (só serve do cache, sem rede: testes/benchmarks) ou 'desligado'
+LLM_CACHE_MODO = config('LLM_CACHE_MODO', default='normal')
+
+# Limite de boot do worker (django.setup + URLs) e do import de cada app,
+# verificado por 'manage.py startup_profile --verificar'
+ORCAMENTO_INICIALIZACAO = {'segundos': 2.0, 'memoria_mb': 150}
+
 CSRF_TRUSTED_ORIGINS = [
     'https://*.ngrok-free.dev',   # é o domínio que o seu túnel está usando
 ]
\ No newline at end of file
@@ -1,3 +1,36 @@
+import threading
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from dashboard import views
+from investments.models import PlanejamentoMensal
+
+
+class DashboardPrazoTest(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user('investidor', password='senha')
+        self.client.force_login(self.usuario)
+        PlanejamentoMensal.objects.create(
+            usuario=self.usuario, valor_planejado=Decimal('1000.00'), valor_corrigido=Decimal('1050.00'),
+        )
+
+    def test_planejamento_atrasado_usa_ultimo_valor_e_sinaliza(self):
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+
+        def calcular_lento(planejamento):
+            # Altera a instância antes de terminar, como o cálculo real
+            planejamento.valor_corrigido = Decimal('999.00')
+            liberar.wait(5)
+            return 999.0
+
+        with mock.patch.object(views, 'PRAZO_CHAMADAS_EXTERNAS', 0.05), \
+                mock.patch.object(PlanejamentoMensal, 'calcular_valor_corrigido', calcular_lento):
+            response = self.client.get('/')
+
+        self.assertEqual(response.context['dados_atrasados'], ['planejamento'])
+        self.assertEqual(response.context['proximo_valor'], 1050.0)
+        self.assertContains(response, 'exibindo os últimos valores conhecidos do planejamento')
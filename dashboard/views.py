@@ -2,13 +2,19 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.core.serializers.json import DjangoJSONEncoder
 from investments.models import Aporte, Lancamento, PlanejamentoMensal
+from investments.services.concorrencia import executar_com_prazo
+from investments.services.cotacoes import cotacoes_atuais, cotacoes_em_cache, obter_cotacoes
 from datetime import datetime
 from decimal import Decimal
 from collections import defaultdict
-import requests
+import copy
 import json
 
 
+# Prazo total (segundos) para as chamadas externas da página (BCB, brapi)
+PRAZO_CHAMADAS_EXTERNAS = 0.8
+
+
 class DecimalEncoder(DjangoJSONEncoder):
     """Encoder que converte Decimal para float para JSON"""
     def default(self, obj):
@@ -44,6 +50,32 @@ def dashboard(request):
     maior_lancamento = max((float(l.total) for l in lancamentos.filter(tipo_operacao='COMPRA')), default=0)
     maior_aporte = max(maior_aporte_antigo, maior_lancamento)
     
+    # ====== CHAMADAS EXTERNAS EM PARALELO, COM PRAZO ÚNICO ======
+    # O que não responder a tempo usa o último valor conhecido e é sinalizado
+    carteira = consolidar_posicoes(request.user) if qtd_aportes > 0 else {}
+    tickers = [pos['ticker'] for pos in carteira.values() if pos['ticker']]
+    tarefas, fallbacks = {}, {}
+    
+    # Cotações vêm da tabela CotacaoAtual (atualizar_cotacoes); só o que
+    # faltar nela vai para a rede
+    cotacoes = cotacoes_atuais(tickers)
+    tickers = [t for t in tickers if t.upper() not in cotacoes]
+    
+    if planejamento:
+        # A tarefa atrasada continua rodando depois do prazo: trabalha numa
+        # cópia e o fallback usa o valor lido antes de submeter
+        valor_conhecido = float(planejamento.valor_corrigido or planejamento.valor_planejado)
+        tarefas['planejamento'] = copy.copy(planejamento).calcular_valor_corrigido
+        fallbacks['planejamento'] = lambda: valor_conhecido
+    if tickers:
+        tipos = {pos['ticker']: pos['tipo_ativo'] for pos in carteira.values()}
+        tarefas['cotacoes'] = lambda: obter_cotacoes(tickers, fonte='brapi', tipos=tipos)
+        fallbacks['cotacoes'] = lambda: cotacoes_em_cache(tickers, fonte='brapi')
+    
+    externos, dados_atrasados = executar_com_prazo(tarefas, PRAZO_CHAMADAS_EXTERNAS, fallbacks)
+    cotacoes.update(externos.get('cotacoes') or {})
+    aplicar_cotacoes(carteira, cotacoes)
+    
     # ====== PRÓXIMO APORTE SUGERIDO (NOVO) ======
     proximo_valor = None
     proximo_mensagem = None
@@ -52,7 +84,7 @@ def dashboard(request):
     if planejamento:
         # Usar valor corrigido do planejamento
         valor_planejado_base = float(planejamento.valor_planejado)
-        proximo_valor = planejamento.calcular_valor_corrigido()
+        proximo_valor = externos['planejamento']
     else:
         # Se não tem planejamento, sugerir criar um
         proximo_mensagem = "Configure seu planejamento mensal de aportes!"
@@ -86,9 +118,6 @@ def dashboard(request):
         projecao_moderado = calcular_projecao(total_investido, aporte_mensal, meses_projecao, 0.12)
         projecao_agressivo = calcular_projecao(total_investido, aporte_mensal, meses_projecao, 0.14)
 
-        # Consolidar carteira
-        carteira = consolidar_carteira(request.user)
-        
         # Calcular totais da carteira
         total_investido_carteira = sum(float(p['valor_total']) for p in carteira.values())
         total_mercado_carteira = sum(float(p.get('valor_mercado', p['valor_total'])) for p in carteira.values())
@@ -157,6 +186,7 @@ def dashboard(request):
             "rentabilidade": round(rentabilidade, 2),
             # ✅ CORRIGIDO: Usar json.dumps() com DecimalEncoder
             "diversificacao": json.dumps(diversificacao, cls=DecimalEncoder),
+            "dados_atrasados": dados_atrasados,
         }
     else:
         context = {
@@ -181,13 +211,29 @@ def dashboard(request):
             "lucro_total": 0,
             "rentabilidade": 0,
             "diversificacao": json.dumps({}, cls=DecimalEncoder),
+            "dados_atrasados": dados_atrasados,
         }
 
     return render(request, "dashboard/home.html", context)
 
 
 def consolidar_carteira(usuario):
-    """Consolida todas as operações em posições atuais"""
+    """Consolida todas as operações em posições atuais, com cotações atualizadas"""
+    posicoes = consolidar_posicoes(usuario)
+    
+    # Buscar dados atualizados da API (cache compartilhado + poucas requisições em lote)
+    cotacoes = obter_cotacoes(
+        [pos['ticker'] for pos in posicoes.values()],
+        fonte='brapi',
+        tipos={pos['ticker']: pos['tipo_ativo'] for pos in posicoes.values()},
+    )
+    aplicar_cotacoes(posicoes, cotacoes)
+    
+    return posicoes
+
+
+def consolidar_posicoes(usuario):
+    """Consolida todas as operações em posições atuais (só banco, sem cotações)"""
     lancamentos = Lancamento.objects.filter(usuario=usuario).order_by('data')
     
     posicoes = defaultdict(lambda: {
@@ -219,31 +265,31 @@ def consolidar_carteira(usuario):
         posicoes[chave]['ticker'] = lanc.ticker
         posicoes[chave]['nome'] = lanc.nome_ativo
     
-    # Buscar dados atualizados da API
+    # Remover posições zeradas
     for chave, pos in list(posicoes.items()):
         if pos['quantidade'] <= 0:
             del posicoes[chave]
-            continue
-            
-        if pos['ticker']:
-            try:
-                url = f"https://brapi.dev/api/quote/{pos['ticker']}"
-                response = requests.get(url, timeout=3)
-                if response.ok:
-                    data = response.json()
-                    if 'results' in data and len(data['results']) > 0:
-                        resultado = data['results'][0]
-                        pos['logo'] = resultado.get('logourl', '')
-                        pos['preco_atual'] = Decimal(str(resultado.get('regularMarketPrice', 0)))
-                        pos['valor_mercado'] = pos['preco_atual'] * pos['quantidade']
-                        pos['lucro_prejuizo'] = pos['valor_mercado'] - pos['valor_total']
-                        pos['rentabilidade'] = ((pos['valor_mercado'] / pos['valor_total'] - 1) * 100) if pos['valor_total'] > 0 else 0
-            except:
-                pass
     
     return dict(posicoes)
 
 
+def aplicar_cotacoes(posicoes, cotacoes):
+    """Espalha as cotações ({TICKER: resultado brapi}) pelas posições"""
+    for pos in posicoes.values():
+        resultado = cotacoes.get((pos['ticker'] or '').upper())
+        if resultado:
+            aplicar_cotacao(pos, resultado)
+
+
+def aplicar_cotacao(pos, resultado):
+    """Preenche logo, preço atual e campos derivados da posição a partir da cotação da brapi"""
+    pos['logo'] = resultado.get('logourl', '')
+    pos['preco_atual'] = Decimal(str(resultado.get('regularMarketPrice') or 0))
+    pos['valor_mercado'] = pos['preco_atual'] * pos['quantidade']
+    pos['lucro_prejuizo'] = pos['valor_mercado'] - pos['valor_total']
+    pos['rentabilidade'] = ((pos['valor_mercado'] / pos['valor_total'] - 1) * 100) if pos['valor_total'] > 0 else 0
+
+
 def calcular_projecao(saldo_inicial, aporte_mensal, meses, taxa_anual):
     taxa_mensal = (1 + taxa_anual) ** (1/12) - 1
     saldo = Decimal(str(saldo_inicial))
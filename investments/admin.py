@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Aporte, Lancamento, PlanejamentoMensal
+from .models import Aporte, CotacaoAtual, IndiceIPCA, Lancamento, PlanejamentoMensal, RespostaLLM, ValorIndice, ValuationJob, ValuationSnapshot
 
 @admin.register(Aporte)
 class AporteAdmin(admin.ModelAdmin):
@@ -20,8 +20,55 @@ class PlanejamentoMensalAdmin(admin.ModelAdmin):
     list_display = ['usuario', 'valor_planejado', 'data_inicio', 'atualizado_em', 'valor_corrigido_display']
     list_filter = ['data_inicio']
     search_fields = ['usuario__username']
-    readonly_fields = ['data_inicio', 'valor_corrigido_display']
+    readonly_fields = ['data_inicio', 'valor_corrigido_display', 'ultimo_ipca_aplicado']
+    exclude = ['valor_corrigido']
+    list_select_related = ['usuario']
     
     def valor_corrigido_display(self, obj):
-        return f"R$ {obj.calcular_valor_corrigido():.2f}"
+        # Valor materializado: listar N planejamentos não consulta o BCB
+        if obj.valor_corrigido is None:
+            return '-'
+        return f"R$ {obj.valor_corrigido:.2f}"
     valor_corrigido_display.short_description = 'Valor Corrigido Hoje'
+
+
+@admin.register(IndiceIPCA)
+class IndiceIPCAAdmin(admin.ModelAdmin):
+    list_display = ['competencia', 'variacao', 'atualizado_em']
+    date_hierarchy = 'competencia'
+
+
+@admin.register(ValorIndice)
+class ValorIndiceAdmin(admin.ModelAdmin):
+    list_display = ['codigo', 'data', 'valor']
+    list_filter = ['codigo']
+    date_hierarchy = 'data'
+
+
+@admin.register(CotacaoAtual)
+class CotacaoAtualAdmin(admin.ModelAdmin):
+    list_display = ['ticker', 'preco', 'nome', 'atualizado_em']
+    search_fields = ['ticker', 'nome']
+
+
+@admin.register(ValuationSnapshot)
+class ValuationSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['ticker', 'preco', 'fundamentos_em', 'preco_em', 'analise_em', 'noticias_em']
+    search_fields = ['ticker']
+    readonly_fields = ['atualizado_em']
+
+
+@admin.register(ValuationJob)
+class ValuationJobAdmin(admin.ModelAdmin):
+    list_display = ['ticker', 'usuario', 'status', 'fila_no_envio', 'criado_em', 'iniciado_em', 'concluido_em']
+    list_filter = ['status']
+    search_fields = ['ticker', 'usuario__username']
+    readonly_fields = ['criado_em']
+
+
+@admin.register(RespostaLLM)
+class RespostaLLMAdmin(admin.ModelAdmin):
+    list_display = ['chave', 'modelo', 'acessos', 'criado_em', 'expira_em']
+    list_filter = ['modelo']
+    search_fields = ['chave', 'resposta']
+    readonly_fields = ['criado_em']
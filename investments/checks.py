@@ -0,0 +1,34 @@
+"""
+Checagens do sistema (manage.py check)
+- Dependências pesadas (OpenAI, bs4, yfinance/pandas) não podem ser
+  carregadas no boot do worker: só no primeiro uso
+"""
+
+import sys
+
+from django.conf import settings
+from django.core.checks import Warning, register
+from django.urls import get_resolver
+
+
+# Módulos que custam centenas de ms / dezenas de MB e só servem a poucas telas
+MODULOS_PESADOS = ('openai', 'bs4', 'yfinance', 'pandas')
+
+
+def modulos_pesados_carregados():
+    return [m for m in MODULOS_PESADOS if m in sys.modules]
+
+
+@register()
+def verificar_importacoes_pesadas(app_configs, **kwargs):
+    # Carrega as URLs (e com elas todas as views), como faz o worker ao subir
+    get_resolver(settings.ROOT_URLCONF).url_patterns
+
+    return [
+        Warning(
+            f"O módulo '{modulo}' foi importado na inicialização.",
+            hint="Importe-o dentro da função que o usa (ver 'manage.py startup_profile').",
+            id='investments.W001',
+        )
+        for modulo in modulos_pesados_carregados()
+    ]
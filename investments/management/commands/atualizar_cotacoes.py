@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from investments.services.cotacoes import (
+    TICKERS_POR_REQUISICAO,
+    atualizar_cotacoes_atuais,
+    tickers_em_carteira,
+)
+
+
+class Command(BaseCommand):
+    help = 'Atualiza periodicamente a tabela CotacaoAtual com todos os tickers em carteira'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=int, default=60, help='Segundos entre atualizações')
+        parser.add_argument('--uma-vez', action='store_true', help='Atualiza uma vez e sai')
+        parser.add_argument('--tamanho-lote', type=int, default=TICKERS_POR_REQUISICAO,
+                            help='Tickers por requisição à brapi')
+        parser.add_argument('--concorrencia', type=int, default=4, help='Requisições simultâneas')
+
+    def handle(self, *args, **options):
+        while True:
+            inicio = time.monotonic()
+            close_old_connections()
+
+            try:
+                tickers = tickers_em_carteira()
+                gravadas = atualizar_cotacoes_atuais(
+                    tickers,
+                    tamanho_lote=options['tamanho_lote'],
+                    concorrencia=options['concorrencia'],
+                )
+                self.stdout.write(
+                    f"{gravadas}/{len(tickers)} cotação(ões) atualizada(s) "
+                    f"em {time.monotonic() - inicio:.1f}s"
+                )
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"Falha ao atualizar cotações: {e}"))
+
+            if options['uma_vez']:
+                break
+            time.sleep(max(options['intervalo'] - (time.monotonic() - inicio), 1))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from investments.services.screener import atualizar_fundamentos
+
+
+class Command(BaseCommand):
+    help = 'Lê do Investidor10 (só parser, sem IA) os fundamentos vencidos das ações do universo para o screener'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*', help='Tickers (padrão: todas as ações do universo)')
+        parser.add_argument('--concorrencia', type=int, default=4, help='Páginas baixadas ao mesmo tempo')
+
+    def handle(self, *args, **options):
+        tickers = [t.strip().upper() for t in options['tickers']] or None
+        atualizados, falhas = atualizar_fundamentos(tickers, concorrencia=options['concorrencia'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{atualizados} ticker(s) atualizado(s), {falhas} sem dados pelo parser"
+        ))
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from investments.services.historico_precos import atualizar_historico
+
+
+class Command(BaseCommand):
+    help = 'Completa o histórico diário de preços (OHLCV) dos tickers em carteira via yfinance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*', help='Tickers (padrão: todos em carteira)')
+        parser.add_argument('--ate', type=date.fromisoformat, help='Último dia (AAAA-MM-DD); padrão: ontem')
+
+    def handle(self, *args, **options):
+        novos = atualizar_historico(options['tickers'] or None, ate=options['ate'])
+
+        for ticker, quantidade in novos.items():
+            self.stdout.write(f"{ticker}: {quantidade} dia(s) novo(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(novos.values())} registro(s) anexado(s) em {len(novos)} ticker(s)"
+        ))
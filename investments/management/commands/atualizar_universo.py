@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from investments.services.universo import atualizar_universo
+
+
+class Command(BaseCommand):
+    help = 'Baixa a lista completa de ativos da brapi para o autocomplete (rodar 1x por dia)'
+
+    def handle(self, *args, **options):
+        try:
+            snapshot = atualizar_universo()
+        except Exception as e:
+            raise CommandError(f"Falha ao baixar universo de ativos: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(snapshot['ativos'])} ativo(s) gravado(s) (versão {snapshot['versao']})"
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from investments.models import Aporte
+from investments.services.inflacao import TAMANHO_LOTE_CORRECAO, corrigir_aportes_em_lote
+
+
+class Command(BaseCommand):
+    help = 'Recalcula valor_corrigido (IPCA) dos aportes de todos os usuários em lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Corrige apenas os aportes deste username')
+        parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE_CORRECAO,
+                            help='Linhas por UPDATE do bulk_update')
+
+    def handle(self, *args, **options):
+        aportes = Aporte.objects.all()
+        if options['usuario']:
+            aportes = aportes.filter(usuario__username=options['usuario'])
+
+        resultado = corrigir_aportes_em_lote(aportes, tamanho_lote=options['tamanho_lote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['linhas']} aporte(s) corrigido(s) em {resultado['segundos']:.2f}s "
+            f"({resultado['linhas_por_segundo']:.0f} linhas/s)"
+        ))
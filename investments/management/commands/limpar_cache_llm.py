@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from investments.services.cache_llm import limpar
+
+
+class Command(BaseCommand):
+    help = 'Apaga as respostas da OpenAI vencidas do cache (ou todas, com --tudo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tudo', action='store_true', help='Apaga também as respostas dentro da validade')
+
+    def handle(self, *args, **options):
+        apagadas = limpar(tudo=options['tudo'])
+        self.stdout.write(self.style.SUCCESS(f"{apagadas} resposta(s) apagada(s)"))
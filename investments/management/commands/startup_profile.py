@@ -0,0 +1,115 @@
+import json
+import subprocess
+import sys
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from investments.checks import MODULOS_PESADOS
+
+
+# Roda num processo novo: boot do worker (setup + URLs) e, se pedido, o
+# import de todos os módulos de um app. Imprime JSON com tempo e RSS.
+SCRIPT_MEDICAO = r'''
+import importlib, json, os, pkgutil, resource, sys, time
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / 2**20 if sys.platform == 'darwin' else maximo / 2**10
+
+inicio = time.perf_counter()
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+from django.conf import settings
+from django.urls import get_resolver
+get_resolver(settings.ROOT_URLCONF).url_patterns
+boot = time.perf_counter()
+rss_boot = rss_mb()
+
+app = sys.argv[1] if len(sys.argv) > 1 else None
+if app:
+    pacote = importlib.import_module(app)
+    for modulo in pkgutil.walk_packages(pacote.__path__, app + '.'):
+        if '.migrations' in modulo.name or '.tests' in modulo.name:
+            continue
+        importlib.import_module(modulo.name)
+
+print(json.dumps({
+    'boot_segundos': boot - inicio,
+    'boot_mb': rss_boot,
+    'app_segundos': time.perf_counter() - boot,
+    'app_mb': rss_mb() - rss_boot,
+    'pesados': [m for m in MODULOS_PESADOS if m in sys.modules],
+}))
+'''
+
+
+def medir(app=None):
+    """Mede boot (e import completo do app, se informado) num subprocesso."""
+    script = f"MODULOS_PESADOS = {MODULOS_PESADOS!r}\n{SCRIPT_MEDICAO}"
+    saida = subprocess.run(
+        [sys.executable, '-c', script] + ([app] if app else []),
+        cwd=settings.BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = 'Mede tempo de import e memória do boot do worker e de cada app do projeto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='Falha se passar de settings.ORCAMENTO_INICIALIZACAO ou carregar módulo pesado')
+
+    def handle(self, *args, **options):
+        orcamento = settings.ORCAMENTO_INICIALIZACAO
+        projeto = [
+            config.name for config in apps.get_app_configs()
+            if str(config.path).startswith(str(settings.BASE_DIR))
+        ]
+
+        try:
+            boot = medir()
+            por_app = {app: medir(app) for app in projeto}
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"Falha ao medir inicialização:\n{e.stderr}")
+
+        self.stdout.write(f"{'':<14}{'tempo (ms)':>12}{'memória (MB)':>14}  pesados")
+        self.stdout.write(
+            f"{'boot':<14}{boot['boot_segundos'] * 1000:>12.0f}{boot['boot_mb']:>14.1f}  "
+            f"{', '.join(boot['pesados']) or '-'}"
+        )
+        for app, m in por_app.items():
+            self.stdout.write(
+                f"{'+ ' + app:<14}{m['app_segundos'] * 1000:>12.0f}{m['app_mb']:>14.1f}  "
+                f"{', '.join(m['pesados']) or '-'}"
+            )
+
+        if not options['verificar']:
+            return
+
+        problemas = []
+        if boot['pesados']:
+            problemas.append(f"boot carrega módulo(s) pesado(s): {', '.join(boot['pesados'])}")
+        for app, m in {'boot': boot, **por_app}.items():
+            segundos = m['boot_segundos'] + m['app_segundos']
+            memoria = m['boot_mb'] + m['app_mb']
+            if segundos > orcamento['segundos']:
+                problemas.append(f"{app}: {segundos:.2f}s (limite {orcamento['segundos']}s)")
+            if memoria > orcamento['memoria_mb']:
+                problemas.append(f"{app}: {memoria:.0f} MB (limite {orcamento['memoria_mb']} MB)")
+            if m['pesados'] and app != 'boot':
+                problemas.append(f"{app}: import carrega {', '.join(m['pesados'])}")
+
+        if problemas:
+            raise CommandError("Orçamento de inicialização estourado:\n- " + "\n- ".join(problemas))
+        self.stdout.write(self.style.SUCCESS("Dentro do orçamento de inicialização"))
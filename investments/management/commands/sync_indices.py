@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from investments.services import sgs
+from investments.services.inflacao import sincronizar_ipca
+
+
+class Command(BaseCommand):
+    help = 'Baixa do SGS/BCB apenas os pontos que faltam das séries registradas (IPCA, CDI, SELIC, IGPM, PTAX)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('series', nargs='*', help=f"Séries a sincronizar (padrão: {', '.join(sgs.SERIES_SGS)})")
+        parser.add_argument('--ate', type=date.fromisoformat, help='Data final (AAAA-MM-DD), padrão hoje')
+
+    def handle(self, *args, **options):
+        nomes = [n.upper() for n in options['series']] or list(sgs.SERIES_SGS)
+        desconhecidas = [n for n in nomes if n not in sgs.SERIES_SGS]
+        if desconhecidas:
+            raise CommandError(f"Série(s) desconhecida(s): {', '.join(desconhecidas)}")
+
+        for nome in nomes:
+            try:
+                novos = sgs.sincronizar_serie(nome, options['ate'])
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"{nome}: falha ao sincronizar ({e})"))
+                continue
+
+            ultima = sgs.ultima_data(nome)
+            self.stdout.write(
+                f"{nome} (SGS {sgs.SERIES_SGS[nome]['codigo']}): {novos} ponto(s) novo(s), "
+                f"último em {ultima.strftime('%d/%m/%Y') if ultima else '-'}"
+            )
+
+        if 'IPCA' in nomes:
+            # Deriva IndiceIPCA (número-índice acumulado) dos pontos já baixados
+            sincronizar_ipca(options['ate'], baixar=False)
+
+        self.stdout.write(self.style.SUCCESS('Índices sincronizados.'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0006_planejamentomensal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceIPCA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(unique=True)),
+                ('variacao', models.DecimalField(decimal_places=6, max_digits=8)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Índice IPCA',
+                'verbose_name_plural': 'Índices IPCA',
+                'ordering': ['competencia'],
+            },
+        ),
+    ]
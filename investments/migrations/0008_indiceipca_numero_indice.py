@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:32
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def preencher_numero_indice(apps, schema_editor):
+    IndiceIPCA = apps.get_model('investments', 'IndiceIPCA')
+    acumulado = Decimal(1)
+    indices = list(IndiceIPCA.objects.order_by('competencia'))
+    for indice in indices:
+        acumulado = (acumulado * (1 + indice.variacao)).quantize(Decimal('1e-14'))
+        indice.numero_indice = acumulado
+    IndiceIPCA.objects.bulk_update(indices, ['numero_indice'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0007_indiceipca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indiceipca',
+            name='numero_indice',
+            field=models.DecimalField(decimal_places=14, default=1, max_digits=24),
+        ),
+        migrations.RunPython(preencher_numero_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0008_indiceipca_numero_indice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planejamentomensal',
+            name='ultimo_ipca_aplicado',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='planejamentomensal',
+            name='valor_corrigido',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0009_planejamento_valor_corrigido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValorIndice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.PositiveIntegerField()),
+                ('data', models.DateField()),
+                ('valor', models.DecimalField(decimal_places=8, max_digits=18)),
+            ],
+            options={
+                'verbose_name': 'Valor de Índice',
+                'verbose_name_plural': 'Valores de Índices',
+                'ordering': ['codigo', 'data'],
+                'constraints': [models.UniqueConstraint(fields=('codigo', 'data'), name='valor_indice_codigo_data_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0010_valorindice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CotacaoAtual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20, unique=True)),
+                ('preco', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('nome', models.CharField(blank=True, max_length=200)),
+                ('logo', models.URLField(blank=True, max_length=500)),
+                ('atualizado_em', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Cotação Atual',
+                'verbose_name_plural': 'Cotações Atuais',
+                'ordering': ['ticker'],
+            },
+        ),
+    ]
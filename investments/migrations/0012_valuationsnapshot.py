@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0011_cotacaoatual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValuationSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20, unique=True)),
+                ('fundamentos', models.JSONField(default=dict)),
+                ('fundamentos_em', models.DateTimeField(blank=True, null=True)),
+                ('preco', models.DecimalField(blank=True, decimal_places=6, max_digits=18, null=True)),
+                ('preco_em', models.DateTimeField(blank=True, null=True)),
+                ('metodos', models.JSONField(default=dict)),
+                ('analise_ia', models.TextField(blank=True)),
+                ('analise_em', models.DateTimeField(blank=True, null=True)),
+                ('noticias', models.TextField(blank=True)),
+                ('noticias_em', models.DateTimeField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Valuation',
+                'verbose_name_plural': 'Snapshots de Valuation',
+                'ordering': ['ticker'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0013_valuationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespostaLLM',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=64, unique=True)),
+                ('modelo', models.CharField(max_length=50)),
+                ('pedido', models.JSONField()),
+                ('resposta', models.TextField()),
+                ('acessos', models.PositiveIntegerField(default=0)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('expira_em', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Resposta da IA em cache',
+                'verbose_name_plural': 'Respostas da IA em cache',
+                'ordering': ['-criado_em'],
+            },
+        ),
+    ]
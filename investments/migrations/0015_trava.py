@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0014_respostallm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trava',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=200, unique=True)),
+                ('dono', models.CharField(max_length=32)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('expira_em', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Trava',
+                'verbose_name_plural': 'Travas',
+            },
+        ),
+    ]
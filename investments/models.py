@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from decimal import Decimal
+from datetime import timedelta
+from django.utils import timezone
 
 class Aporte(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='aportes')
@@ -16,10 +18,15 @@ class Aporte(models.Model):
     def __str__(self):
         return f"{self.data.strftime('%d/%m/%Y')} - R$ {self.valor}"
 
-    def corrigir_valor(self, fator):
-        """Aplica inflação ao valor original."""
+    def corrigir_valor(self, fator, salvar=True):
+        """
+        Aplica inflação ao valor original.
+        Use salvar=False para acumular alterações e gravar em lote
+        (ver inflacao.corrigir_aportes_em_lote).
+        """
         self.valor_corrigido = Decimal(self.valor) * Decimal(fator)
-        self.save()
+        if salvar:
+            self.save(update_fields=['valor_corrigido'])
 
 
 class PlanejamentoMensal(models.Model):
@@ -31,6 +38,10 @@ class PlanejamentoMensal(models.Model):
     valor_planejado = models.DecimalField(max_digits=10, decimal_places=2)
     data_inicio = models.DateField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
+
+    # Valor corrigido materializado e último mês de IPCA já aplicado a ele
+    valor_corrigido = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    ultimo_ipca_aplicado = models.DateField(null=True, blank=True)
     
     class Meta:
         verbose_name = 'Planejamento Mensal'
@@ -41,32 +52,224 @@ class PlanejamentoMensal(models.Model):
     
     def calcular_valor_corrigido(self):
         """
-        Corrige o valor planejado pela inflação desde data_inicio até hoje
+        Corrige o valor planejado pela inflação desde data_inicio até hoje.
+        Lê o valor materializado em valor_corrigido e só o avança quando
+        há mês de IPCA novo além de ultimo_ipca_aplicado.
         """
-        from investments.services.inflacao import buscar_ipca
-        from datetime import date
-        from dateutil.relativedelta import relativedelta
-        
-        valor = Decimal(str(self.valor_planejado))
-        ano_inicio = self.data_inicio.year
-        mes_inicio = self.data_inicio.month
-        
-        hoje = date.today()
-        ano_atual = hoje.year
-        mes_atual = hoje.month
-        
-        # Aplicar IPCA mês a mês
-        ano, mes = ano_inicio, mes_inicio
-        while (ano < ano_atual) or (ano == ano_atual and mes < mes_atual):
-            ipca = buscar_ipca(ano, mes)
-            if ipca:
-                valor *= (1 + ipca)
-            
-            # Avançar para o próximo mês
-            prox = date(ano, mes, 1) + relativedelta(months=1)
-            ano, mes = prox.year, prox.month
-        
-        return float(valor)
+        from investments.services.inflacao import atualizar_planejamento_corrigido
+
+        atualizar_planejamento_corrigido(self)
+        return float(self.valor_corrigido)
+
+    def redefinir_correcao(self):
+        """Descarta o valor corrigido materializado (ex.: valor_planejado mudou)."""
+        self.valor_corrigido = None
+        self.ultimo_ipca_aplicado = None
+
+
+class IndiceIPCA(models.Model):
+    """
+    Variação mensal do IPCA (série 433 do SGS/BCB).
+    Uma linha por mês de competência, preenchida em lote por
+    investments.services.inflacao.sincronizar_ipca().
+    """
+    competencia = models.DateField(unique=True)  # sempre o dia 1 do mês
+    variacao = models.DecimalField(max_digits=8, decimal_places=6)  # fração: 0.0056 = 0,56%
+    # Produto acumulado de (1 + variacao) desde o início da série até este mês
+    numero_indice = models.DecimalField(max_digits=24, decimal_places=14, default=1)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['competencia']
+        verbose_name = 'Índice IPCA'
+        verbose_name_plural = 'Índices IPCA'
+
+    def __str__(self):
+        return f"IPCA {self.competencia.strftime('%m/%Y')}: {self.variacao * 100:.2f}%"
+
+
+class ValorIndice(models.Model):
+    """
+    Ponto de uma série temporal do SGS/BCB (IPCA, CDI, Selic, IGP-M, PTAX...).
+    Uma tabela para todas as séries, identificadas pelo código SGS
+    (ver investments.services.sgs.SERIES_SGS).
+    """
+    codigo = models.PositiveIntegerField()
+    data = models.DateField()
+    valor = models.DecimalField(max_digits=18, decimal_places=8)
+
+    class Meta:
+        ordering = ['codigo', 'data']
+        constraints = [
+            models.UniqueConstraint(fields=['codigo', 'data'], name='valor_indice_codigo_data_unico'),
+        ]
+        verbose_name = 'Valor de Índice'
+        verbose_name_plural = 'Valores de Índices'
+
+    def __str__(self):
+        return f"SGS {self.codigo} - {self.data.strftime('%d/%m/%Y')}: {self.valor}"
+
+
+class CotacaoAtual(models.Model):
+    """
+    Última cotação conhecida de cada ticker em carteira.
+    Preenchida em segundo plano pelo comando atualizar_cotacoes; o dashboard
+    só lê desta tabela.
+    """
+    ticker = models.CharField(max_length=20, unique=True)
+    preco = models.DecimalField(max_digits=18, decimal_places=6)
+    nome = models.CharField(max_length=200, blank=True)
+    logo = models.URLField(max_length=500, blank=True)
+    atualizado_em = models.DateTimeField()
+
+    class Meta:
+        ordering = ['ticker']
+        verbose_name = 'Cotação Atual'
+        verbose_name_plural = 'Cotações Atuais'
+
+    def __str__(self):
+        return f"{self.ticker} - R$ {self.preco}"
+
+
+class ValuationSnapshot(models.Model):
+    """
+    Último valuation calculado de cada ticker (services.valuation_openai).
+    Cada parte tem a própria validade: a API serve daqui e só refaz a
+    raspagem / chamadas à OpenAI das partes vencidas.
+    """
+    VALIDADE = {
+        'preco': timedelta(minutes=15),
+        'fundamentos': timedelta(days=3),
+        'analise': timedelta(days=1),
+        'noticias': timedelta(hours=6),
+    }
+
+    ticker = models.CharField(max_length=20, unique=True)
+    # preco, lpa, pl, roe, dy, vpa extraídos do Investidor10
+    fundamentos = models.JSONField(default=dict)
+    fundamentos_em = models.DateTimeField(null=True, blank=True)
+    preco = models.DecimalField(max_digits=18, decimal_places=6, null=True, blank=True)
+    preco_em = models.DateTimeField(null=True, blank=True)
+    # Bazin, Graham, Lynch e recomendação (recalculados a cada preço novo)
+    metodos = models.JSONField(default=dict)
+    analise_ia = models.TextField(blank=True)
+    analise_em = models.DateTimeField(null=True, blank=True)
+    noticias = models.TextField(blank=True)
+    noticias_em = models.DateTimeField(null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['ticker']
+        verbose_name = 'Snapshot de Valuation'
+        verbose_name_plural = 'Snapshots de Valuation'
+
+    def __str__(self):
+        return f"{self.ticker} - {self.atualizado_em:%d/%m/%Y %H:%M}"
+
+    def vencido(self, parte, agora=None):
+        """True se a parte ('preco', 'fundamentos', 'analise', 'noticias') nunca foi obtida ou venceu."""
+        momento = getattr(self, f"{parte}_em")
+        return momento is None or (agora or timezone.now()) - momento > self.VALIDADE[parte]
+
+    def gravar(self):
+        """
+        Grava o snapshot por ticker (update_or_create): se outro worker criou
+        a linha do mesmo ticker depois que esta instância foi lida, atualiza
+        a linha em vez de violar o unique.
+        """
+        campos = {
+            f.attname: getattr(self, f.attname)
+            for f in self._meta.concrete_fields if not f.primary_key and f.name != 'ticker'
+        }
+        gravado, _ = type(self).objects.update_or_create(ticker=self.ticker, defaults=campos)
+        self.pk, self.atualizado_em = gravado.pk, gravado.atualizado_em
+        self._state.adding = False
+
+
+class RespostaLLM(models.Model):
+    """
+    Resposta da OpenAI guardada pelo hash do pedido (services.cache_llm):
+    mesmo modelo + parâmetros + prompt dentro da validade não vai à API.
+    """
+    chave = models.CharField(max_length=64, unique=True)
+    modelo = models.CharField(max_length=50)
+    pedido = models.JSONField()
+    resposta = models.TextField()
+    acessos = models.PositiveIntegerField(default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    expira_em = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+        verbose_name = 'Resposta da IA em cache'
+        verbose_name_plural = 'Respostas da IA em cache'
+
+    def __str__(self):
+        return f"{self.modelo} {self.chave[:12]} ({self.criado_em:%d/%m/%Y %H:%M})"
+
+
+class Trava(models.Model):
+    """
+    Trava entre processos (services.travas): a chave é única, então só um
+    INSERT vence mesmo com vários workers disputando ao mesmo tempo.
+    """
+    chave = models.CharField(max_length=200, unique=True)
+    dono = models.CharField(max_length=32)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    expira_em = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Trava'
+        verbose_name_plural = 'Travas'
+
+    def __str__(self):
+        return f"{self.chave} (até {self.expira_em:%d/%m/%Y %H:%M:%S})"
+
+
+class StatusJob(models.TextChoices):
+    PENDENTE = 'PENDENTE', 'Pendente'
+    EXECUTANDO = 'EXECUTANDO', 'Executando'
+    CONCLUIDO = 'CONCLUIDO', 'Concluído'
+    ERRO = 'ERRO', 'Erro'
+
+
+class ValuationJob(models.Model):
+    """
+    Pedido de valuation na fila local (services.fila_valuation).
+    A página envia o pedido, recebe o id e consulta o andamento; quem
+    calcula é o pool de threads do processo, não o worker da requisição.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='valuation_jobs')
+    ticker = models.CharField(max_length=20)
+    status = models.CharField(max_length=12, choices=StatusJob.choices, default=StatusJob.PENDENTE, db_index=True)
+    # Parcial enquanto executa (números primeiro, textos da IA crescendo)
+    resultado = models.JSONField(null=True, blank=True)
+    erro = models.TextField(blank=True)
+    # Jobs pendentes à frente deste quando foi enviado
+    fila_no_envio = models.PositiveIntegerField(default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+        verbose_name = 'Job de Valuation'
+        verbose_name_plural = 'Jobs de Valuation'
+
+    def __str__(self):
+        return f"{self.ticker} - {self.get_status_display()} ({self.criado_em:%d/%m/%Y %H:%M})"
+
+    @property
+    def espera(self):
+        """Segundos entre o envio e o início da execução (None se não começou)."""
+        return (self.iniciado_em - self.criado_em).total_seconds() if self.iniciado_em else None
+
+    @property
+    def duracao(self):
+        """Segundos de execução (None se não terminou)."""
+        if not (self.iniciado_em and self.concluido_em):
+            return None
+        return (self.concluido_em - self.iniciado_em).total_seconds()
 
 
 class TipoAtivo(models.TextChoices):
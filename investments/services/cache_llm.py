@@ -0,0 +1,116 @@
+"""
+Cache das respostas da OpenAI (tabela RespostaLLM)
+- Chave: SHA-256 do pedido inteiro (modelo, parâmetros e mensagens);
+  qualquer mudança no prompt ou nos parâmetros é outra entrada
+- Cada chamada informa a validade da resposta (timedelta)
+- settings.LLM_CACHE_MODO:
+  'normal'    usa o cache e chama a API nas ausências
+  'replay'    só serve do cache (vencido ou não); ausência levanta
+              RespostaAusente, sem rede (testes e benchmarks)
+  'desligado' sempre chama a API e não grava
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+
+MODOS = ('normal', 'replay', 'desligado')
+
+
+class RespostaAusente(Exception):
+    """Modo replay e o pedido não está no cache."""
+
+
+def _modo():
+    modo = settings.LLM_CACHE_MODO
+    if modo not in MODOS:
+        raise ValueError(f"LLM_CACHE_MODO inválido: {modo} (use um de {', '.join(MODOS)})")
+    return modo
+
+
+def chave(pedido):
+    """Hash do pedido (parâmetros de chat.completions.create, sem 'stream')."""
+    pedido = {k: v for k, v in pedido.items() if k != 'stream'}
+    return hashlib.sha256(json.dumps(pedido, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def obter(pedido):
+    """Texto em cache para o pedido (None se ausente ou vencido; no replay, vencido também vale)."""
+    from investments.models import RespostaLLM
+
+    entradas = RespostaLLM.objects.filter(chave=chave(pedido))
+    if _modo() != 'replay':
+        entradas = entradas.filter(expira_em__gt=timezone.now())
+    entrada = entradas.only('pk', 'resposta').first()
+    if entrada is None:
+        return None
+    RespostaLLM.objects.filter(pk=entrada.pk).update(acessos=F('acessos') + 1)
+    return entrada.resposta
+
+
+def gravar(pedido, resposta, validade):
+    from investments.models import RespostaLLM
+
+    RespostaLLM.objects.update_or_create(
+        chave=chave(pedido),
+        defaults={
+            'modelo': pedido.get('model', ''),
+            'pedido': {k: v for k, v in pedido.items() if k != 'stream'},
+            'resposta': resposta,
+            'expira_em': timezone.now() + validade,
+        },
+    )
+
+
+def completar(pedido, validade, chamar):
+    """
+    Texto da resposta do pedido: do cache, ou de chamar() (que faz a
+    chamada à API e devolve o texto), gravado por 'validade'.
+    """
+    modo = _modo()
+    if modo != 'desligado':
+        resposta = obter(pedido)
+        if resposta is not None:
+            return resposta
+        if modo == 'replay':
+            raise RespostaAusente(f"Pedido {chave(pedido)[:12]} ({pedido.get('model')}) fora do cache")
+
+    resposta = chamar()
+    if modo == 'normal' and resposta:
+        gravar(pedido, resposta, validade)
+    return resposta
+
+
+def transmitir(pedido, validade, chamar):
+    """
+    Versão em streaming de completar(): em cache, gera o texto inteiro de
+    uma vez; senão repassa os pedaços de chamar() (gerador) e grava o
+    texto completo quando o stream termina.
+    """
+    modo = _modo()
+    if modo != 'desligado':
+        resposta = obter(pedido)
+        if resposta is not None:
+            yield resposta
+            return
+        if modo == 'replay':
+            raise RespostaAusente(f"Pedido {chave(pedido)[:12]} ({pedido.get('model')}) fora do cache")
+
+    partes = []
+    for parte in chamar():
+        partes.append(parte)
+        yield parte
+    if modo == 'normal' and partes:
+        gravar(pedido, ''.join(partes), validade)
+
+
+def limpar(tudo=False):
+    """Apaga as respostas vencidas (ou todas). Retorna a quantidade apagada."""
+    from investments.models import RespostaLLM
+
+    entradas = RespostaLLM.objects.all() if tudo else RespostaLLM.objects.filter(expira_em__lte=timezone.now())
+    return entradas.delete()[0]
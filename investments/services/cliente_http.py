@@ -0,0 +1,170 @@
+"""
+Cliente HTTP compartilhado por todas as integrações externas
+(brapi.dev, api.bcb.gov.br, investidor10.com.br, OpenAI)
+- Uma sessão por processo, com pool de conexões keep-alive por host
+- Timeouts padrão e retentativa com backoff em erros transitórios;
+  Retry-After é respeitado até RETRY_AFTER_MAXIMO segundos
+- Contadores por host: requisições, conexões abertas (reuso) e latência
+- Disjuntor por provedor (services.disjuntor): com o circuito aberto o
+  GET falha na hora com CircuitoAberto, sem esperar timeout
+"""
+
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from investments.services import disjuntor
+
+
+# (conexão, leitura) em segundos
+TIMEOUT_PADRAO = (3.05, 10)
+# Quantidade de hosts com pool mantido e conexões keep-alive por host
+POOLS_POR_PROCESSO = 10
+CONEXOES_POR_HOST = 20
+# Espera máxima pedida por Retry-After (429/503) antes de tentar de novo:
+# um 'Retry-After: 3600' não pode prender o worker por uma hora
+RETRY_AFTER_MAXIMO = 5
+
+
+class _Retentativas(Retry):
+    """Retry com o Retry-After limitado a RETRY_AFTER_MAXIMO segundos."""
+
+    def get_retry_after(self, response):
+        segundos = super().get_retry_after(response)
+        return None if segundos is None else min(segundos, RETRY_AFTER_MAXIMO)
+
+
+RETENTATIVAS = _Retentativas(
+    total=2,
+    connect=2,
+    read=1,
+    status=2,
+    backoff_factor=0.3,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({'GET', 'HEAD'}),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+_trava = threading.Lock()
+_sessao = None
+_cliente_httpx = None
+_metricas = defaultdict(lambda: {'requisicoes': 0, 'erros': 0, 'latencia_total': 0.0, 'latencia_max': 0.0})
+
+
+def _registrar(host, segundos, erro=False):
+    with _trava:
+        m = _metricas[host]
+        m['requisicoes'] += 1
+        m['erros'] += int(erro)
+        m['latencia_total'] += segundos
+        m['latencia_max'] = max(m['latencia_max'], segundos)
+
+
+def sessao():
+    """requests.Session compartilhada (criada na primeira chamada)."""
+    global _sessao
+    if _sessao is None:
+        with _trava:
+            if _sessao is None:
+                s = requests.Session()
+                adaptador = HTTPAdapter(
+                    pool_connections=POOLS_POR_PROCESSO,
+                    pool_maxsize=CONEXOES_POR_HOST,
+                    max_retries=RETENTATIVAS,
+                )
+                s.mount('https://', adaptador)
+                s.mount('http://', adaptador)
+                _sessao = s
+    return _sessao
+
+
+def get(url, **kwargs):
+    """
+    GET pela sessão compartilhada, com timeout padrão, métricas por host e
+    o disjuntor do provedor (5xx e 429 contam como falha).
+    """
+    kwargs.setdefault('timeout', TIMEOUT_PADRAO)
+    host = urlsplit(url).hostname or ''
+    provedor = disjuntor.provedor_do_host(host)
+    circuito = disjuntor.obter(provedor) if provedor else None
+    if circuito and not circuito.permitir():
+        raise disjuntor.CircuitoAberto(f"{provedor} indisponível (circuito aberto)")
+
+    inicio = time.perf_counter()
+    try:
+        response = sessao().get(url, **kwargs)
+    except Exception:
+        segundos = time.perf_counter() - inicio
+        _registrar(host, segundos, erro=True)
+        if circuito:
+            circuito.registrar(False, segundos)
+        raise
+    segundos = time.perf_counter() - inicio
+    _registrar(host, segundos, erro=response.status_code >= 500)
+    if circuito:
+        circuito.registrar(response.status_code < 500 and response.status_code != 429, segundos)
+    return response
+
+
+def cliente_httpx():
+    """
+    httpx.Client compartilhado para SDKs baseados em httpx (OpenAI), com
+    keep-alive e as mesmas métricas por host.
+    """
+    global _cliente_httpx
+    if _cliente_httpx is None:
+        import httpx
+
+        def _inicio(request):
+            request.extensions['inicio'] = time.perf_counter()
+
+        def _fim(response):
+            inicio = response.request.extensions.get('inicio', time.perf_counter())
+            _registrar(response.request.url.host, time.perf_counter() - inicio, erro=response.status_code >= 500)
+
+        with _trava:
+            if _cliente_httpx is None:
+                _cliente_httpx = httpx.Client(
+                    timeout=httpx.Timeout(60.0, connect=5.0),
+                    limits=httpx.Limits(max_connections=CONEXOES_POR_HOST, max_keepalive_connections=CONEXOES_POR_HOST),
+                    event_hooks={'request': [_inicio], 'response': [_fim]},
+                )
+    return _cliente_httpx
+
+
+def estatisticas():
+    """
+    Métricas por host desde o início do processo: requisições, erros,
+    latência média/máxima (ms) e, na sessão requests, conexões abertas
+    x requisições servidas pelo pool (reuso de keep-alive).
+    """
+    with _trava:
+        hosts = {
+            host: {
+                'requisicoes': m['requisicoes'],
+                'erros': m['erros'],
+                'latencia_media_ms': round(m['latencia_total'] / m['requisicoes'] * 1000, 1) if m['requisicoes'] else 0,
+                'latencia_max_ms': round(m['latencia_max'] * 1000, 1),
+            }
+            for host, m in _metricas.items()
+        }
+
+    if _sessao is not None:
+        pools = _sessao.get_adapter('https://').poolmanager.pools
+        for chave in list(pools.keys()):
+            pool = pools.get(chave)
+            if pool is None:
+                continue
+            h = hosts.setdefault(pool.host, {})
+            h['conexoes_abertas'] = h.get('conexoes_abertas', 0) + pool.num_connections
+            h['requisicoes_no_pool'] = h.get('requisicoes_no_pool', 0) + pool.num_requests
+            if h['requisicoes_no_pool']:
+                h['taxa_reuso'] = round(1 - h['conexoes_abertas'] / h['requisicoes_no_pool'], 3)
+
+    return hosts
@@ -0,0 +1,54 @@
+"""
+Execução concorrente de chamadas externas com prazo total
+- Pool de threads compartilhado pelo processo
+- Tudo que não terminar dentro do prazo usa o último valor conhecido
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.db import connections
+
+
+MAX_THREADS = 8
+
+_executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix='rumo1m-externo')
+
+
+def _executar(funcao):
+    try:
+        return funcao()
+    finally:
+        # Conexões de banco abertas na thread do pool não devem ficar penduradas
+        connections.close_all()
+
+
+def executar_com_prazo(tarefas, prazo, fallbacks=None):
+    """
+    Executa em paralelo as funções de 'tarefas' ({nome: callable sem args})
+    e espera no máximo 'prazo' segundos pelo conjunto.
+
+    Para cada tarefa que estourar o prazo ou falhar, usa fallbacks[nome]()
+    (último valor conhecido) ou None. Tarefas atrasadas continuam rodando
+    em segundo plano e aquecem o cache para a próxima requisição; por isso
+    não devem alterar objetos que quem chamou (ou o fallback) ainda lê.
+
+    Retorna (resultados, atrasadas): dict {nome: valor} e lista de nomes
+    que usaram fallback.
+    """
+    fallbacks = fallbacks or {}
+    futuros = {nome: _executor.submit(_executar, funcao) for nome, funcao in tarefas.items()}
+    wait(futuros.values(), timeout=prazo)
+
+    resultados, atrasadas = {}, []
+    for nome, futuro in futuros.items():
+        if futuro.done() and futuro.exception() is None:
+            resultados[nome] = futuro.result()
+            continue
+
+        if futuro.done():
+            print(f"[ERRO] Tarefa externa '{nome}': {futuro.exception()}")
+        atrasadas.append(nome)
+        fallback = fallbacks.get(nome)
+        resultados[nome] = fallback() if fallback else None
+
+    return resultados, atrasadas
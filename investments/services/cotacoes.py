@@ -0,0 +1,340 @@
+"""
+Cotações de ativos da B3
+- brapi.dev: várias cotações por requisição (tickers separados por vírgula)
+- yfinance: cotações do formulário de lançamentos (um yf.download por lote)
+- Cache compartilhado (Django cache) com TTL por classe de ativo e
+  stale-while-revalidate: valor vencido é servido enquanto UMA atualização
+  roda em segundo plano (trava por ticker no banco, services.travas)
+- Com o disjuntor do provedor aberto (services.disjuntor), a busca falha
+  na hora e fica valendo o último valor conhecido (cache ou CotacaoAtual)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, DecimalField, F, Sum, When
+from django.utils import timezone
+
+from investments.services import cliente_http, disjuntor, singleflight, travas
+
+
+BRAPI_URL = "https://brapi.dev/api/quote"
+TICKERS_POR_REQUISICAO = 20
+
+# Segundos até a cotação ficar "velha", por TipoAtivo
+TTL_COTACAO = {
+    'ACOES': 60,
+    'FIIS': 60,
+    'ETFS': 60,
+    'BDRS': 60,
+    'CRIPTOMOEDAS': 30,
+    'FUNDOS': 60 * 60,
+    'TESOURO': 60 * 60,
+    'RENDA_FIXA': 60 * 60,
+    'OUTROS': 5 * 60,
+}
+TTL_PADRAO = 60
+# Por quanto tempo um valor velho ainda pode ser servido enquanto revalida
+VALIDADE_MAXIMA = 24 * 60 * 60
+# Trava da revalidação em segundo plano (uma por ticker entre todos os workers)
+TEMPO_TRAVA_ATUALIZACAO = 30
+# Linha de CotacaoAtual mais velha que isso é ignorada (atualizador parado?)
+VALIDADE_COTACAO_ATUAL = timedelta(minutes=15)
+
+_trava_estatisticas = threading.Lock()
+_estatisticas = {'hit': 0, 'stale': 0, 'miss': 0}
+
+
+def _normalizar_tickers(tickers):
+    """Remove vazios/duplicados e padroniza em maiúsculas, mantendo a ordem."""
+    vistos = {}
+    for ticker in tickers:
+        ticker = (ticker or '').strip().upper()
+        if ticker:
+            vistos.setdefault(ticker, None)
+    return list(vistos)
+
+
+def buscar_cotacoes_brapi(tickers):
+    """
+    Busca as cotações de todos os tickers na brapi agrupando-os no menor
+    número possível de requisições multi-símbolo.
+    Retorna dict {TICKER: resultado da brapi}; tickers sem cotação ficam de fora.
+    """
+    tickers = _normalizar_tickers(tickers)
+    resultados = {}
+
+    for i in range(0, len(tickers), TICKERS_POR_REQUISICAO):
+        lote = tickers[i:i + TICKERS_POR_REQUISICAO]
+        try:
+            response = cliente_http.get(f"{BRAPI_URL}/{','.join(lote)}", timeout=5)
+            if not response.ok:
+                print(f"[ERRO] brapi {response.status_code} para {','.join(lote)}")
+                continue
+            for resultado in response.json().get('results', []):
+                simbolo = (resultado.get('symbol') or '').upper()
+                if simbolo:
+                    resultados[simbolo] = resultado
+        except Exception as e:
+            print(f"[ERRO] Cotações brapi ({','.join(lote)}): {e}")
+
+    return resultados
+
+
+def buscar_cotacoes_yahoo(tickers):
+    """
+    Busca cotações no Yahoo Finance com um único yf.download (último
+    fechamento/preço do dia de todos os tickers), sem o quoteSummary
+    completo do .info. O nome vem do universo de ativos em cache.
+    Retorna dict {TICKER: {'preco', 'nome'}}; tickers sem preço ficam de fora.
+    """
+    import yfinance as yf
+    from investments.services import universo
+
+    tickers = _normalizar_tickers(tickers)
+    if not tickers:
+        return {}
+
+    try:
+        with disjuntor.protegido('yahoo'):
+            df = yf.download(
+                [f"{t}.SA" for t in tickers],
+                period='5d',
+                interval='1d',
+                group_by='column',
+                auto_adjust=False,
+                progress=False,
+                threads=False,
+            )
+    except Exception as e:
+        print(f"[ERRO] Cotações yfinance ({','.join(tickers)}): {e}")
+        return {}
+
+    if df is None or df.empty or 'Close' not in df:
+        return {}
+
+    fechamentos = df['Close']
+    if not hasattr(fechamentos, 'columns'):
+        fechamentos = fechamentos.to_frame(f"{tickers[0]}.SA")
+
+    nomes = universo.nomes_ativos(tickers)
+    resultados = {}
+    for ticker in tickers:
+        coluna = f"{ticker}.SA"
+        if coluna not in fechamentos:
+            continue
+        serie = fechamentos[coluna].dropna()
+        if serie.empty:
+            continue
+        resultados[ticker] = {'preco': round(float(serie.iloc[-1]), 2), 'nome': nomes.get(ticker, ticker)}
+    return resultados
+
+
+FONTES = {
+    'brapi': buscar_cotacoes_brapi,
+    'yahoo': buscar_cotacoes_yahoo,
+}
+
+
+# ------------------------------------------------------------
+# CACHE COMPARTILHADO DE COTAÇÕES
+# ------------------------------------------------------------
+def _chave(fonte, ticker):
+    return f"cotacao:{fonte}:{ticker}"
+
+
+def _contar(evento, quantidade=1):
+    """
+    Incrementa o contador de hit/stale/miss deste processo. Em memória:
+    add + incr no FileBasedCache não é atômico e perdia incrementos entre
+    workers.
+    """
+    with _trava_estatisticas:
+        _estatisticas[evento] += quantidade
+
+
+def estatisticas_cache():
+    """Contadores acumulados do cache de cotações neste processo: hit, stale e miss."""
+    with _trava_estatisticas:
+        return dict(_estatisticas)
+
+
+def _gravar(fonte, tickers, resultados):
+    """
+    Grava no cache o resultado de cada ticker (None = sem cotação).
+    Com o circuito da fonte aberto, a falta de resultado é da fonte, não do
+    ticker: só grava o que veio e mantém o valor anterior dos demais.
+    """
+    agora = time.time()
+    if not disjuntor.disponivel(fonte):
+        tickers = [t for t in tickers if t in resultados]
+    cache.set_many(
+        {_chave(fonte, t): {'dados': resultados.get(t), 'obtido_em': agora} for t in tickers},
+        timeout=VALIDADE_MAXIMA,
+    )
+
+
+def _buscar_e_gravar(fonte, tickers):
+    resultados = FONTES[fonte](tickers)
+    _gravar(fonte, tickers, resultados)
+    return resultados
+
+
+def _revalidar(fonte, donos):
+    """Atualiza os tickers de 'donos' ({TICKER: dono da trava}) e solta as travas."""
+    tickers = list(donos)
+    try:
+        _gravar(fonte, tickers, FONTES[fonte](tickers))
+    except Exception as e:
+        print(f"[ERRO] Revalidar cotações ({','.join(tickers)}): {e}")
+    finally:
+        for ticker, dono in donos.items():
+            travas.liberar(f"{_chave(fonte, ticker)}:atualizando", dono)
+        connections.close_all()
+
+
+def obter_cotacoes(tickers, fonte='brapi', tipos=None):
+    """
+    Cotações via cache compartilhado entre usuários e processos.
+    - Fresco (dentro do TTL da classe do ativo): servido do cache
+    - Velho: servido do cache e revalidado em segundo plano, uma vez só
+    - Ausente: buscado agora na fonte, em lote
+    tipos: dict opcional {TICKER: TipoAtivo} para escolher o TTL.
+    Retorna dict {TICKER: dados da fonte}.
+    """
+    tickers = _normalizar_tickers(tickers)
+    tipos = {t.upper(): tipo for t, tipo in (tipos or {}).items() if t}
+    agora = time.time()
+
+    em_cache = cache.get_many([_chave(fonte, t) for t in tickers])
+    resultados, ausentes, velhos = {}, [], []
+
+    for ticker in tickers:
+        entrada = em_cache.get(_chave(fonte, ticker))
+        if entrada is None:
+            ausentes.append(ticker)
+            continue
+
+        if entrada['dados'] is not None:
+            resultados[ticker] = entrada['dados']
+        ttl = TTL_COTACAO.get(tipos.get(ticker), TTL_PADRAO)
+        if agora - entrada['obtido_em'] > ttl:
+            velhos.append(ticker)
+
+    _contar('hit', len(tickers) - len(ausentes) - len(velhos))
+    _contar('stale', len(velhos))
+    _contar('miss', len(ausentes))
+
+    if ausentes:
+        # Requisições simultâneas pelos mesmos tickers fazem uma só busca na fonte
+        novos = singleflight.executar(
+            f"cotacoes:{fonte}:{','.join(ausentes)}",
+            lambda: _buscar_e_gravar(fonte, ausentes),
+        )
+        resultados.update({t: novos[t] for t in ausentes if t in novos})
+
+        # brapi fora do ar: última cotação gravada em CotacaoAtual, de qualquer idade
+        faltando = [t for t in ausentes if t not in novos]
+        if faltando and fonte == 'brapi' and not disjuntor.disponivel('brapi'):
+            resultados.update(cotacoes_atuais(faltando, validade=None))
+
+    # Só revalida quem conseguir a trava: uma atualização por ticker no cluster
+    donos = {t: travas.adquirir(f"{_chave(fonte, t)}:atualizando", TEMPO_TRAVA_ATUALIZACAO) for t in velhos}
+    donos = {t: dono for t, dono in donos.items() if dono}
+    if donos:
+        threading.Thread(target=_revalidar, args=(fonte, donos), daemon=True).start()
+
+    return resultados
+
+
+def cotacoes_em_cache(tickers, fonte='brapi'):
+    """Último valor conhecido de cada ticker, qualquer que seja a idade, sem acessar a fonte."""
+    tickers = _normalizar_tickers(tickers)
+    em_cache = cache.get_many([_chave(fonte, t) for t in tickers])
+    return {
+        t: entrada['dados']
+        for t in tickers
+        if (entrada := em_cache.get(_chave(fonte, t))) and entrada['dados'] is not None
+    }
+
+
+# ------------------------------------------------------------
+# TABELA CotacaoAtual (atualizada em segundo plano)
+# ------------------------------------------------------------
+def tickers_em_carteira():
+    """Tickers com posição positiva em ao menos uma carteira (união entre usuários)."""
+    from investments.models import Lancamento
+
+    posicoes = (
+        Lancamento.objects.exclude(ticker='')
+        .values('usuario', 'ticker')
+        .annotate(quantidade=Sum(Case(
+            When(tipo_operacao='COMPRA', then=F('quantidade')),
+            default=-F('quantidade'),
+            output_field=DecimalField(max_digits=18, decimal_places=8),
+        )))
+        .filter(quantidade__gt=0)
+    )
+    return sorted({p['ticker'].strip().upper() for p in posicoes})
+
+
+def atualizar_cotacoes_atuais(tickers, tamanho_lote=TICKERS_POR_REQUISICAO, concorrencia=4):
+    """
+    Busca as cotações de 'tickers' na brapi em lotes multi-símbolo, com no
+    máximo 'concorrencia' requisições simultâneas, e grava em CotacaoAtual
+    (também aquece o cache compartilhado). Retorna a quantidade gravada.
+    """
+    from investments.models import CotacaoAtual
+
+    tickers = _normalizar_tickers(tickers)
+    lotes = [tickers[i:i + tamanho_lote] for i in range(0, len(tickers), tamanho_lote)]
+
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(concorrencia, 1)) as executor:
+        for parcial in executor.map(buscar_cotacoes_brapi, lotes):
+            resultados.update(parcial)
+
+    _gravar('brapi', tickers, resultados)
+
+    agora = timezone.now()
+    linhas = [
+        CotacaoAtual(
+            ticker=ticker,
+            preco=Decimal(str(resultado.get('regularMarketPrice') or 0)),
+            nome=resultado.get('longName') or resultado.get('shortName') or '',
+            logo=resultado.get('logourl') or '',
+            atualizado_em=agora,
+        )
+        for ticker, resultado in resultados.items()
+        if resultado.get('regularMarketPrice')
+    ]
+    CotacaoAtual.objects.bulk_create(
+        linhas,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['ticker'],
+        update_fields=['preco', 'nome', 'logo', 'atualizado_em'],
+    )
+    return len(linhas)
+
+
+def cotacoes_atuais(tickers, validade=VALIDADE_COTACAO_ATUAL):
+    """
+    Cotações recentes lidas de CotacaoAtual (uma consulta), no mesmo formato
+    da brapi ({TICKER: {'regularMarketPrice', 'logourl'}}).
+    validade=None aceita qualquer idade (fonte fora do ar).
+    """
+    from investments.models import CotacaoAtual
+
+    linhas = CotacaoAtual.objects.filter(ticker__in=_normalizar_tickers(tickers))
+    if validade is not None:
+        linhas = linhas.filter(atualizado_em__gte=timezone.now() - validade)
+    return {
+        c.ticker: {'regularMarketPrice': float(c.preco), 'logourl': c.logo, 'longName': c.nome}
+        for c in linhas
+    }
@@ -0,0 +1,227 @@
+"""
+Disjuntor (circuit breaker) por provedor externo: brapi, BCB, Yahoo,
+OpenAI e Investidor10
+- Janela móvel de chamadas por provedor: taxa de erro e latência
+  (chamada mais lenta que o limite do provedor conta como falha)
+- Taxa de erro acima do limite abre o circuito: as chamadas falham na
+  hora (CircuitoAberto) e quem chama serve o dado em cache/velho
+- Depois de TEMPO_ABERTO o circuito fica meio aberto: uma sonda por vez
+  entre todos os processos; SONDAS_PARA_FECHAR sucessos fecham, uma
+  falha reabre
+- Abertura e sucessos das sondas ficam no cache compartilhado: os outros
+  processos também falham rápido sem esperar os próprios timeouts, e só
+  voltam ao tráfego normal quando o circuito fecha
+- A vaga da sonda é uma trava no banco (services.travas): cache.add no
+  FileBasedCache não é atômico. O contador de sucessos só é mexido por
+  quem segura a vaga, então get/set no cache basta (sem incr)
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+from investments.services import travas
+
+
+FECHADO, ABERTO, MEIO_ABERTO = 'FECHADO', 'ABERTO', 'MEIO_ABERTO'
+
+# Chamadas consideradas na taxa de erro (segundos) e mínimo para decidir
+JANELA = 60
+MIN_CHAMADAS = 5
+TAXA_ERRO_MAXIMA = 0.5
+# Segundos com o circuito aberto antes de deixar passar uma sonda
+TEMPO_ABERTO = 30
+SONDAS_PARA_FECHAR = 2
+# Sem sonda nenhuma nesse tempo (ninguém chamou o provedor), o estado
+# publicado expira e o circuito volta fechado
+VIDA_ESTADO_PUBLICADO = 10 * 60
+# Folga além da latência máxima para a vaga da sonda de um processo que morreu
+FOLGA_SONDA = 5
+
+# Provedor: hosts atendidos pelo cliente_http.get e latência máxima (segundos)
+# (Yahoo e OpenAI têm clientes próprios: protegidos onde são chamados)
+PROVEDORES = {
+    'brapi': {'hosts': ('brapi.dev',), 'latencia_maxima': 3},
+    'bcb': {'hosts': ('api.bcb.gov.br',), 'latencia_maxima': 6},
+    'yahoo': {'hosts': (), 'latencia_maxima': 10},
+    'openai': {'hosts': (), 'latencia_maxima': 60},
+    'investidor10': {'hosts': ('investidor10.com.br',), 'latencia_maxima': 10},
+}
+_POR_HOST = {host: nome for nome, p in PROVEDORES.items() for host in p['hosts']}
+
+
+class CircuitoAberto(Exception):
+    """Provedor com o circuito aberto: a chamada nem foi feita."""
+
+
+class Disjuntor:
+    """
+    Circuito de um provedor. A janela de chamadas é deste processo; o
+    estado aberto/meio aberto é o publicado no cache compartilhado.
+    """
+
+    def __init__(self, nome, latencia_maxima):
+        self.nome = nome
+        self.latencia_maxima = latencia_maxima
+        self.estado = FECHADO
+        self.aberto_em = None
+        # Dono da vaga da sonda (services.travas) quando é deste processo
+        self.sonda = None
+        # (instante, sucesso, segundos) das chamadas dentro da JANELA
+        self.chamadas = deque()
+        self.trava = threading.Lock()
+
+    def _chave(self, parte='aberto_ate'):
+        return f"disjuntor:{self.nome}:{parte}"
+
+    def _descartar_antigas(self, agora):
+        while self.chamadas and agora - self.chamadas[0][0] > JANELA:
+            self.chamadas.popleft()
+
+    def _estado_publicado(self, agora):
+        """Estado do cluster pelo cache: (estado, aberto_ate)."""
+        aberto_ate = cache.get(self._chave())
+        if not aberto_ate:
+            return FECHADO, None
+        return (ABERTO if agora < aberto_ate else MEIO_ABERTO), aberto_ate
+
+    def _abrir(self, agora):
+        self.estado = ABERTO
+        self.aberto_em = agora
+        cache.set(self._chave(), agora + TEMPO_ABERTO, timeout=TEMPO_ABERTO + VIDA_ESTADO_PUBLICADO)
+        cache.delete(self._chave('sucessos_sonda'))
+        print(f"[DISJUNTOR] {self.nome} aberto por {TEMPO_ABERTO}s")
+
+    def _fechar(self):
+        self.estado = FECHADO
+        # Janela nova: as falhas da queda não reabrem o circuito
+        self.chamadas.clear()
+        cache.delete_many([self._chave(), self._chave('sucessos_sonda')])
+        print(f"[DISJUNTOR] {self.nome} fechado")
+
+    def _soltar_sonda(self):
+        travas.liberar(self._chave('sonda'), self.sonda)
+        self.sonda = None
+
+    def permitir(self):
+        """
+        True se a chamada pode ser feita. No meio aberto só uma sonda por
+        vez passa no cluster (quem recebe True deve chamar registrar).
+        """
+        agora = time.time()
+        with self.trava:
+            estado, aberto_ate = self._estado_publicado(agora)
+            self.estado = estado
+            if estado == FECHADO:
+                return True
+
+            self.aberto_em = aberto_ate - TEMPO_ABERTO
+            if estado == ABERTO or self.sonda:
+                return False
+
+            # Vaga única da sonda entre os processos
+            self.sonda = travas.adquirir(self._chave('sonda'), self.latencia_maxima + FOLGA_SONDA)
+            return bool(self.sonda)
+
+    def registrar(self, sucesso, segundos):
+        """Resultado de uma chamada permitida (lenta demais conta como falha)."""
+        agora = time.time()
+        sucesso = sucesso and segundos <= self.latencia_maxima
+        with self.trava:
+            self.chamadas.append((agora, sucesso, segundos))
+            self._descartar_antigas(agora)
+
+            if self.sonda:
+                # Ainda com a vaga: ninguém mais mexe no contador ao mesmo tempo
+                try:
+                    if not sucesso:
+                        self._abrir(agora)
+                        return
+                    sucessos = cache.get(self._chave('sucessos_sonda'), 0) + 1
+                    if sucessos >= SONDAS_PARA_FECHAR:
+                        self._fechar()
+                    else:
+                        cache.set(self._chave('sucessos_sonda'), sucessos, timeout=VIDA_ESTADO_PUBLICADO)
+                finally:
+                    self._soltar_sonda()
+                return
+
+            if self.estado == FECHADO and len(self.chamadas) >= MIN_CHAMADAS:
+                erros = sum(1 for _, ok, _ in self.chamadas if not ok)
+                if erros / len(self.chamadas) > TAXA_ERRO_MAXIMA:
+                    self._abrir(agora)
+
+    def liberar_sonda(self):
+        """Sonda interrompida sem resultado (ex.: stream abandonado)."""
+        with self.trava:
+            if self.sonda:
+                self._soltar_sonda()
+
+    def situacao(self):
+        agora = time.time()
+        with self.trava:
+            self._descartar_antigas(agora)
+            latencias = sorted(s for _, _, s in self.chamadas)
+            erros = sum(1 for _, ok, _ in self.chamadas if not ok)
+            estado, aberto_ate = self._estado_publicado(agora)
+            return {
+                'estado': estado,
+                'chamadas': len(self.chamadas),
+                'erros': erros,
+                'taxa_erro': round(erros / len(self.chamadas), 3) if self.chamadas else 0,
+                'latencia_p50_ms': round(latencias[len(latencias) // 2] * 1000) if latencias else None,
+                'latencia_p95_ms': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000) if latencias else None,
+                'latencia_maxima_ms': self.latencia_maxima * 1000,
+                'reabre_em_s': max(0, round(aberto_ate - agora)) if estado == ABERTO else None,
+            }
+
+
+_disjuntores = {nome: Disjuntor(nome, p['latencia_maxima']) for nome, p in PROVEDORES.items()}
+
+
+def obter(provedor):
+    return _disjuntores[provedor]
+
+
+def provedor_do_host(host):
+    """Nome do provedor atendido pelo host (None se não monitorado)."""
+    host = (host or '').lower()
+    for sufixo, nome in _POR_HOST.items():
+        if host == sufixo or host.endswith('.' + sufixo):
+            return nome
+    return None
+
+
+def disponivel(provedor):
+    """False se o circuito do provedor não está fechado (sem consumir sonda)."""
+    return obter(provedor).situacao()['estado'] == FECHADO
+
+
+@contextmanager
+def protegido(provedor):
+    """
+    Bloco que chama o provedor: levanta CircuitoAberto sem executar se o
+    circuito estiver aberto; exceção ou lentidão dentro dele conta como falha.
+    """
+    disjuntor = obter(provedor)
+    if not disjuntor.permitir():
+        raise CircuitoAberto(f"{provedor} indisponível (circuito aberto)")
+
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        disjuntor.registrar(False, time.perf_counter() - inicio)
+        raise
+    except BaseException:
+        disjuntor.liberar_sonda()
+        raise
+    disjuntor.registrar(True, time.perf_counter() - inicio)
+
+
+def estados():
+    """Situação de todos os provedores (página de status)."""
+    return {nome: d.situacao() for nome, d in _disjuntores.items()}
@@ -0,0 +1,255 @@
+"""
+Fila local de valuations (sem broker externo)
+- O pedido é gravado em ValuationJob e a requisição só devolve o id
+- Um pool de threads limitado (settings.VALUATION_WORKERS por processo)
+  executa os pedidos; o andamento (resultado parcial e textos da IA
+  crescendo) é gravado na linha para a página consultar
+- Jobs simultâneos do mesmo ticker (de usuários diferentes) compartilham
+  uma execução via services.singleflight; no mesmo processo todos recebem
+  o andamento, em outro processo só o resultado final
+- Pedido pendente de um processo que reiniciou é retomado por quem o
+  consultar
+- Profundidade da fila no envio, espera e duração de cada job ficam na
+  tabela (estatisticas())
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from investments.services import singleflight
+
+
+# Segundos entre gravações do progresso enquanto os textos da IA chegam
+INTERVALO_GRAVACAO = 1.0
+# Pendente há mais que isso e fora da fila deste processo: reenvia
+RETOMAR_APOS = timedelta(seconds=30)
+# Executando há mais que isso: o processo morreu no meio, marca como erro
+ABANDONADO_APOS = timedelta(minutes=10)
+# Jobs terminados considerados nas estatísticas de espera/duração
+AMOSTRA_ESTATISTICAS = 200
+
+# Campo do resultado que recebe cada texto transmitido
+TEXTOS = {'analise': 'ai_analysis', 'noticias': 'news_summary'}
+
+_executor = ThreadPoolExecutor(max_workers=settings.VALUATION_WORKERS, thread_name_prefix='rumo1m-fila')
+# Ids já enviados ao pool deste processo (evita reenviar a cada consulta)
+_na_fila = set()
+# Jobs em execução neste processo por ticker: todos recebem o andamento
+_inscritos = {}
+_trava_fila = threading.Lock()
+
+
+def _submeter(job_id):
+    with _trava_fila:
+        if job_id in _na_fila:
+            return
+        _na_fila.add(job_id)
+    _executor.submit(_executar, job_id)
+
+
+def _executar(job_id):
+    try:
+        executar_job(job_id)
+    except Exception as e:
+        print(f"[ERRO] Job de valuation {job_id}: {e}")
+        _finalizar(job_id, erro='Erro ao processar análise')
+    finally:
+        with _trava_fila:
+            _na_fila.discard(job_id)
+        # Conexões de banco abertas na thread do pool não devem ficar penduradas
+        connections.close_all()
+
+
+def enviar(usuario, ticker):
+    """
+    Coloca o valuation de 'ticker' na fila e devolve o ValuationJob.
+    Se o usuário já tem um job em andamento do mesmo ticker (clique
+    duplo), devolve esse em vez de criar outro.
+    """
+    from investments.models import StatusJob, ValuationJob
+
+    ativos = ValuationJob.objects.filter(status__in=[StatusJob.PENDENTE, StatusJob.EXECUTANDO])
+    existente = ativos.filter(usuario=usuario, ticker=ticker).first()
+    if existente:
+        return existente
+
+    job = ValuationJob.objects.create(
+        usuario=usuario,
+        ticker=ticker,
+        fila_no_envio=ativos.filter(status=StatusJob.PENDENTE).count(),
+    )
+    _submeter(job.pk)
+    return job
+
+
+# ------------------------------------------------------------
+# EXECUÇÃO (thread do pool)
+# ------------------------------------------------------------
+def _assumir(job_id):
+    """Marca o job como em execução; False se outro worker já o pegou."""
+    from investments.models import StatusJob, ValuationJob
+
+    return ValuationJob.objects.filter(pk=job_id, status=StatusJob.PENDENTE).update(
+        status=StatusJob.EXECUTANDO, iniciado_em=timezone.now(),
+    ) == 1
+
+
+def _gravar_progresso(ticker, resultado):
+    from investments.models import ValuationJob
+
+    with _trava_fila:
+        ids = list(_inscritos.get(ticker, ()))
+    ValuationJob.objects.filter(pk__in=ids).update(resultado=resultado)
+
+
+def _finalizar(job_id, resultado=None, erro=''):
+    from investments.models import StatusJob, ValuationJob
+
+    ValuationJob.objects.filter(pk=job_id, status=StatusJob.EXECUTANDO).update(
+        status=StatusJob.ERRO if erro else StatusJob.CONCLUIDO,
+        resultado=resultado,
+        erro=erro,
+        concluido_em=timezone.now(),
+    )
+
+
+def executar_job(job_id):
+    """
+    Executa o job (se ainda pendente). Jobs do mesmo ticker em andamento
+    ao mesmo tempo compartilham uma única execução de _transmitir.
+    """
+    from investments.models import ValuationJob
+
+    if not _assumir(job_id):
+        return
+
+    ticker = ValuationJob.objects.values_list('ticker', flat=True).get(pk=job_id)
+    with _trava_fila:
+        _inscritos.setdefault(ticker, set()).add(job_id)
+    try:
+        resultado, erro = singleflight.executar(
+            f"fila_valuation:{ticker}",
+            lambda: _transmitir(ticker),
+            espera=ABANDONADO_APOS.total_seconds(),
+        )
+    finally:
+        with _trava_fila:
+            inscritos = _inscritos.get(ticker, set())
+            inscritos.discard(job_id)
+            if not inscritos:
+                _inscritos.pop(ticker, None)
+
+    _finalizar(job_id, resultado=resultado, erro=erro)
+    if not erro:
+        print(f"[FILA] ✅ Valuation de {ticker} (job {job_id}) concluído")
+
+
+def _transmitir(ticker):
+    """
+    Roda transmitir_valuation do ticker, gravando nos jobs inscritos o
+    resultado assim que os números saem e os textos da IA a cada
+    INTERVALO_GRAVACAO segundos. Retorna (resultado, erro).
+    """
+    from investments.services.valuation_openai import transmitir_valuation
+
+    resultado = None
+    partes = {etapa: [] for etapa in TEXTOS}
+    gravado_em = time.monotonic()
+
+    for evento, dados in transmitir_valuation(ticker):
+        if evento == 'erro':
+            return None, dados['erro']
+
+        if evento == 'resultado':
+            resultado = dados
+            _gravar_progresso(ticker, resultado)
+            gravado_em = time.monotonic()
+
+        elif evento in TEXTOS:
+            partes[evento].append(dados['texto'])
+            resultado[TEXTOS[evento]] = ''.join(partes[evento])
+            if time.monotonic() - gravado_em >= INTERVALO_GRAVACAO:
+                _gravar_progresso(ticker, resultado)
+                gravado_em = time.monotonic()
+
+        elif evento == 'fim':
+            resultado.update(dados)
+            return resultado, ''
+
+    return None, 'Valuation interrompido'
+
+
+# ------------------------------------------------------------
+# CONSULTA (requisição da página)
+# ------------------------------------------------------------
+def consultar(job):
+    """
+    Andamento do job para a API. Retoma job pendente que ninguém está
+    executando e encerra job abandonado no meio da execução.
+    """
+    from investments.models import StatusJob, ValuationJob
+
+    agora = timezone.now()
+    if job.status == StatusJob.PENDENTE and agora - job.criado_em > RETOMAR_APOS:
+        _submeter(job.pk)
+    elif job.status == StatusJob.EXECUTANDO and agora - job.iniciado_em > ABANDONADO_APOS:
+        _finalizar(job.pk, erro='Valuation interrompido')
+        job.refresh_from_db()
+
+    situacao = {
+        'job_id': job.pk,
+        'ticker': job.ticker,
+        'status': job.status,
+        'resultado': job.resultado,
+    }
+    if job.status == StatusJob.PENDENTE:
+        situacao['posicao'] = ValuationJob.objects.filter(
+            status=StatusJob.PENDENTE, criado_em__lt=job.criado_em,
+        ).count() + 1
+    if job.status == StatusJob.ERRO:
+        situacao['erro'] = job.erro
+    return situacao
+
+
+# ------------------------------------------------------------
+# ESTATÍSTICAS
+# ------------------------------------------------------------
+def _resumo(valores):
+    """Média, mediana, p95 e máximo (segundos) de uma lista de durações."""
+    if not valores:
+        return {'media': None, 'p50': None, 'p95': None, 'maximo': None}
+    valores = sorted(valores)
+    percentil = lambda p: valores[min(len(valores) - 1, int(p * len(valores)))]
+    return {
+        'media': round(sum(valores) / len(valores), 2),
+        'p50': round(percentil(0.5), 2),
+        'p95': round(percentil(0.95), 2),
+        'maximo': round(valores[-1], 2),
+    }
+
+
+def estatisticas():
+    """Profundidade atual da fila e espera/duração dos últimos jobs terminados."""
+    from investments.models import StatusJob, ValuationJob
+
+    terminados = list(
+        ValuationJob.objects
+        .filter(status__in=[StatusJob.CONCLUIDO, StatusJob.ERRO], iniciado_em__isnull=False)
+        .order_by('-concluido_em')[:AMOSTRA_ESTATISTICAS]
+    )
+    return {
+        'pendentes': ValuationJob.objects.filter(status=StatusJob.PENDENTE).count(),
+        'executando': ValuationJob.objects.filter(status=StatusJob.EXECUTANDO).count(),
+        'workers_por_processo': settings.VALUATION_WORKERS,
+        'amostra': len(terminados),
+        'erros': sum(j.status == StatusJob.ERRO for j in terminados),
+        'fila_no_envio': _resumo([j.fila_no_envio for j in terminados]),
+        'espera_segundos': _resumo([j.espera for j in terminados]),
+        'duracao_segundos': _resumo([j.duracao for j in terminados]),
+    }
@@ -0,0 +1,264 @@
+"""
+Histórico diário de preços (OHLCV) dos tickers em carteira
+- Um arquivo binário por ticker em settings.HISTORICO_PRECOS_DIR, com
+  registros de tamanho fixo (dtype REGISTRO) em ordem de data
+- Preços ajustados por splits e dividendos (auto_adjust do yfinance)
+- Gravação por anexação (append) do que falta depois do último dia; o
+  último dia gravado é baixado de novo junto e, se o preço dele mudou
+  (split ou dividendo reajustou a série), o ticker é baixado inteiro e
+  o arquivo reescrito
+- Leitura por np.memmap: fatiar anos de histórico não carrega o arquivo
+  inteiro nem cria objetos do Django
+- Download em lote com um yf.download para vários tickers
+"""
+
+import os
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from investments.services import disjuntor
+
+
+REGISTRO = np.dtype([
+    ('data', 'M8[D]'),
+    ('abertura', '<f8'),
+    ('maxima', '<f8'),
+    ('minima', '<f8'),
+    ('fechamento', '<f8'),
+    ('volume', '<f8'),
+])
+CAMPOS = REGISTRO.names[1:]
+
+# Colunas do yf.download correspondentes a cada campo
+COLUNAS_YAHOO = {
+    'abertura': 'Open',
+    'maxima': 'High',
+    'minima': 'Low',
+    'fechamento': 'Close',
+    'volume': 'Volume',
+}
+
+# Primeira carga de um ticker novo
+ANOS_HISTORICO_INICIAL = 10
+TICKERS_POR_DOWNLOAD = 50
+# Diferença relativa no fechamento do dia já gravado que indica reajuste
+TOLERANCIA_AJUSTE = 1e-4
+
+_trava_escrita = threading.Lock()
+
+
+def _diretorio():
+    diretorio = Path(settings.HISTORICO_PRECOS_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def caminho(ticker):
+    return _diretorio() / f"{ticker.strip().upper()}.bin"
+
+
+# ------------------------------------------------------------
+# LEITURA (memmap)
+# ------------------------------------------------------------
+def ler(ticker):
+    """
+    Registros do ticker como array estruturado (REGISTRO) mapeado do disco,
+    somente leitura. Ticker sem histórico retorna array vazio.
+    """
+    arquivo = caminho(ticker)
+    quantidade = arquivo.stat().st_size // REGISTRO.itemsize if arquivo.exists() else 0
+    if not quantidade:
+        return np.empty(0, dtype=REGISTRO)
+    # Ignora um registro incompleto no fim (escrita interrompida)
+    return np.memmap(arquivo, dtype=REGISTRO, mode='r', shape=(quantidade,))
+
+
+def ultima_data(ticker):
+    """Último dia gravado do ticker (date) ou None."""
+    registros = ler(ticker)
+    return registros['data'][-1].astype(date) if len(registros) else None
+
+
+def _fatiar(registros, inicio=None, fim=None):
+    """Fatia por intervalo de datas usando busca binária (arquivo está em ordem)."""
+    datas = registros['data']
+    a = np.searchsorted(datas, np.datetime64(inicio, 'D')) if inicio else 0
+    b = np.searchsorted(datas, np.datetime64(fim, 'D'), side='right') if fim else len(registros)
+    return registros[a:b]
+
+
+def historico(tickers, inicio=None, fim=None, campo='fechamento'):
+    """
+    Série alinhada por data para vários tickers.
+
+    Retorna (datas, valores):
+    - datas: array datetime64[D] com a união dos dias de pregão em [inicio, fim]
+    - valores: matriz float64 (len(datas) x len(tickers)), NaN onde o
+      ticker não tem registro naquele dia
+    """
+    if campo not in CAMPOS:
+        raise ValueError(f"Campo inválido: {campo} (use um de {', '.join(CAMPOS)})")
+
+    fatias = [_fatiar(ler(t), inicio, fim) for t in tickers]
+    datas = np.unique(np.concatenate([f['data'] for f in fatias])) if fatias else np.empty(0, 'M8[D]')
+
+    valores = np.full((len(datas), len(tickers)), np.nan)
+    for coluna, fatia in enumerate(fatias):
+        if len(fatia):
+            valores[np.searchsorted(datas, fatia['data']), coluna] = fatia[campo]
+    return datas, valores
+
+
+# ------------------------------------------------------------
+# GRAVAÇÃO (anexa; reescreve só quando a série foi reajustada)
+# ------------------------------------------------------------
+def anexar(ticker, registros):
+    """
+    Anexa ao arquivo do ticker os registros posteriores ao último dia gravado.
+    Retorna a quantidade anexada.
+    """
+    registros = np.sort(np.asarray(registros, dtype=REGISTRO), order='data')
+    with _trava_escrita:
+        ultima = ultima_data(ticker)
+        if ultima is not None:
+            registros = registros[registros['data'] > np.datetime64(ultima, 'D')]
+        if not len(registros):
+            return 0
+        with open(caminho(ticker), 'ab') as arquivo:
+            arquivo.write(registros.tobytes())
+    return len(registros)
+
+
+def reescrever(ticker, registros):
+    """
+    Substitui o arquivo do ticker pelos registros (série reajustada).
+    Grava num temporário e troca de uma vez: leitores com memmap aberto
+    continuam vendo o arquivo antigo.
+    """
+    registros = np.sort(np.asarray(registros, dtype=REGISTRO), order='data')
+    destino = caminho(ticker)
+    temporario = destino.with_suffix('.tmp')
+    with _trava_escrita:
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(registros.tobytes())
+        os.replace(temporario, destino)
+    return len(registros)
+
+
+def reajustado(ticker, registros):
+    """
+    True se o último dia gravado veio nos registros baixados com outro
+    fechamento (split ou dividendo mudou os preços ajustados anteriores).
+    """
+    gravados = ler(ticker)
+    if not len(gravados):
+        return False
+    ultimo = gravados[-1]
+    mesmo_dia = registros[registros['data'] == ultimo['data']]
+    if not len(mesmo_dia):
+        return False
+    return not np.isclose(mesmo_dia['fechamento'][0], ultimo['fechamento'], rtol=TOLERANCIA_AJUSTE)
+
+
+# ------------------------------------------------------------
+# DOWNLOAD EM LOTE (yfinance)
+# ------------------------------------------------------------
+def baixar_historico(tickers, inicio, fim=None):
+    """
+    Baixa o OHLCV diário (ajustado por splits e dividendos) de vários
+    tickers num único yf.download.
+    Retorna dict {TICKER: array REGISTRO}; tickers sem dados ficam de fora.
+    """
+    import yfinance as yf
+
+    if not tickers:
+        return {}
+
+    fim = fim or date.today()
+    with disjuntor.protegido('yahoo'):
+        df = yf.download(
+            [f"{t}.SA" for t in tickers],
+            start=inicio.isoformat(),
+            end=(fim + timedelta(days=1)).isoformat(),
+            interval='1d',
+            group_by='ticker',
+            auto_adjust=True,
+            progress=False,
+            threads=True,
+        )
+    if df is None or df.empty:
+        return {}
+
+    resultados = {}
+    for ticker in tickers:
+        coluna = f"{ticker}.SA"
+        if coluna not in df.columns.get_level_values(0):
+            continue
+        dados = df[coluna].dropna(subset=['Close'])
+        if dados.empty:
+            continue
+
+        registros = np.empty(len(dados), dtype=REGISTRO)
+        registros['data'] = dados.index.values.astype('M8[D]')
+        for campo, coluna_yahoo in COLUNAS_YAHOO.items():
+            registros[campo] = dados[coluna_yahoo].to_numpy(dtype=np.float64, na_value=np.nan)
+        resultados[ticker] = registros
+    return resultados
+
+
+def atualizar_historico(tickers=None, ate=None):
+    """
+    Completa o histórico dos tickers (todos em carteira por padrão) até
+    'ate' (ontem por padrão: o pregão do dia ainda não fechou).
+    Cada download começa no último dia gravado, para conferir se a série
+    foi reajustada; tickers com o mesmo dia de início são baixados juntos
+    num yf.download.
+    Retorna dict {TICKER: registros novos}.
+    """
+    from investments.services.cotacoes import _normalizar_tickers, tickers_em_carteira
+
+    ate = ate or date.today() - timedelta(days=1)
+    tickers = _normalizar_tickers(tickers if tickers is not None else tickers_em_carteira())
+
+    # Agrupa por dia de início: tickers já em dia compartilham o mesmo pedido
+    grupos = {}
+    for ticker in tickers:
+        ultima = ultima_data(ticker)
+        inicio = ultima if ultima else ate - timedelta(days=365 * ANOS_HISTORICO_INICIAL)
+        if inicio <= ate:
+            grupos.setdefault(inicio, []).append(ticker)
+
+    novos = {t: 0 for t in tickers}
+    reajustar = []
+    for inicio, grupo in sorted(grupos.items()):
+        for lote, baixados in _baixar_em_lotes(grupo, inicio, ate):
+            for ticker, registros in baixados.items():
+                if reajustado(ticker, registros):
+                    reajustar.append(ticker)
+                else:
+                    novos[ticker] = anexar(ticker, registros)
+
+    # Série reajustada: baixa de novo desde o primeiro dia gravado e reescreve
+    if reajustar:
+        inicio = min(ler(t)['data'][0].astype(date) for t in reajustar)
+        for lote, baixados in _baixar_em_lotes(reajustar, inicio, ate):
+            for ticker, registros in baixados.items():
+                ultima = np.datetime64(ultima_data(ticker), 'D')
+                novos[ticker] = int((registros['data'] > ultima).sum())
+                reescrever(ticker, registros)
+                print(f"[HISTORICO] {ticker}: série reajustada (split/dividendo), arquivo reescrito")
+    return novos
+
+
+def _baixar_em_lotes(tickers, inicio, fim):
+    """Gera (lote, {TICKER: registros}) em downloads de até TICKERS_POR_DOWNLOAD tickers."""
+    for i in range(0, len(tickers), TICKERS_POR_DOWNLOAD):
+        lote = tickers[i:i + TICKERS_POR_DOWNLOAD]
+        try:
+            yield lote, baixar_historico(lote, inicio, fim)
+        except Exception as e:
+            print(f"[ERRO] Histórico yfinance ({','.join(lote)}): {e}")
@@ -1,77 +1,242 @@
 from datetime import date
 from dateutil.relativedelta import relativedelta
-from calendar import monthrange
-import requests
+import time
+import numpy as np
 from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+
+from investments.services import singleflight
+
+IPCA_INICIO_SERIE = date(2000, 1, 1)
+PRECISAO_INDICE = Decimal("1e-14")
+TAMANHO_LOTE_CORRECAO = 500
+
+# IBGE divulga o IPCA do mês M por volta do dia 10 de M+1 (o SGS atualiza no mesmo dia).
+# Datas exatas podem ser informadas em settings.IPCA_CALENDARIO_DIVULGACAO.
+DIA_DIVULGACAO_IPCA = 10
+# Se a divulgação atrasar, tenta de novo no máximo a cada 6 horas
+INTERVALO_RETENTATIVA_IPCA = 6 * 60 * 60
+
+
+def _competencia(ano, mes):
+    return date(ano, mes, 1)
+
+
+def _ordinal_mes(d):
+    return d.year * 12 + d.month - 1
+
+
+def _ultima_competencia_ipca():
+    from investments.models import IndiceIPCA
+
+    return (
+        IndiceIPCA.objects.order_by("-competencia")
+        .values_list("competencia", flat=True)
+        .first()
+    )
+
 
 # ------------------------------------------------------------
-# BUSCA IPCA NO BCB (usa formato DD/MM/YYYY e faz fallback)
+# CALENDÁRIO DE DIVULGAÇÃO DO IPCA (IBGE/BCB)
 # ------------------------------------------------------------
-def buscar_ipca(ano, mes, tentativas_max=12):
+def data_divulgacao_ipca(competencia):
     """
-    Busca o IPCA para (ano, mes) consultando o BCB e validando a data de cada item.
-    Retorna Decimal ou None se não encontrar dentro das tentativas.
-    
-    IMPORTANTE: Retorna None se o mês solicitado não tiver IPCA disponível,
-    mesmo que a API retorne dados de meses anteriores.
+    Data prevista de divulgação do IPCA da competência.
+    Usa settings.IPCA_CALENDARIO_DIVULGACAO ({"AAAA-MM": "AAAA-MM-DD"}) se
+    houver a data oficial; senão, o dia DIA_DIVULGACAO_IPCA do mês seguinte.
     """
-    tentativas = 0
-    ano_busca, mes_busca = ano, mes
-    
-    ultimo_dia = monthrange(ano_busca, mes_busca)[1]
+    calendario = getattr(settings, "IPCA_CALENDARIO_DIVULGACAO", {})
+    data_oficial = calendario.get(competencia.strftime("%Y-%m"))
+    if data_oficial:
+        return date.fromisoformat(data_oficial)
 
-    while tentativas < tentativas_max:
-        # Formato DD/MM/YYYY — o BCB aceita
-        url = (
-            f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.433/dados?"
-            f"formato=json&dataInicial=01/{mes_busca:02d}/{ano_busca}&dataFinal={ultimo_dia:02d}/{mes_busca:02d}/{ano_busca}"
-        )
-        
+    seguinte = competencia + relativedelta(months=1)
+    return date(seguinte.year, seguinte.month, DIA_DIVULGACAO_IPCA)
+
+
+def ultima_competencia_publicada(hoje=None):
+    """Último mês cujo IPCA já deve ter sido divulgado segundo o calendário."""
+    hoje = hoje or date.today()
+    competencia = _competencia(hoje.year, hoje.month) - relativedelta(months=1)
+    while data_divulgacao_ipca(competencia) > hoje:
+        competencia -= relativedelta(months=1)
+    return competencia
+
+
+def _garantir_ipca_ate(fim):
+    """
+    Sincroniza uma vez se o mês 'fim' faltar na tabela.
+    Meses que pelo calendário ainda não foram divulgados não geram requisição,
+    e uma sincronização sem resultado fica em cache até a próxima tentativa.
+    Retorna a última competência gravada (None se a tabela estiver vazia).
+    """
+    hoje = date.today()
+    fim = min(_competencia(fim.year, fim.month), ultima_competencia_publicada(hoje))
+    ultima = _ultima_competencia_ipca()
+    if ultima is not None and ultima >= fim:
+        return ultima
+
+    chave_cache = f"ipca:indisponivel:{fim:%Y-%m}"
+    if cache.get(chave_cache):
+        return ultima
+
+    # Várias requisições sem o mês disparam uma única sincronização
+    singleflight.executar("ipca:sincronizar", sincronizar_ipca, espera=60)
+
+    ultima = _ultima_competencia_ipca()
+    if ultima is None or ultima < fim:
+        # Divulgação atrasada: não consulta de novo antes da próxima data prevista
+        # (ou do intervalo de retentativa, o que vier primeiro)
+        proxima = data_divulgacao_ipca(fim + relativedelta(months=1))
+        segundos = min(INTERVALO_RETENTATIVA_IPCA, max((proxima - hoje).days, 1) * 24 * 60 * 60)
+        cache.set(chave_cache, True, timeout=segundos)
+    return ultima
+
+
+# ------------------------------------------------------------
+# SINCRONIZA A SÉRIE DO IPCA (uma única requisição em lote ao BCB)
+# ------------------------------------------------------------
+def sincronizar_ipca(ate=None, baixar=True):
+    """
+    Sincroniza a série 433 do SGS (uma só consulta por intervalo, via
+    services.sgs) e deriva em IndiceIPCA os meses posteriores ao último
+    já gravado, com variação em fração e número-índice acumulado.
+    Com baixar=False só deriva dos pontos já gravados em ValorIndice.
+    Retorna a quantidade de meses novos gravados.
+    """
+    from investments.models import IndiceIPCA
+    from investments.services import sgs
+
+    if baixar:
         try:
-            resp = requests.get(url, timeout=6).json()
+            sgs.sincronizar_serie("IPCA", ate)
         except Exception as e:
-            print(f"[ERRO REQ IPCA] {ano_busca}-{mes_busca}: {e}")
-            return None
-
-        # Valida se veio lista
-        if not isinstance(resp, list) or len(resp) == 0:
-            # Se não veio lista ou veio vazia, retrocede e tenta de novo
-            dt = date(ano_busca, mes_busca, 1) - relativedelta(months=1)
-            ano_busca, mes_busca = dt.year, dt.month
-            tentativas += 1
-            continue
-
-        # Filtragem explícita: pegar apenas itens cujo campo "data" pertence ao mês/ano SOLICITADO
-        itens_mes = []
-        for item in resp:
-            d = item.get("data", "")
-            try:
-                dia_s, mes_s, ano_s = d.split("/")
-                ano_i = int(ano_s)
-                mes_i = int(mes_s)
-            except Exception:
-                continue
-
-            # IMPORTANTE: Só aceita se for EXATAMENTE o mês/ano SOLICITADO (não o de busca)
-            if ano_i == ano and mes_i == mes:
-                itens_mes.append(item)
-
-        # Se achar linhas exatamente do mês/ano SOLICITADO, usa a última
-        if itens_mes:
-            valor_str = itens_mes[-1].get("valor", "0").replace(",", ".")
-            try:
-                return Decimal(valor_str) / 100
-            except Exception:
-                return None
-
-        # Se não encontrou item exatamente do (ano, mes) SOLICITADO:
-        # NÃO usa fallback! Retorna None para indicar que não tem IPCA disponível
+            print(f"[ERRO REQ IPCA] {e}")
+
+    ultimo = IndiceIPCA.objects.order_by("-competencia").first()
+    inicio = ultimo.competencia + relativedelta(months=1) if ultimo else IPCA_INICIO_SERIE
+
+    # Número-índice acumulado continua a partir do último mês gravado
+    acumulado = ultimo.numero_indice if ultimo else Decimal(1)
+    novos = []
+    for data, valor in sgs.valores_serie("IPCA", inicio=inicio, fim=ate):
+        variacao = valor / 100
+        acumulado = (acumulado * (1 + variacao)).quantize(PRECISAO_INDICE)
+        novos.append(IndiceIPCA(
+            competencia=_competencia(data.year, data.month),
+            variacao=variacao,
+            numero_indice=acumulado,
+        ))
+
+    IndiceIPCA.objects.bulk_create(novos, ignore_conflicts=True)
+    if novos:
+        print(f"[IPCA] {len(novos)} mês(es) novo(s) gravado(s) até {novos[-1].competencia:%m/%Y}")
+        atualizar_planejamentos()
+    return len(novos)
+
+
+# ------------------------------------------------------------
+# LÊ O IPCA DE UM INTERVALO DA TABELA (sincroniza só o que falta)
+# ------------------------------------------------------------
+def carregar_ipca(inicio, fim):
+    """
+    Retorna dict {competencia: Decimal} com o IPCA dos meses em [inicio, fim].
+    Se algum mês do intervalo ainda não estiver na tabela (e já puder ter
+    sido divulgado), faz uma única sincronização antes de ler.
+    """
+    from investments.models import IndiceIPCA
+
+    inicio = _competencia(inicio.year, inicio.month)
+    fim = min(_competencia(fim.year, fim.month), ultima_competencia_publicada())
+    if inicio > fim:
+        return {}
+
+    _garantir_ipca_ate(fim)
+
+    return dict(
+        IndiceIPCA.objects.filter(competencia__gte=inicio, competencia__lte=fim)
+        .values_list("competencia", "variacao")
+    )
+
+
+# ------------------------------------------------------------
+# BUSCA IPCA DE UM MÊS (tabela local, rede só para mês ainda não gravado)
+# ------------------------------------------------------------
+def buscar_ipca(ano, mes):
+    """
+    Busca o IPCA para (ano, mes) na tabela IndiceIPCA.
+    Retorna Decimal ou None se o mês ainda não tiver sido divulgado.
+    Mês que pelo calendário do IBGE ainda não saiu não faz nenhuma requisição.
+    
+    IMPORTANTE: Retorna None se o mês solicitado não tiver IPCA disponível,
+    mesmo que existam dados de meses anteriores.
+    """
+    competencia = _competencia(ano, mes)
+    ipca = carregar_ipca(competencia, competencia).get(competencia)
+
+    if ipca is None:
         print(f"[INFO] IPCA de {mes:02d}/{ano} ainda não disponível no BCB.")
-        return None
+    return ipca
+
+
+# ------------------------------------------------------------
+# ÍNDICE ACUMULADO: fator entre dois meses = divisão de dois números-índice
+# ------------------------------------------------------------
+class IndiceAcumulado:
+    """
+    Número-índice acumulado do IPCA carregado em memória (NumPy).
+
+    acumulados[k] é o produto de (1 + IPCA) dos k primeiros meses da série,
+    com acumulados[0] = 1. Corrigir um valor do mês A até o mês B (aplicando
+    o IPCA de A até B-1) é acumulados[pos(B)] / acumulados[pos(A)].
+    Meses ainda não divulgados ficam com o último índice conhecido.
+    """
+
+    def __init__(self, primeira_competencia, numeros_indice):
+        self.primeiro_ordinal = _ordinal_mes(primeira_competencia) if primeira_competencia else 0
+        self.acumulados = np.concatenate(([1.0], np.asarray(numeros_indice, dtype=np.float64)))
+
+    @classmethod
+    def carregar(cls, ate=None):
+        """Lê a série inteira numa consulta, sincronizando antes se faltar o mês anterior a 'ate'."""
+        from investments.models import IndiceIPCA
+
+        ate = ate or date.today()
+        _garantir_ipca_ate(_competencia(ate.year, ate.month) - relativedelta(months=1))
+
+        linhas = list(IndiceIPCA.objects.order_by("competencia").values_list("competencia", "numero_indice"))
+        if not linhas:
+            return cls(None, [])
+        return cls(linhas[0][0], [float(n) for _, n in linhas])
+
+    def _posicoes(self, ordinais):
+        return np.clip(np.asarray(ordinais) - self.primeiro_ordinal, 0, len(self.acumulados) - 1)
+
+    def fatores(self, ordinais_inicio, ordinal_ate):
+        """Fatores de correção (vetorizados) de cada mês em ordinais_inicio até ordinal_ate."""
+        pos_ate = self._posicoes(ordinal_ate)
+        # Datas posteriores a 'ate' não são corrigidas (fator 1)
+        pos_inicio = np.minimum(self._posicoes(ordinais_inicio), pos_ate)
+        return self.acumulados[pos_ate] / self.acumulados[pos_inicio]
+
+    def fator(self, inicio, ate):
+        return float(self.fatores(_ordinal_mes(inicio), _ordinal_mes(ate)))
+
+
+def corrigir_valores(pares, ate=None, indice=None):
+    """
+    Corrige uma lista de (valor, data) pelo IPCA, do mês de cada data até o
+    mês de 'ate' (hoje, por padrão), numa única operação NumPy.
+    Retorna np.ndarray de floats na mesma ordem de 'pares'.
+    """
+    ate = ate or date.today()
+    indice = indice or IndiceAcumulado.carregar(ate)
+
+    valores = np.fromiter((float(v) for v, _ in pares), dtype=np.float64, count=len(pares))
+    ordinais = np.fromiter((_ordinal_mes(d) for _, d in pares), dtype=np.int64, count=len(pares))
 
-    # Se passou todas as tentativas → retorna None
-    print(f"[ERRO IPCA] Não encontrou IPCA para {mes}/{ano} após retroceder {tentativas_max} meses.")
-    return None
+    return valores * indice.fatores(ordinais, _ordinal_mes(ate))
 
 
 # ------------------------------------------------------------
@@ -82,20 +247,29 @@ def fator_correção_ate(ano_inicio, mes_inicio, ano_ate, mes_ate):
     """
     Retorna Decimal fator que deve multiplicar o valor nominal para corrigi-lo
     desde (ano_inicio, mes_inicio) até (ano_ate, mes_ate).
-    A lógica: para avançar um mês, aplica-se o IPCA do mês corrente (mês_inicio),
-    então avança. Repete até (ano_ate, mes_ate) ser alcançado.
+    Equivale a aplicar o IPCA de cada mês de inicio até ate-1, mas é
+    calculado como a razão entre os números-índice acumulados de ate-1 e
+    inicio-1. Meses ainda não divulgados não corrigem o valor.
     """
-    fator = Decimal(1)
-    ano, mes = ano_inicio, mes_inicio
+    from investments.models import IndiceIPCA
 
-    # enquanto (ano,mes) < (ano_ate, mes_ate) aplicar ipca do mês atual e avançar
-    while (ano < ano_ate) or (ano == ano_ate and mes < mes_ate):
-        ipca = buscar_ipca(ano, mes)
-        fator *= (1 + ipca)
-        prox = date(ano, mes, 1) + relativedelta(months=1)
-        ano, mes = prox.year, prox.month
+    inicio = _competencia(ano_inicio, mes_inicio)
+    ate = _competencia(ano_ate, mes_ate)
+    if inicio >= ate:
+        return Decimal(1)
 
-    return fator
+    _garantir_ipca_ate(ate - relativedelta(months=1))
+
+    def indice_antes_de(competencia):
+        numero = (
+            IndiceIPCA.objects.filter(competencia__lt=competencia)
+            .order_by("-competencia")
+            .values_list("numero_indice", flat=True)
+            .first()
+        )
+        return numero if numero is not None else Decimal(1)
+
+    return indice_antes_de(ate) / indice_antes_de(inicio)
 
 
 # ------------------------------------------------------------
@@ -106,34 +280,148 @@ def corrigir_historico(aportes, salvar=True):
     Recebe queryset de aportes ordenados por data (ou não) e retorna:
       historico: lista de valores corrigidos (float) na ordem cronológica dos aportes
       fator_total: fator acumulado até o mês atual (float), referente ao último aporte
-    Observação: para cada aporte, corrige desde seu mês até o mês atual (aplicando IPCA mês a mês).
+    Observação: para cada aporte, corrige desde seu mês até o mês atual, numa
+    única operação vetorizada sobre o índice acumulado do IPCA.
     """
     hoje = date.today()
-    ano_ate, mes_ate = hoje.year, hoje.month
-
-    historico = []
-    fator_total = Decimal(1)
+    aportes = list(aportes.order_by("data"))
+    if not aportes:
+        return [], 1.0
 
-    for aporte in aportes.order_by("data"):
-        ano0, mes0 = aporte.data.year, aporte.data.month
-        fator = fator_correção_ate(ano0, mes0, ano_ate, mes_ate)
-        corrigido = Decimal(aporte.valor) * fator
-        historico.append(float(corrigido))
+    indice = IndiceAcumulado.carregar(hoje)
+    corrigidos = corrigir_valores([(a.valor, a.data) for a in aportes], ate=hoje, indice=indice)
+    historico = corrigidos.tolist()
 
-        if salvar:
-            # tenta salvar valor_corrigido se o campo existir no model
-            try:
-                aporte.valor_corrigido = corrigido
-                aporte.save(update_fields=["valor_corrigido"])
-            except Exception:
-                # se o model não tiver o campo, ignora
-                pass
+    if salvar:
+        _gravar_valores_corrigidos(aportes, historico)
 
-        fator_total = fator  # último fator corresponde ao último aporte
+    # último fator corresponde ao último aporte
+    fator_total = indice.fator(aportes[-1].data, hoje)
 
     return historico, float(fator_total)
 
 
+def _gravar_valores_corrigidos(aportes, corrigidos, tamanho_lote=TAMANHO_LOTE_CORRECAO):
+    """Grava valor_corrigido de todos os aportes com bulk_update em lotes, numa transação."""
+    from django.db import transaction
+    from investments.models import Aporte
+
+    for aporte, corrigido in zip(aportes, corrigidos):
+        aporte.valor_corrigido = Decimal(f"{corrigido:.2f}")
+
+    with transaction.atomic():
+        Aporte.objects.bulk_update(aportes, ["valor_corrigido"], batch_size=tamanho_lote)
+
+
+# ------------------------------------------------------------
+# Correção em lote de valor_corrigido (por usuário ou tabela inteira)
+# ------------------------------------------------------------
+def corrigir_aportes_em_lote(aportes, ate=None, tamanho_lote=TAMANHO_LOTE_CORRECAO):
+    """
+    Recalcula valor_corrigido de todos os aportes do queryset numa única
+    passada vetorizada e grava com bulk_update em lotes dentro de uma transação.
+    Retorna dict com linhas, segundos e linhas_por_segundo.
+    """
+    inicio = time.perf_counter()
+    ate = ate or date.today()
+
+    aportes = list(aportes.only("id", "data", "valor").order_by("pk"))
+    if aportes:
+        corrigidos = corrigir_valores([(a.valor, a.data) for a in aportes], ate=ate)
+        _gravar_valores_corrigidos(aportes, corrigidos.tolist(), tamanho_lote)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "linhas": len(aportes),
+        "segundos": segundos,
+        "linhas_por_segundo": len(aportes) / segundos if segundos > 0 else 0.0,
+    }
+
+
+def corrigir_aportes_usuario(usuario, ate=None, tamanho_lote=TAMANHO_LOTE_CORRECAO):
+    """Recalcula valor_corrigido de todos os aportes de um usuário."""
+    from investments.models import Aporte
+
+    return corrigir_aportes_em_lote(Aporte.objects.filter(usuario=usuario), ate, tamanho_lote)
+
+
+# ------------------------------------------------------------
+# Valor corrigido materializado do PlanejamentoMensal
+# ------------------------------------------------------------
+def _carregar_numeros_indice():
+    from investments.models import IndiceIPCA
+
+    return dict(IndiceIPCA.objects.values_list("competencia", "numero_indice"))
+
+
+def avancar_planejamento(planejamento, numeros_indice, hoje=None):
+    """
+    Avança planejamento.valor_corrigido (em memória) com os meses de IPCA
+    gravados depois de ultimo_ipca_aplicado e anteriores ao mês atual.
+    numeros_indice: dict {competencia: numero_indice}.
+    Retorna True se o planejamento mudou.
+    """
+    hoje = hoje or date.today()
+    inicio = _competencia(planejamento.data_inicio.year, planejamento.data_inicio.month)
+
+    if planejamento.valor_corrigido is None:
+        planejamento.valor_corrigido = planejamento.valor_planejado
+        planejamento.ultimo_ipca_aplicado = None
+        alterado = True
+    else:
+        alterado = False
+
+    base = planejamento.ultimo_ipca_aplicado or inicio - relativedelta(months=1)
+    limite = _competencia(hoje.year, hoje.month) - relativedelta(months=1)
+
+    # Avança mês a mês enquanto houver IPCA publicado em sequência
+    alvo = base
+    while alvo < limite and (alvo + relativedelta(months=1)) in numeros_indice:
+        alvo += relativedelta(months=1)
+
+    if alvo == base:
+        return alterado
+
+    # Sempre a partir do valor planejado e dos números-índice gravados,
+    # arredondando uma vez só: avançar aos poucos não acumula centavos
+    fator = numeros_indice[alvo] / numeros_indice.get(inicio - relativedelta(months=1), Decimal(1))
+    planejamento.valor_corrigido = round(Decimal(planejamento.valor_planejado) * fator, 2)
+    planejamento.ultimo_ipca_aplicado = alvo
+    return True
+
+
+def atualizar_planejamentos(tamanho_lote=TAMANHO_LOTE_CORRECAO):
+    """Avança o valor corrigido de todos os planejamentos (chamado quando chega IPCA novo)."""
+    from investments.models import PlanejamentoMensal
+
+    numeros_indice = _carregar_numeros_indice()
+    alterados = [p for p in PlanejamentoMensal.objects.all() if avancar_planejamento(p, numeros_indice)]
+    PlanejamentoMensal.objects.bulk_update(
+        alterados, ["valor_corrigido", "ultimo_ipca_aplicado"], batch_size=tamanho_lote
+    )
+    return len(alterados)
+
+
+def atualizar_planejamento_corrigido(planejamento):
+    """
+    Garante que o valor corrigido materializado de um planejamento está em dia.
+    Custo normal: uma consulta (último IPCA gravado); só recalcula e grava
+    se houver mês novo ou se o valor ainda não tiver sido materializado.
+    """
+    hoje = date.today()
+    limite = _competencia(hoje.year, hoje.month) - relativedelta(months=1)
+    ultima = _garantir_ipca_ate(limite)
+
+    inicio = _competencia(planejamento.data_inicio.year, planejamento.data_inicio.month)
+    base = planejamento.ultimo_ipca_aplicado or inicio - relativedelta(months=1)
+    em_dia = planejamento.valor_corrigido is not None and (ultima is None or base >= min(ultima, limite))
+    if em_dia:
+        return
+
+    if avancar_planejamento(planejamento, _carregar_numeros_indice(), hoje):
+        planejamento.save(update_fields=["valor_corrigido", "ultimo_ipca_aplicado"])
+
+
 # ------------------------------------------------------------
 # Calcula o próximo aporte sugerido a partir do último aporte
 # Aplicando IPCA do mês anterior para cada avanço de mês até o mês atual
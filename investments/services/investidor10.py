@@ -0,0 +1,209 @@
+"""
+Leitura dos indicadores da página de ações do Investidor10
+- Download da página do ticker com cache próprio: corpo comprimido +
+  ETag/Last-Modified, GET condicional (304 reaproveita o corpo) e
+  intervalo mínimo entre acessos ao site por ticker
+- Parser estrutural por seletores CSS (cards do topo e tabela de
+  indicadores), sem IA: milissegundos por página
+- Validação do que foi lido; quem chama usa a IA só se falhar
+- Contadores de qual caminho resolveu cada extração (parser / IA / falha)
+"""
+
+import re
+import time
+import zlib
+
+from django.core.cache import cache
+
+from investments.services import cliente_http
+
+
+URL_ACAO = "https://investidor10.com.br/acoes/{}/"
+
+# Headers para simular navegador
+CABECALHOS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Referer': 'https://www.google.com/',
+}
+
+# Página baixada/revalidada há menos que isso (segundos) nem pergunta ao site
+INTERVALO_MINIMO = 10 * 60
+# Por quanto tempo o corpo fica guardado para revalidação condicional
+VALIDADE_PAGINA = 7 * 24 * 60 * 60
+ORIGENS = ('baixada', 'nao_modificada', 'cache', 'erro_cache')
+
+# Cards do topo da página: <div class="_card cotacao"> ... <div class="_card-body"><span>R$ 37,45</span>
+SELETORES_CARDS = {
+    'preco': '#cards-ticker ._card.cotacao ._card-body span',
+    'pl': '#cards-ticker ._card.pl ._card-body span',
+    'dy': '#cards-ticker ._card.dy ._card-body span',
+}
+
+# Tabela "Indicadores fundamentalistas": <div class="cell"><span>ROE ...</span><div class="value"><span>…</span>
+SELETOR_CELULAS = '#table-indicators .cell'
+ROTULOS_INDICADORES = {
+    'pl': 'P/L',
+    'dy': 'DIVIDEND YIELD',
+    'roe': 'ROE',
+    'lpa': 'LPA',
+    'vpa': 'VPA',
+}
+
+# ids dos elementos lidos (o parser ignora o resto da página)
+BLOCOS = ['cards-ticker', 'table-indicators']
+
+CAMPOS = ('preco', 'lpa', 'pl', 'roe', 'dy', 'vpa')
+EVENTOS = ('parser', 'ia', 'falha')
+
+
+# ------------------------------------------------------------
+# PÁGINA DO TICKER (cache com GET condicional)
+# ------------------------------------------------------------
+def url_acao(ticker):
+    return URL_ACAO.format(ticker.strip().lower())
+
+
+def _chave_pagina(ticker):
+    return f"investidor10:pagina:{ticker.strip().upper()}"
+
+
+def _contar_pagina(origem):
+    _incrementar(f"investidor10:pagina:{origem}")
+
+
+def baixar_pagina(ticker, timeout=10):
+    """
+    HTML da página de ações do ticker. Retorna (status_code, html).
+    - Revalidada há menos de INTERVALO_MINIMO: devolve a guardada, sem rede
+    - Senão GET condicional com o ETag/Last-Modified guardados; no 304
+      reaproveita o corpo guardado
+    - 200 grava o corpo (zlib) e os validadores novos
+    - Erro de rede com página guardada: devolve a guardada
+    """
+    chave = _chave_pagina(ticker)
+    guardada = cache.get(chave)
+    agora = time.time()
+
+    if guardada and agora - guardada['validada_em'] < INTERVALO_MINIMO:
+        _contar_pagina('cache')
+        return 200, zlib.decompress(guardada['corpo']).decode('utf-8')
+
+    cabecalhos = dict(CABECALHOS)
+    if guardada and guardada['etag']:
+        cabecalhos['If-None-Match'] = guardada['etag']
+    if guardada and guardada['last_modified']:
+        cabecalhos['If-Modified-Since'] = guardada['last_modified']
+
+    try:
+        response = cliente_http.get(url_acao(ticker), headers=cabecalhos, timeout=timeout)
+    except Exception as e:
+        if not guardada:
+            raise
+        print(f"[ERRO] Investidor10 {ticker}: {e} (usando página guardada)")
+        _contar_pagina('erro_cache')
+        return 200, zlib.decompress(guardada['corpo']).decode('utf-8')
+
+    if response.status_code == 304 and guardada:
+        guardada['validada_em'] = agora
+        cache.set(chave, guardada, VALIDADE_PAGINA)
+        _contar_pagina('nao_modificada')
+        return 200, zlib.decompress(guardada['corpo']).decode('utf-8')
+
+    if response.status_code != 200:
+        return response.status_code, response.text
+
+    cache.set(chave, {
+        'corpo': zlib.compress(response.text.encode('utf-8')),
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'validada_em': agora,
+    }, VALIDADE_PAGINA)
+    _contar_pagina('baixada')
+    return 200, response.text
+
+
+# ------------------------------------------------------------
+# PARSER DOS INDICADORES
+# ------------------------------------------------------------
+def _numero(texto):
+    """'R$ 1.234,56' / '14,38%' / '-5,2' -> float; '-' (sem dado) -> 0.0; ilegível -> None."""
+    texto = (texto or '').replace('R$', '').replace('%', '').replace('\xa0', ' ').strip()
+    if texto in ('-', '--', 'N/A', ''):
+        return 0.0 if texto else None
+    texto = texto.replace('.', '').replace(',', '.')
+    if not re.fullmatch(r'-?\d+(\.\d+)?', texto):
+        return None
+    return float(texto)
+
+
+def _rotulo(celula):
+    rotulo = celula.select_one('span')
+    # O rótulo vem como "P/L  ⓘ" ou "DIVIDEND YIELD (DY)": compara só o começo
+    return ' '.join(rotulo.get_text(' ', strip=True).upper().split()) if rotulo else ''
+
+
+def parsear_indicadores(html):
+    """
+    Lê preço, LPA, P/L, ROE, DY e VPA do HTML da página do ticker.
+    Retorna dict {campo: float | None}; None = não encontrado / ilegível.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    # Só monta a árvore dos dois blocos que interessam (o resto da página é ignorado)
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(id=BLOCOS))
+    dados = dict.fromkeys(CAMPOS)
+
+    for campo, seletor in SELETORES_CARDS.items():
+        elemento = soup.select_one(seletor)
+        if elemento:
+            dados[campo] = _numero(elemento.get_text(strip=True))
+
+    for celula in soup.select(SELETOR_CELULAS):
+        rotulo = _rotulo(celula)
+        valor = celula.select_one('.value span') or celula.select_one('.value')
+        for campo, esperado in ROTULOS_INDICADORES.items():
+            if dados[campo] is None and valor and (rotulo == esperado or rotulo.startswith(esperado + ' ')):
+                dados[campo] = _numero(valor.get_text(strip=True))
+
+    return dados
+
+
+def validar(dados):
+    """Mesmas exigências da extração por IA: todos os campos lidos, preço e LPA não nulos."""
+    return all(dados.get(c) is not None for c in CAMPOS) and dados['preco'] > 0 and dados['lpa'] != 0
+
+
+# ------------------------------------------------------------
+# CONTADORES (compartilhados entre processos)
+# ------------------------------------------------------------
+def _incrementar(chave):
+    cache.add(chave, 0, timeout=None)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, 1, timeout=None)
+
+
+def contar(evento):
+    _incrementar(f"investidor10:extracao:{evento}")
+
+
+def estatisticas():
+    """
+    Extrações resolvidas pelo parser, pela IA (fallback) ou que falharam,
+    a taxa de cada uma e de onde veio cada página (rede, 304 ou cache).
+    """
+    valores = cache.get_many(
+        [f"investidor10:extracao:{e}" for e in EVENTOS]
+        + [f"investidor10:pagina:{o}" for o in ORIGENS]
+    )
+    contagem = {e: valores.get(f"investidor10:extracao:{e}", 0) for e in EVENTOS}
+    total = sum(contagem.values())
+    return {
+        **contagem,
+        'total': total,
+        'taxas': {e: round(n / total, 3) if total else 0 for e, n in contagem.items()},
+        'paginas': {o: valores.get(f"investidor10:pagina:{o}", 0) for o in ORIGENS},
+    }
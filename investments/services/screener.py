@@ -0,0 +1,299 @@
+"""
+Screener de ações por fundamentos (Bazin, Graham e Lynch)
+- Fundamentos de todos os ValuationSnapshot em colunas NumPy, mantidas em
+  memória e recarregadas só quando algum snapshot ou cotação muda
+- Os três métodos e a votação calculados sobre as colunas inteiras, numa
+  passada, com as mesmas regras de valuation_openai.calcular_metodos
+- Preço de CotacaoAtual quando for mais recente que o do snapshot
+- Carga dos fundamentos do universo de ações pelo parser do Investidor10
+  (sem IA), para o screener cobrir a B3 e não só os tickers já consultados
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Count, Max
+from django.utils import timezone
+
+
+CAMPOS = ('preco', 'lpa', 'pl', 'roe', 'dy', 'vpa')
+METODOS = ('bazin', 'graham', 'lynch')
+
+# Códigos de status nas colunas (STATUS[codigo] = texto usado na API)
+INSUFICIENTE, COMPRAR, AGUARDAR, VENDER = range(4)
+STATUS = np.array(['DADOS_INSUFICIENTES', 'COMPRAR', 'AGUARDAR', 'VENDER'])
+EMOJIS = np.array(['🟡', '🟢', '🟡', '🔴'])
+
+# Colunas aceitas em ?ordenar= (sinal '-' = decrescente)
+ORDENACOES = ('pontos', 'margem_bazin', 'margem_graham', 'margem_lynch', 'peg', 'dy', 'pl', 'roe')
+LIMITE_PADRAO = 50
+
+_trava = threading.Lock()
+_cache = {'versao': None, 'colunas': None}
+
+
+# ------------------------------------------------------------
+# CARGA DAS COLUNAS
+# ------------------------------------------------------------
+def _versao():
+    """Muda sempre que um snapshot ou cotação é gravado (2 consultas de agregação)."""
+    from investments.models import CotacaoAtual, ValuationSnapshot
+
+    snapshots = ValuationSnapshot.objects.aggregate(n=Count('id'), em=Max('atualizado_em'))
+    return snapshots['n'], snapshots['em'], CotacaoAtual.objects.aggregate(em=Max('atualizado_em'))['em']
+
+
+def carregar_colunas():
+    """
+    Fundamentos de todos os snapshots como dict de arrays:
+    'ticker' (str) e um float64 por campo de CAMPOS.
+    """
+    from investments.models import CotacaoAtual, ValuationSnapshot
+
+    linhas = list(
+        ValuationSnapshot.objects.exclude(fundamentos={})
+        .values_list('ticker', 'fundamentos', 'preco', 'preco_em')
+    )
+    cotacoes = {
+        c['ticker']: c for c in
+        CotacaoAtual.objects.filter(ticker__in=[l[0] for l in linhas]).values('ticker', 'preco', 'atualizado_em')
+    }
+
+    colunas = {'ticker': np.array([l[0] for l in linhas], dtype=str)}
+    for campo in CAMPOS:
+        colunas[campo] = np.array([float(l[1].get(campo) or 0) for l in linhas], dtype=np.float64)
+
+    for i, (ticker, _, preco, preco_em) in enumerate(linhas):
+        cotacao = cotacoes.get(ticker)
+        if cotacao and cotacao['preco'] and (preco_em is None or cotacao['atualizado_em'] > preco_em):
+            preco = cotacao['preco']
+        if preco:
+            colunas['preco'][i] = float(preco)
+    return colunas
+
+
+def obter_colunas():
+    """Colunas em memória do processo, recarregadas quando _versao() muda."""
+    versao = _versao()
+    if _cache['versao'] != versao:
+        with _trava:
+            if _cache['versao'] != versao:
+                _cache['colunas'] = carregar_colunas()
+                _cache['versao'] = versao
+    return _cache['colunas']
+
+
+# ------------------------------------------------------------
+# MÉTODOS VETORIZADOS
+# ------------------------------------------------------------
+def avaliar(colunas):
+    """
+    Bazin, Graham, Lynch e a recomendação geral para todas as linhas de
+    uma vez. Retorna dict de arrays: preços-alvo, margens (%), PEG e os
+    códigos de status (INSUFICIENTE / COMPRAR / AGUARDAR / VENDER).
+    """
+    preco, lpa, pl, roe, dy, vpa = (colunas[c] for c in CAMPOS)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # BAZIN: preço teto = DPA / 6%
+        tem_dy = dy > 0
+        bazin_teto = np.where(tem_dy, dy / 100 * preco / 0.06, np.nan)
+        bazin = np.select(
+            [~tem_dy, preco <= bazin_teto, preco <= bazin_teto * 1.05],
+            [INSUFICIENTE, COMPRAR, AGUARDAR], VENDER,
+        )
+
+        # GRAHAM: √(22,5 × LPA × VPA), ou LPA × 15 sem VPA
+        tem_lpa = lpa > 0
+        com_vpa = tem_lpa & (vpa > 0)
+        graham_justo = np.where(com_vpa, np.sqrt(22.5 * lpa * vpa), np.where(tem_lpa, lpa * 15, np.nan))
+        desconto = np.where(com_vpa, 0.66, 0.75)
+        graham = np.select(
+            [~tem_lpa, preco <= graham_justo * desconto, preco <= graham_justo],
+            [INSUFICIENTE, COMPRAR, AGUARDAR], VENDER,
+        )
+
+        # LYNCH: PEG = P/L ÷ ROE; preço ideal = LPA × ROE
+        tem_peg = (pl > 0) & (roe > 0)
+        peg = np.where(tem_peg, pl / roe, np.nan)
+        lynch_ideal = np.where(tem_peg, lpa * roe, np.nan)
+        lynch = np.select(
+            [~tem_peg, peg <= 1.0, peg <= 1.5],
+            [INSUFICIENTE, COMPRAR, AGUARDAR], VENDER,
+        )
+
+        margem = lambda alvo: np.where(alvo > 0, (alvo - preco) / alvo * 100, np.nan)
+        resultado = {
+            'bazin_teto': bazin_teto,
+            'graham_justo': graham_justo,
+            'lynch_ideal': lynch_ideal,
+            'peg': peg,
+            'margem_bazin': margem(bazin_teto),
+            'margem_graham': margem(graham_justo),
+            'margem_lynch': margem(lynch_ideal),
+        }
+
+    # RECOMENDAÇÃO: votação entre os métodos com dados
+    status = np.stack([bazin, graham, lynch], axis=1)
+    validos = (status != INSUFICIENTE).sum(axis=1)
+    compra = (status == COMPRAR).sum(axis=1)
+    venda = (status == VENDER).sum(axis=1)
+    recomendacao = np.select(
+        [validos == 0, compra >= validos / 2, venda >= validos / 2],
+        [INSUFICIENTE, COMPRAR, VENDER], AGUARDAR,
+    )
+
+    resultado.update(
+        bazin=bazin, graham=graham, lynch=lynch, recomendacao=recomendacao,
+        pontos_compra=compra, pontos_venda=venda,
+    )
+    return resultado
+
+
+# ------------------------------------------------------------
+# RANKING E FILTROS
+# ------------------------------------------------------------
+def _valor(numero, casas=2):
+    return None if np.isnan(numero) else round(float(numero), casas)
+
+
+def filtrar(colunas, metricas, recomendacao=None, dy_min=None, roe_min=None, pl_max=None, peg_max=None):
+    """Máscara booleana das linhas que passam nos filtros informados."""
+    mascara = np.ones(len(colunas['ticker']), dtype=bool)
+    if recomendacao:
+        mascara &= STATUS[metricas['recomendacao']] == recomendacao.upper()
+    if dy_min is not None:
+        mascara &= colunas['dy'] >= dy_min
+    if roe_min is not None:
+        mascara &= colunas['roe'] >= roe_min
+    if pl_max is not None:
+        mascara &= (colunas['pl'] > 0) & (colunas['pl'] <= pl_max)
+    if peg_max is not None:
+        mascara &= metricas['peg'] <= peg_max
+    return mascara
+
+
+def ordenar(colunas, metricas, indices, ordenar='pontos'):
+    """
+    Índices ordenados pela coluna pedida (NaN sempre no fim).
+    'pontos': mais votos de compra, menos de venda, maior margem Graham.
+    """
+    campo = ordenar.lstrip('-')
+    if campo not in ORDENACOES:
+        raise ValueError(f"Ordenação inválida: {ordenar} (use uma de {', '.join(ORDENACOES)})")
+
+    if campo == 'pontos':
+        margem = np.nan_to_num(metricas['margem_graham'][indices], nan=-np.inf)
+        chaves = (-margem, metricas['pontos_venda'][indices], -metricas['pontos_compra'][indices])
+        return indices[np.lexsort(chaves)]
+
+    valores = (metricas if campo in metricas else colunas)[campo][indices]
+    if ordenar.startswith('-'):
+        valores = -valores
+    # lexsort: a última chave é a principal; NaN vai para o fim
+    return indices[np.lexsort((valores, np.isnan(valores)))]
+
+
+def ranking(ordenar_por='pontos', limite=LIMITE_PADRAO, **filtros):
+    """
+    Screener sobre todos os snapshots: filtra, ordena e devolve
+    {'total', 'resultados': [...]} com os métodos de cada ticker.
+    """
+    colunas = obter_colunas()
+    metricas = avaliar(colunas)
+    indices = np.flatnonzero(filtrar(colunas, metricas, **filtros))
+    indices = ordenar(colunas, metricas, indices, ordenar_por)
+
+    resultados = []
+    for i in indices[:limite]:
+        recomendacao = metricas['recomendacao'][i]
+        resultados.append({
+            'ticker': str(colunas['ticker'][i]),
+            **{campo: _valor(colunas[campo][i]) for campo in CAMPOS},
+            'bazin': {
+                'status': str(STATUS[metricas['bazin'][i]]),
+                'preco_teto': _valor(metricas['bazin_teto'][i]),
+                'margem': _valor(metricas['margem_bazin'][i], 1),
+            },
+            'graham': {
+                'status': str(STATUS[metricas['graham'][i]]),
+                'preco_justo': _valor(metricas['graham_justo'][i]),
+                'margem': _valor(metricas['margem_graham'][i], 1),
+            },
+            'lynch': {
+                'status': str(STATUS[metricas['lynch'][i]]),
+                'peg': _valor(metricas['peg'][i]),
+                'preco_ideal': _valor(metricas['lynch_ideal'][i]),
+                'margem': _valor(metricas['margem_lynch'][i], 1),
+            },
+            'recomendacao': {
+                'status': str(STATUS[recomendacao]),
+                'emoji': str(EMOJIS[recomendacao]),
+                'pontos_compra': int(metricas['pontos_compra'][i]),
+                'pontos_venda': int(metricas['pontos_venda'][i]),
+            },
+        })
+    return {'total': len(indices), 'resultados': resultados}
+
+
+# ------------------------------------------------------------
+# CARGA DOS FUNDAMENTOS DO UNIVERSO (parser, sem IA)
+# ------------------------------------------------------------
+def ler_fundamentos(ticker):
+    """Indicadores do ticker só pelo parser do Investidor10; None se não validar."""
+    from investments.services import investidor10
+
+    try:
+        status, html = investidor10.baixar_pagina(ticker)
+        if status != 200:
+            return None
+        dados = investidor10.parsear_indicadores(html)
+    except Exception as e:
+        print(f"[ERRO] Fundamentos {ticker}: {e}")
+        return None
+
+    if not investidor10.validar(dados):
+        return None
+    if dados['pl'] == 0 and dados['lpa'] > 0:
+        dados['pl'] = dados['preco'] / dados['lpa']
+    return {'ticker': ticker, **dados}
+
+
+def atualizar_fundamentos(tickers=None, concorrencia=4):
+    """
+    Grava em ValuationSnapshot os fundamentos dos tickers (todas as ações
+    do universo por padrão) cujos fundamentos estão vencidos.
+    Retorna (atualizados, falhas).
+    """
+    from investments.models import ValuationSnapshot
+    from investments.services import universo
+
+    if tickers is None:
+        indice = universo.obter_indice(baixar=False)
+        if indice is None:
+            # Comando de manutenção: pode esperar o download da lista
+            universo.atualizar_universo()
+            indice = universo.obter_indice(baixar=False)
+        tickers = [a['ticker'] for a in indice.ativos if a['tipo'] == 'stock'] if indice else []
+
+    agora = timezone.now()
+    snapshots = {s.ticker: s for s in ValuationSnapshot.objects.filter(ticker__in=tickers)}
+    vencidos = [t for t in tickers if t not in snapshots or snapshots[t].vencido('fundamentos', agora)]
+
+    with ThreadPoolExecutor(max_workers=max(concorrencia, 1)) as executor:
+        lidos = dict(zip(vencidos, executor.map(ler_fundamentos, vencidos)))
+
+    atualizados = 0
+    for ticker, dados in lidos.items():
+        if not dados:
+            continue
+        snapshot = snapshots.get(ticker) or ValuationSnapshot(ticker=ticker)
+        snapshot.fundamentos = dados
+        snapshot.fundamentos_em = agora
+        snapshot.preco = Decimal(str(dados['preco']))
+        snapshot.preco_em = agora
+        snapshot.gravar()
+        atualizados += 1
+    return atualizados, len(vencidos) - atualizados
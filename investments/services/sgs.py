@@ -0,0 +1,165 @@
+"""
+Séries temporais do SGS (Sistema Gerenciador de Séries Temporais) do BCB
+- Registro das séries usadas pelo projeto
+- Download incremental em lote (intervalos de datas)
+- Leitura local a partir da tabela ValorIndice
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+
+from investments.services import cliente_http
+
+
+SGS_URL_PADRAO = "https://api.bcb.gov.br/dados/serie"
+
+# O SGS só aceita janelas de até 10 anos por consulta nas séries diárias
+JANELA_MAXIMA = relativedelta(years=10)
+
+SERIES_SGS = {
+    'IPCA': {'codigo': 433, 'nome': 'IPCA - variação mensal (%)', 'diaria': False, 'inicio': date(2000, 1, 1)},
+    'CDI': {'codigo': 12, 'nome': 'CDI - taxa diária (%)', 'diaria': True, 'inicio': date(2000, 1, 1)},
+    'SELIC': {'codigo': 11, 'nome': 'Selic - taxa diária (%)', 'diaria': True, 'inicio': date(2000, 1, 1)},
+    'IGPM': {'codigo': 189, 'nome': 'IGP-M - variação mensal (%)', 'diaria': False, 'inicio': date(2000, 1, 1)},
+    'PTAX': {'codigo': 1, 'nome': 'Dólar PTAX - venda (R$)', 'diaria': True, 'inicio': date(2000, 1, 1)},
+}
+
+
+def _serie(nome):
+    try:
+        return SERIES_SGS[nome.upper()]
+    except KeyError:
+        raise ValueError(f"Série SGS desconhecida: {nome}")
+
+
+def _url_serie(codigo):
+    base = getattr(settings, 'BCB_SGS_URL', SGS_URL_PADRAO).rstrip('/')
+    return f"{base}/bcdata.sgs.{codigo}/dados"
+
+
+# ------------------------------------------------------------
+# DOWNLOAD (em lote por intervalo de datas)
+# ------------------------------------------------------------
+def baixar_serie(codigo, inicio, fim, diaria=True):
+    """
+    Baixa os pontos da série SGS 'codigo' entre inicio e fim (inclusive).
+    Séries diárias são pedidas em janelas de até 10 anos; as demais numa
+    única requisição. Retorna lista de (date, Decimal) em ordem cronológica.
+    Intervalo sem dados (404 ou corpo vazio) retorna lista vazia; erros de
+    rede e respostas de erro (5xx, 429...) são propagados, para que uma
+    janela que falhou não vire um buraco na série gravada.
+    """
+    pontos = []
+    janela_inicio = inicio
+
+    while janela_inicio <= fim:
+        janela_fim = fim
+        if diaria:
+            janela_fim = min(fim, janela_inicio + JANELA_MAXIMA - timedelta(days=1))
+        response = cliente_http.get(
+            _url_serie(codigo),
+            params={
+                'formato': 'json',
+                'dataInicial': janela_inicio.strftime('%d/%m/%Y'),
+                'dataFinal': janela_fim.strftime('%d/%m/%Y'),
+            },
+            timeout=10,
+        )
+
+        # Sem dados no intervalo o SGS responde 404, corpo vazio ou um objeto de erro
+        if response.status_code == 404 or (response.ok and not response.content.strip()):
+            dados = []
+        else:
+            response.raise_for_status()
+            dados = response.json()
+        if isinstance(dados, list):
+            for item in dados:
+                try:
+                    dia_s, mes_s, ano_s = item.get('data', '').split('/')
+                    data = date(int(ano_s), int(mes_s), int(dia_s))
+                    valor = Decimal(str(item.get('valor', '')).replace(',', '.'))
+                except (ValueError, InvalidOperation):
+                    continue
+                if janela_inicio <= data <= janela_fim:
+                    pontos.append((data, valor))
+
+        janela_inicio = janela_fim + timedelta(days=1)
+
+    return pontos
+
+
+# ------------------------------------------------------------
+# SINCRONIZAÇÃO INCREMENTAL (baixa só a cauda que falta)
+# ------------------------------------------------------------
+def ultima_data(nome):
+    """Data do último ponto gravado da série, ou None."""
+    from investments.models import ValorIndice
+
+    return (
+        ValorIndice.objects.filter(codigo=_serie(nome)['codigo'])
+        .order_by('-data')
+        .values_list('data', flat=True)
+        .first()
+    )
+
+
+def sincronizar_serie(nome, ate=None):
+    """
+    Grava em ValorIndice os pontos da série posteriores ao último já gravado.
+    Retorna a quantidade de pontos novos.
+    """
+    from investments.models import ValorIndice
+
+    serie = _serie(nome)
+    ultima = ultima_data(nome)
+    inicio = ultima + timedelta(days=1) if ultima else serie['inicio']
+    fim = ate or date.today()
+
+    if inicio > fim:
+        return 0
+
+    pontos = baixar_serie(serie['codigo'], inicio, fim, serie['diaria'])
+    ValorIndice.objects.bulk_create(
+        [ValorIndice(codigo=serie['codigo'], data=data, valor=valor) for data, valor in pontos],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    return len(pontos)
+
+
+def sincronizar_series(nomes=None, ate=None):
+    """Sincroniza várias séries (todas as registradas por padrão). Retorna {nome: novos}."""
+    resultado = {}
+    for nome in (nomes or SERIES_SGS):
+        resultado[nome.upper()] = sincronizar_serie(nome, ate)
+    return resultado
+
+
+# ------------------------------------------------------------
+# LEITURA LOCAL
+# ------------------------------------------------------------
+def valores_serie(nome, inicio=None, fim=None):
+    """Lista de (date, Decimal) da série lida da tabela local, sem acessar a rede."""
+    from investments.models import ValorIndice
+
+    valores = ValorIndice.objects.filter(codigo=_serie(nome)['codigo'])
+    if inicio:
+        valores = valores.filter(data__gte=inicio)
+    if fim:
+        valores = valores.filter(data__lte=fim)
+    return list(valores.order_by('data').values_list('data', 'valor'))
+
+
+def ultimo_valor(nome):
+    """Último (date, Decimal) gravado da série, ou None."""
+    from investments.models import ValorIndice
+
+    return (
+        ValorIndice.objects.filter(codigo=_serie(nome)['codigo'])
+        .order_by('-data')
+        .values_list('data', 'valor')
+        .first()
+    )
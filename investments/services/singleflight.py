@@ -0,0 +1,126 @@
+"""
+Single-flight: chamadas idênticas simultâneas compartilham uma execução
+- Entre threads do mesmo processo: quem chega depois espera o Future do líder
+- Entre processos: trava no banco (services.travas, INSERT com chave
+  única) e resultado publicado no cache compartilhado, lido pelos
+  processos que ficaram esperando. cache.add no FileBasedCache não é
+  atômico e deixava dois workers virarem líder ao mesmo tempo
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+from django.core.cache import cache
+
+from investments.services import travas
+
+
+# Quanto tempo o resultado fica disponível para quem esperava em outro processo
+TTL_RESULTADO = 30
+INTERVALO_CONSULTA = (0.05, 0.5)
+
+_trava = threading.Lock()
+_em_andamento = {}
+_metricas = {'lider': 0, 'aguardou_thread': 0, 'aguardou_processo': 0}
+
+
+class FalhaNoLider(Exception):
+    """A execução compartilhada falhou em outro processo."""
+
+
+def _contar(evento):
+    with _trava:
+        _metricas[evento] += 1
+
+
+def _aguardar_outro_processo(chave, espera):
+    """Espera o líder de outro processo publicar o resultado. Retorna (publicado, entrada)."""
+    limite = time.monotonic() + espera
+    intervalo = INTERVALO_CONSULTA[0]
+    while time.monotonic() < limite:
+        entrada = cache.get(f"singleflight:{chave}:resultado")
+        if entrada is not None:
+            return True, entrada
+        if not travas.ativa(f"singleflight:{chave}"):
+            # Líder terminou sem publicar (ou morreu): confere uma última vez
+            entrada = cache.get(f"singleflight:{chave}:resultado")
+            return entrada is not None, entrada
+        time.sleep(intervalo)
+        intervalo = min(intervalo * 2, INTERVALO_CONSULTA[1])
+    return False, None
+
+
+def _executar_lider(chave, funcao, espera, ttl_resultado):
+    """Executa 'funcao' segurando a trava entre processos (se conseguir)."""
+    chave_trava = f"singleflight:{chave}"
+    chave_resultado = f"singleflight:{chave}:resultado"
+
+    dono = travas.adquirir(chave_trava, espera)
+    if not dono:
+        publicado, entrada = _aguardar_outro_processo(chave, espera)
+        if publicado:
+            _contar('aguardou_processo')
+            if 'erro' in entrada:
+                raise FalhaNoLider(entrada['erro'])
+            return entrada['valor']
+        # Sem resultado a tempo: executa por conta própria
+    else:
+        # Resultado de uma rodada anterior não vale para esta
+        cache.delete(chave_resultado)
+
+    _contar('lider')
+    try:
+        valor = funcao()
+    except Exception as e:
+        cache.set(chave_resultado, {'erro': f"{type(e).__name__}: {e}"}, timeout=ttl_resultado)
+        raise
+    else:
+        cache.set(chave_resultado, {'valor': valor}, timeout=ttl_resultado)
+        return valor
+    finally:
+        if dono:
+            travas.liberar(chave_trava, dono)
+
+
+def executar(chave, funcao, espera=30, ttl_resultado=TTL_RESULTADO):
+    """
+    Executa funcao() uma única vez para chamadas simultâneas com a mesma chave.
+
+    - Na mesma thread/processo, quem chega enquanto outra chamada está em
+      andamento espera o mesmo resultado (ou a mesma exceção).
+    - Em outro processo, espera até 'espera' segundos pelo resultado
+      publicado no cache; se o líder não publicar a tempo, executa sozinho.
+
+    O resultado precisa ser serializável (pickle) para atravessar processos.
+    Não é um cache: depois de 'ttl_resultado' segundos a próxima chamada
+    executa de novo.
+    """
+    with _trava:
+        futuro = _em_andamento.get(chave)
+        lider = futuro is None
+        if lider:
+            futuro = Future()
+            _em_andamento[chave] = futuro
+
+    if not lider:
+        _contar('aguardou_thread')
+        return futuro.result(timeout=espera)
+
+    try:
+        valor = _executar_lider(chave, funcao, espera, ttl_resultado)
+    except BaseException as e:
+        futuro.set_exception(e)
+        raise
+    else:
+        futuro.set_result(valor)
+        return valor
+    finally:
+        with _trava:
+            _em_andamento.pop(chave, None)
+
+
+def estatisticas():
+    """Execuções como líder e chamadas que reaproveitaram uma execução em andamento."""
+    with _trava:
+        return dict(_metricas)
@@ -0,0 +1,48 @@
+"""
+Travas entre processos na tabela Trava
+- O FileBasedCache não tem operação atômica: cache.add é has_key + set,
+  e dois workers do gunicorn podem os dois "conseguir" a mesma trava
+- Aqui quem decide é a restrição UNIQUE do banco: só um INSERT vence
+- Toda trava expira: se o dono morrer, a próxima tentativa depois de
+  'expira_em' apaga a linha velha e assume
+- adquirir devolve um identificador do dono; liberar só apaga a trava
+  desse dono (a de quem assumiu depois da expiração fica intacta)
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+
+
+def adquirir(chave, segundos):
+    """Tenta pegar a trava por 'segundos'. Retorna o dono (str) ou None se já está com outro."""
+    from investments.models import Trava
+
+    agora = timezone.now()
+    dono = uuid.uuid4().hex
+    try:
+        with transaction.atomic():
+            Trava.objects.filter(chave=chave, expira_em__lte=agora).delete()
+            Trava.objects.create(chave=chave, dono=dono, expira_em=agora + timedelta(seconds=segundos))
+        return dono
+    except IntegrityError:
+        return None
+    except OperationalError as e:
+        # Banco ocupado (sqlite travado por outro escritor): trata como trava alheia
+        print(f"[ERRO] Trava {chave}: {e}")
+        return None
+
+
+def liberar(chave, dono):
+    from investments.models import Trava
+
+    Trava.objects.filter(chave=chave, dono=dono).delete()
+
+
+def ativa(chave):
+    """A trava existe e ainda não expirou."""
+    from investments.models import Trava
+
+    return Trava.objects.filter(chave=chave, expira_em__gt=timezone.now()).exists()
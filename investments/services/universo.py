@@ -0,0 +1,249 @@
+"""
+Universo de tickers da B3 para o autocomplete
+- Lista completa baixada da brapi uma vez por dia (cache compartilhado),
+  em segundo plano: a requisição nunca espera o download
+- Sem lista em cache, a busca vai direto à busca da brapi
+- Índice em memória por prefixo de ticker e por substring (n-gramas) de
+  ticker e nome da empresa
+- Exportação JSON versionada para o filtro no navegador
+"""
+
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import connections
+
+from investments.services import cliente_http, travas
+
+
+URL_LISTA = "https://brapi.dev/api/quote/list"
+ITENS_POR_PAGINA = 1000
+MAX_PAGINAS = 20
+
+CHAVE_CACHE = "universo:ativos"
+VALIDADE = 24 * 60 * 60
+# Mantém a última lista por mais tempo para sobreviver a uma falha da brapi
+TIMEOUT_CACHE = 7 * 24 * 60 * 60
+TAMANHO_NGRAMA = 3
+# Trava do download entre workers: cobre MAX_PAGINAS páginas de até 10 s
+TRAVA_ATUALIZACAO = MAX_PAGINAS * 10 + 30
+
+_trava = threading.Lock()
+_indice = None
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rumo1m-universo')
+
+
+def _normalizar(texto):
+    """Minúsculas e sem acentos, para comparar 'Petrobrás' com 'petrobras'."""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def tipo_ativo(ticker):
+    # FIIs terminam em 11 (HGLG11, MXRF11)
+    # Ações terminam em 3, 4, 5, 6 (PETR3, VALE3)
+    return 'fii' if ticker.endswith('11') else 'stock'
+
+
+# ------------------------------------------------------------
+# DOWNLOAD DA LISTA COMPLETA (uma vez por dia)
+# ------------------------------------------------------------
+def baixar_universo():
+    """Baixa da brapi a lista completa de tickers (paginada). Retorna lista de dicts."""
+    ativos = {}
+    for pagina in range(1, MAX_PAGINAS + 1):
+        response = cliente_http.get(URL_LISTA, params={'limit': ITENS_POR_PAGINA, 'page': pagina}, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+
+        for stock in data.get('stocks', []):
+            ticker = (stock.get('stock') or '').strip().upper()
+            if ticker:
+                ativos[ticker] = {'ticker': ticker, 'nome': stock.get('name') or ticker, 'tipo': tipo_ativo(ticker)}
+
+        if not data.get('hasNextPage'):
+            break
+
+    return sorted(ativos.values(), key=lambda a: a['ticker'])
+
+
+def atualizar_universo():
+    """Baixa a lista e grava no cache compartilhado. Retorna o snapshot gravado."""
+    ativos = baixar_universo()
+    if not ativos:
+        raise ValueError("brapi retornou lista de ativos vazia")
+
+    versao = hashlib.sha1(json.dumps(ativos, sort_keys=True).encode()).hexdigest()[:12]
+    snapshot = {'versao': versao, 'baixado_em': time.time(), 'ativos': ativos}
+    cache.set(CHAVE_CACHE, snapshot, timeout=TIMEOUT_CACHE)
+    return snapshot
+
+
+def _atualizar_em_segundo_plano(dono):
+    try:
+        atualizar_universo()
+    except Exception as e:
+        print(f"[ERRO] Universo de ativos: {e}")
+    finally:
+        travas.liberar(f"{CHAVE_CACHE}:atualizando", dono)
+        connections.close_all()
+
+
+def obter_snapshot():
+    """
+    Snapshot {'versao', 'baixado_em', 'ativos'} do universo, ou None se
+    ainda não foi baixado. Sem snapshot ou com mais de um dia, um único
+    worker dispara o download em segundo plano; enquanto isso vale o
+    snapshot anterior (ou None).
+    """
+    snapshot = cache.get(CHAVE_CACHE)
+    if snapshot and time.time() - snapshot['baixado_em'] < VALIDADE:
+        return snapshot
+
+    dono = travas.adquirir(f"{CHAVE_CACHE}:atualizando", TRAVA_ATUALIZACAO)
+    if dono:
+        _executor.submit(_atualizar_em_segundo_plano, dono)
+    return snapshot
+
+
+def buscar_na_brapi(query, limite=15, filtro=None):
+    """Busca direto na brapi (uma requisição), enquanto não há lista local."""
+    try:
+        response = cliente_http.get(URL_LISTA, params={'search': query}, timeout=3)
+        response.raise_for_status()
+        stocks = response.json().get('stocks', [])
+    except Exception as e:
+        print(f"[ERRO] Busca brapi: {e}")
+        return []
+
+    resultados = []
+    for stock in stocks:
+        ticker = (stock.get('stock') or '').strip().upper()
+        if not ticker:
+            continue
+        ativo = {'ticker': ticker, 'nome': stock.get('name') or ticker, 'tipo': tipo_ativo(ticker)}
+        if filtro is None or filtro(ativo):
+            resultados.append(ativo)
+            if len(resultados) >= limite:
+                break
+    return resultados
+
+
+# ------------------------------------------------------------
+# ÍNDICE EM MEMÓRIA
+# ------------------------------------------------------------
+class IndiceAtivos:
+    """
+    Índice de busca sobre a lista de ativos:
+    - prefixo de ticker por busca binária na lista ordenada
+    - substring de ticker/nome por interseção de n-gramas (1 a 3 caracteres)
+    """
+
+    def __init__(self, versao, ativos):
+        self.versao = versao
+        self.ativos = sorted(ativos, key=lambda a: a['ticker'])
+        self.tickers = [a['ticker'] for a in self.ativos]
+        self.textos = [_normalizar(f"{a['ticker']} {a['nome']}") for a in self.ativos]
+
+        self.ngramas = {}
+        for i, texto in enumerate(self.textos):
+            for n in range(1, TAMANHO_NGRAMA + 1):
+                for j in range(len(texto) - n + 1):
+                    self.ngramas.setdefault(texto[j:j + n], set()).add(i)
+
+    def _prefixo(self, query):
+        inicio = bisect_left(self.tickers, query)
+        fim = bisect_left(self.tickers, query + '￿')
+        return range(inicio, fim)
+
+    def _contendo(self, query):
+        termo = _normalizar(query)
+        n = min(TAMANHO_NGRAMA, len(termo))
+        postings = sorted((self.ngramas.get(termo[j:j + n], set()) for j in range(len(termo) - n + 1)), key=len)
+        if not postings:
+            return set()
+        candidatos = set.intersection(*postings)
+        return {i for i in candidatos if termo in self.textos[i]}
+
+    def nome(self, ticker):
+        i = bisect_left(self.tickers, ticker)
+        if i < len(self.tickers) and self.tickers[i] == ticker:
+            return self.ativos[i]['nome']
+        return None
+
+    def buscar(self, query, limite=15, filtro=None):
+        """
+        Ativos cujo ticker começa com a busca (primeiro) ou cujo ticker/nome
+        contém a busca. filtro: função opcional ativo -> bool.
+        """
+        query = (query or '').strip().upper()
+        if not query:
+            return []
+
+        prefixo = list(self._prefixo(query))
+        vistos = set(prefixo)
+        ordem = prefixo + sorted(self._contendo(query) - vistos)
+
+        resultados = []
+        for i in ordem:
+            ativo = self.ativos[i]
+            if filtro is None or filtro(ativo):
+                resultados.append(ativo)
+                if len(resultados) >= limite:
+                    break
+        return resultados
+
+
+def obter_indice(baixar=True):
+    """
+    Índice em memória do processo, reconstruído quando a versão do snapshot
+    muda. Com baixar=False só usa o que já estiver no cache (sem disparar
+    a atualização em segundo plano).
+    """
+    global _indice
+    snapshot = obter_snapshot() if baixar else cache.get(CHAVE_CACHE)
+    if not snapshot:
+        return None
+
+    if _indice is None or _indice.versao != snapshot['versao']:
+        with _trava:
+            if _indice is None or _indice.versao != snapshot['versao']:
+                _indice = IndiceAtivos(snapshot['versao'], snapshot['ativos'])
+    return _indice
+
+
+def buscar_ativos(query, limite=15, filtro=None):
+    """Busca no índice local; sem universo em cache, na busca da brapi."""
+    indice = obter_indice()
+    if indice is None:
+        return buscar_na_brapi(query, limite, filtro)
+    return indice.buscar(query, limite, filtro)
+
+
+def nomes_ativos(tickers):
+    """{TICKER: nome} dos tickers conhecidos, sem baixar o universo se não estiver em cache."""
+    indice = obter_indice(baixar=False)
+    if not indice:
+        return {}
+    nomes = {t: indice.nome(t) for t in tickers}
+    return {t: nome for t, nome in nomes.items() if nome}
+
+
+def url_exportacao():
+    """
+    URL versionada da exportação para o navegador, ou '' se o universo
+    ainda não foi baixado (a página usa a API de busca nesse caso).
+    Só lê o cache: não dispara download durante a renderização.
+    """
+    from django.urls import reverse
+
+    snapshot = cache.get(CHAVE_CACHE)
+    if not snapshot:
+        return ''
+    return f"{reverse('universo_ativos_api')}?v={snapshot['versao']}"
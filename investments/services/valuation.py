@@ -3,7 +3,6 @@ Serviço de cálculo de valuation usando yfinance (Yahoo Finance)
 Implementação das metodologias: Bazin, Graham e Lynch (PEG)
 """
 
-import yfinance as yf
 from decimal import Decimal
 
 
@@ -19,9 +18,13 @@ def obter_dados_acao(ticker: str):
         
         print(f"[DEBUG] Buscando: {ticker_limpo}")
         
-        # Buscar via yfinance
-        stock = yf.Ticker(ticker_limpo)
-        info = stock.info
+        # Buscar via yfinance (importado aqui: puxa pandas, pesado para o boot)
+        import yfinance as yf
+        from investments.services import disjuntor
+
+        with disjuntor.protegido('yahoo'):
+            stock = yf.Ticker(ticker_limpo)
+            info = stock.info
         
         # Validar se retornou dados
         if not info or 'currentPrice' not in info:
@@ -7,68 +7,144 @@ Serviço de Valuation com Web Scraping OTIMIZADO
 
 import os
 import json
+import queue
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from openai import OpenAI
 from datetime import datetime, timedelta
 from decouple import config
-from bs4 import BeautifulSoup
+from django.db import connections
 import re
 
-client = OpenAI(api_key=config('OPENAI_API_KEY'))
+from investments.services import cache_llm, cliente_http, disjuntor, investidor10, singleflight
+
+# openai e bs4 são importados só no primeiro uso: carregar este módulo não
+# custa tempo/memória de boot nem exige OPENAI_API_KEY
+_client = None
+_trava_client = threading.Lock()
+
+
+def cliente_openai():
+    """Cliente OpenAI compartilhado, criado na primeira chamada."""
+    global _client
+    if _client is None:
+        with _trava_client:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=config('OPENAI_API_KEY'), http_client=cliente_http.cliente_httpx())
+    return _client
+
+
+# Raspagem + 3 chamadas ao GPT-4o: quem chega depois espera até isso pelo resultado
+ESPERA_VALUATION = 180
+
+# Etapas independentes do valuation (extração, análise, notícias, preço)
+# rodam sobrepostas; só o cache de respostas da IA toca o banco
+_executor_etapas = ThreadPoolExecutor(max_workers=6, thread_name_prefix='rumo1m-valuation')
+
+# Validade das respostas da OpenAI no cache (services.cache_llm)
+VALIDADE_EXTRACAO = timedelta(days=1)
+VALIDADE_ANALISE = timedelta(days=1)
+VALIDADE_NOTICIAS = timedelta(hours=6)
+
+# Textos de falha: não são gravados no snapshot (tenta de novo na próxima)
+ANALISE_INDISPONIVEL = "Análise não disponível no momento."
+NOTICIAS_INDISPONIVEIS = "Não foi possível buscar notícias no momento."
 
 
 def extrair_dados_investidor10(ticker: str):
     """
     Faz web scraping OTIMIZADO do Investidor10
-    Extrai dados fundamentalistas usando estrutura específica do site
+    Extrai dados fundamentalistas usando estrutura específica do site:
+    primeiro pelo parser de seletores CSS (services.investidor10), e só
+    se ele não passar na validação, pela IA (_extrair_com_ia)
     """
-    url = f"https://investidor10.com.br/acoes/{ticker.lower()}/"
+    url = investidor10.url_acao(ticker)
     
     try:
         print(f"[SCRAPING] Acessando {url}...")
         
-        # Headers para simular navegador
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.google.com/',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
+        status, html = investidor10.baixar_pagina(ticker)
         
-        if response.status_code != 200:
-            print(f"[ERRO] Status {response.status_code}")
+        if status != 200:
+            print(f"[ERRO] Status {status}")
             return None
         
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Dados a extrair
-        dados = {
-            'ticker': ticker.upper(),
-            'preco': 0,
-            'lpa': 0,
-            'pl': 0,
-            'roe': 0,
-            'dy': 0,
-            'vpa': 0,
-        }
-        
-        # ESTRATÉGIA: Passar TODO o HTML para a IA e pedir extração
-        # É mais confiável que tentar parsear estrutura que pode mudar
+        # 1º caminho: parser estrutural (cards + tabela de indicadores)
+        lidos = investidor10.parsear_indicadores(html)
+        if investidor10.validar(lidos):
+            print(f"[SCRAPING] ✅ Indicadores lidos pelo parser")
+            caminho = 'parser'
+            dados = {'ticker': ticker.upper(), **lidos}
+        else:
+            # 2º caminho: IA lendo o texto da página
+            faltando = [c for c, v in lidos.items() if v is None]
+            print(f"[SCRAPING] Parser não validou (faltando: {', '.join(faltando) or 'preço/LPA zerados'}), usando IA...")
+            caminho = 'ia'
+            dados = _extrair_com_ia(ticker, html)
         
-        print(f"[SCRAPING] HTML baixado, usando IA para extrair dados...")
+        # Validar dados mínimos
+        if dados is None or dados['preco'] == 0 or dados['lpa'] == 0:
+            if dados:
+                print(f"[ERRO] Dados insuficientes: preço={dados['preco']}, lpa={dados['lpa']}")
+            investidor10.contar('falha')
+            return None
+        investidor10.contar(caminho)
         
-        # Pegar texto completo da página
-        texto_pagina = soup.get_text(separator=' ', strip=True)
+        # Calcular P/L se não veio (mas temos preço e LPA)
+        if dados['pl'] == 0 and dados['preco'] > 0 and dados['lpa'] > 0:
+            dados['pl'] = dados['preco'] / dados['lpa']
+            print(f"[CALC] P/L calculado: {dados['pl']:.2f}")
         
-        # Limitar tamanho (GPT-4o aguenta ~128k tokens, mas vamos usar 10k caracteres)
-        texto_relevante = texto_pagina[:15000]
+        print(f"[OK] ✅ Dados completos extraídos!")
+        return dados
         
-        # Prompt MUITO específico para extração
-        prompt = f"""
+    except requests.Timeout:
+        print(f"[ERRO] Timeout ao acessar {url}")
+        return None
+    except Exception as e:
+        print(f"[ERRO] Extração: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def _extrair_com_ia(ticker: str, html: str):
+    """
+    Extração pela IA (fallback do parser): manda o texto da página ao GPT-4o.
+    Retorna dict com os indicadores ou None.
+    """
+    # Parse HTML
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Dados a extrair
+    dados = {
+        'ticker': ticker.upper(),
+        'preco': 0,
+        'lpa': 0,
+        'pl': 0,
+        'roe': 0,
+        'dy': 0,
+        'vpa': 0,
+    }
+    
+    # ESTRATÉGIA: Passar o texto da página para a IA e pedir extração
+    # Só roda quando o layout mudou e o parser não encontrou os indicadores
+    
+    print(f"[SCRAPING] HTML baixado, usando IA para extrair dados...")
+    
+    # Pegar texto completo da página
+    texto_pagina = soup.get_text(separator=' ', strip=True)
+    
+    # Limitar tamanho (GPT-4o aguenta ~128k tokens, mas vamos usar 10k caracteres)
+    texto_relevante = texto_pagina[:15000]
+    
+    # Prompt MUITO específico para extração
+    prompt = f"""
 Você é um extrator de dados financeiros. Analise este texto da página do Investidor10 sobre a ação {ticker.upper()}.
 
 TEXTO DA PÁGINA:
@@ -94,81 +170,60 @@ REGRAS IMPORTANTES:
 Retorne APENAS este JSON (sem markdown, sem explicação):
 {{"preco": 0, "lpa": 0, "pl": 0, "roe": 0, "dy": 0, "vpa": 0}}
 """
+    
+    try:
+        pedido = {
+            'model': "gpt-4o",
+            'messages': [
+                {"role": "system", "content": "Você é um extrator de dados financeiros preciso. Retorne apenas JSON válido sem markdown."},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.1,
+            'max_tokens': 300,
+        }
         
-        try:
-            response_ai = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Você é um extrator de dados financeiros preciso. Retorne apenas JSON válido sem markdown."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=300
-            )
-            
-            conteudo = response_ai.choices[0].message.content.strip()
-            
-            # Limpar markdown se vier
-            if conteudo.startswith("```"):
-                conteudo = conteudo.split("```")[1]
-                if conteudo.startswith("json"):
-                    conteudo = conteudo[4:]
-                conteudo = conteudo.strip()
-            
-            # Parse JSON
-            dados_extraidos = json.loads(conteudo)
-            
-            # Atualizar dados
-            for chave in ['preco', 'lpa', 'pl', 'roe', 'dy', 'vpa']:
-                if chave in dados_extraidos and dados_extraidos[chave]:
-                    dados[chave] = float(dados_extraidos[chave])
-            
-            print(f"[IA EXTRAÇÃO] ✅ Dados extraídos com sucesso")
-            
-            # Log dos dados
-            print(f"[DADOS] Preço: R$ {dados['preco']:.2f}")
-            print(f"[DADOS] LPA: R$ {dados['lpa']:.2f}")
-            print(f"[DADOS] P/L: {dados['pl']:.2f}")
-            print(f"[DADOS] ROE: {dados['roe']:.2f}%")
-            print(f"[DADOS] DY: {dados['dy']:.2f}%")
-            print(f"[DADOS] VPA: R$ {dados['vpa']:.2f}")
-            
-        except json.JSONDecodeError as e:
-            print(f"[ERRO JSON] {e}")
-            print(f"[RESPOSTA IA] {conteudo}")
-            return None
-        except Exception as e:
-            print(f"[ERRO IA] {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+        conteudo = _completar_chat(pedido, VALIDADE_EXTRACAO).strip()
         
-        # Validar dados mínimos
-        if dados['preco'] == 0 or dados['lpa'] == 0:
-            print(f"[ERRO] Dados insuficientes: preço={dados['preco']}, lpa={dados['lpa']}")
-            return None
+        # Limpar markdown se vier
+        if conteudo.startswith("```"):
+            conteudo = conteudo.split("```")[1]
+            if conteudo.startswith("json"):
+                conteudo = conteudo[4:]
+            conteudo = conteudo.strip()
         
-        # Calcular P/L se não veio (mas temos preço e LPA)
-        if dados['pl'] == 0 and dados['preco'] > 0 and dados['lpa'] > 0:
-            dados['pl'] = dados['preco'] / dados['lpa']
-            print(f"[CALC] P/L calculado: {dados['pl']:.2f}")
+        # Parse JSON
+        dados_extraidos = json.loads(conteudo)
         
-        print(f"[OK] ✅ Dados completos extraídos!")
-        return dados
+        # Atualizar dados
+        for chave in ['preco', 'lpa', 'pl', 'roe', 'dy', 'vpa']:
+            if chave in dados_extraidos and dados_extraidos[chave]:
+                dados[chave] = float(dados_extraidos[chave])
         
-    except requests.Timeout:
-        print(f"[ERRO] Timeout ao acessar {url}")
+        print(f"[IA EXTRAÇÃO] ✅ Dados extraídos com sucesso")
+        
+        # Log dos dados
+        print(f"[DADOS] Preço: R$ {dados['preco']:.2f}")
+        print(f"[DADOS] LPA: R$ {dados['lpa']:.2f}")
+        print(f"[DADOS] P/L: {dados['pl']:.2f}")
+        print(f"[DADOS] ROE: {dados['roe']:.2f}%")
+        print(f"[DADOS] DY: {dados['dy']:.2f}%")
+        print(f"[DADOS] VPA: R$ {dados['vpa']:.2f}")
+        
+    except json.JSONDecodeError as e:
+        print(f"[ERRO JSON] {e}")
+        print(f"[RESPOSTA IA] {conteudo}")
         return None
     except Exception as e:
-        print(f"[ERRO] Extração: {e}")
+        print(f"[ERRO IA] {e}")
         import traceback
         traceback.print_exc()
         return None
+    
+    return dados
 
 
-def gerar_analise_ia(ticker: str, dados: dict):
-    """Gera análise profissional via IA especialista"""
-    
+def _pedido_analise(ticker: str, dados: dict):
+    """Parâmetros da chamada à OpenAI que gera a análise (com ou sem streaming)"""
     prompt = f"""
 Você é um analista financeiro sênior com 20 anos de experiência no mercado brasileiro.
 
@@ -195,27 +250,29 @@ IMPORTANTE:
 - Foque em análise fundamentalista
 """
     
+    return {
+        'model': "gpt-4o",
+        'messages': [
+            {"role": "system", "content": "Você é um analista financeiro sênior especializado em ações brasileiras."},
+            {"role": "user", "content": prompt}
+        ],
+        'temperature': 0.7,
+        'max_tokens': 500,
+    }
+
+
+def gerar_analise_ia(ticker: str, dados: dict):
+    """Gera análise profissional via IA especialista"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "Você é um analista financeiro sênior especializado em ações brasileiras."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        return response.choices[0].message.content.strip()
+        return _completar_chat(_pedido_analise(ticker, dados), VALIDADE_ANALISE).strip()
         
     except Exception as e:
         print(f"[ERRO] Análise IA: {e}")
-        return "Análise não disponível no momento."
+        return ANALISE_INDISPONIVEL
 
 
-def buscar_noticias_resumo(ticker: str):
-    """Busca e resume últimas notícias sobre a ação"""
-    
+def _pedido_noticias(ticker: str):
+    """Parâmetros da chamada à OpenAI que resume as notícias (com ou sem streaming)"""
     hoje = datetime.now()
     mes_passado = hoje - timedelta(days=30)
     
@@ -244,50 +301,204 @@ IMPORTANTE:
 - Ignore rumores não confirmados
 """
     
+    return {
+        'model': "gpt-4o",
+        'messages': [
+            {"role": "system", "content": "Você é um analista de mercado que resume notícias financeiras."},
+            {"role": "user", "content": prompt}
+        ],
+        'temperature': 0.5,
+        'max_tokens': 700,
+    }
+
+
+def buscar_noticias_resumo(ticker: str):
+    """Busca e resume últimas notícias sobre a ação"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "Você é um analista de mercado que resume notícias financeiras."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=700
-        )
-        
-        return response.choices[0].message.content.strip()
+        return _completar_chat(_pedido_noticias(ticker), VALIDADE_NOTICIAS).strip()
         
     except Exception as e:
         print(f"[ERRO] Notícias: {e}")
-        return "Não foi possível buscar notícias no momento."
+        return NOTICIAS_INDISPONIVEIS
 
 
 def calcular_valuation(ticker: str):
     """
-    Calcula valuation completo:
-    - Web scraping + IA do Investidor10
-    - 3 métodos (Bazin, Graham, Lynch)
-    - Análise IA
-    - Resumo de notícias
+    Calcula valuation completo (ver _calcular_valuation).
+    Pedidos simultâneos do mesmo ticker, de qualquer worker, compartilham
+    uma única raspagem + chamadas à OpenAI.
+    """
+    ticker = ticker.strip().upper()
+    return singleflight.executar(
+        f"valuation:{ticker}",
+        lambda: _calcular_valuation(ticker),
+        espera=ESPERA_VALUATION,
+    )
+
+
+def _calcular_valuation(ticker: str):
     """
+    Calcula valuation completo a partir do ValuationSnapshot do ticker,
+    refazendo só as partes vencidas (ver ValuationSnapshot.VALIDADE):
+    - Web scraping + IA do Investidor10 (fundamentos, dias)
+    - Preço atual via cache de cotações (minutos)
+    - Análise IA (refeita quando os fundamentos mudam)
+    - Resumo de notícias (horas)
+    - 3 métodos (Bazin, Graham, Lynch), sempre recalculados (sem rede)
     
-    # 1. Extrair dados via web scraping + IA
-    print(f"[VALUATION] Iniciando análise de {ticker}...")
-    dados = extrair_dados_investidor10(ticker)
+    Notícias e preço não dependem dos fundamentos e rodam em paralelo com
+    a extração; a análise IA começa assim que os fundamentos chegam.
+    O tempo de cada etapa (ms) volta em resultado['tempos'].
+    """
+    from django.utils import timezone
+    from investments.models import ValuationSnapshot
+    
+    inicio = time.perf_counter()
+    tempos = {}
+    snapshot = ValuationSnapshot.objects.filter(ticker=ticker).first() or ValuationSnapshot(ticker=ticker)
+    agora = timezone.now()
+    
+    # Notícias não dependem dos fundamentos: já saem em paralelo
+    futuro_noticias = None
+    if snapshot.vencido('noticias', agora):
+        print(f"[VALUATION] Buscando notícias...")
+        futuro_noticias = _etapa_em_paralelo(_cronometrar, tempos, 'noticias', buscar_noticias_resumo, ticker)
+    
+    # 1. Fundamentos e preço (uma raspagem só com o streaming do mesmo ticker)
+    snapshot = _fundamentos_compartilhados(ticker, agora, tempos)
+    if snapshot is None:
+        return None
+    
+    # 2. Análise IA (depende dos fundamentos) em paralelo com as notícias
+    futuro_analise = None
+    if _analise_vencida(snapshot, agora):
+        print(f"[VALUATION] Gerando análise IA...")
+        dados = {**snapshot.fundamentos, 'preco': float(snapshot.preco)}
+        futuro_analise = _etapa_em_paralelo(_cronometrar, tempos, 'analise', gerar_analise_ia, ticker, dados)
+    
+    if futuro_analise is not None:
+        analise = futuro_analise.result()
+        if analise != ANALISE_INDISPONIVEL:
+            snapshot.analise_ia = analise
+            snapshot.analise_em = agora
+    
+    if futuro_noticias is not None:
+        noticias = futuro_noticias.result()
+        if noticias != NOTICIAS_INDISPONIVEIS:
+            snapshot.noticias = noticias
+            snapshot.noticias_em = agora
+    
+    # 3. Métodos
+    dados = {**snapshot.fundamentos, 'preco': float(snapshot.preco)}
+    snapshot.metodos = calcular_metodos(dados)
+    snapshot.gravar()
+    
+    tempos['total'] = round((time.perf_counter() - inicio) * 1000)
+    print(f"[VALUATION] ✅ Análise completa! Tempos (ms): {tempos}")
+    return montar_resultado(snapshot, tempos)
+
+
+def _fundamentos_compartilhados(ticker, agora, tempos):
+    """
+    Fundamentos e preço do snapshot atualizados e gravados sob o
+    single-flight do ticker: valuation normal e streaming simultâneos, de
+    qualquer worker, fazem uma raspagem só. Quem esperou lê o snapshot que
+    o líder gravou. Retorna o snapshot do banco (None sem fundamentos).
+    """
+    from investments.models import ValuationSnapshot
     
-    if not dados:
-        print(f"[VALUATION] ❌ Falha ao extrair dados")
+    def atualizar():
+        # Lido de novo aqui: o que outro pedido acabou de gravar não é refeito
+        snapshot = ValuationSnapshot.objects.filter(ticker=ticker).first() or ValuationSnapshot(ticker=ticker)
+        if not _atualizar_fundamentos_e_preco(snapshot, agora, tempos):
+            return False
+        snapshot.metodos = calcular_metodos({**snapshot.fundamentos, 'preco': float(snapshot.preco)})
+        snapshot.gravar()
+        return True
+    
+    if not singleflight.executar(f"valuation:{ticker}:fundamentos", atualizar, espera=ESPERA_VALUATION):
         return None
+    return ValuationSnapshot.objects.get(ticker=ticker)
+
+
+def _atualizar_fundamentos_e_preco(snapshot, agora, tempos):
+    """
+    Refaz no snapshot os fundamentos (web scraping + parser/IA) e o preço
+    que estiverem vencidos; o preço é buscado em paralelo com a raspagem.
+    Se a raspagem falhar, mantém os fundamentos anteriores.
+    Retorna False se não houver fundamentos para seguir.
+    """
+    futuro_preco = None
+    if snapshot.vencido('preco', agora):
+        futuro_preco = _etapa_em_paralelo(_cronometrar, tempos, 'preco', _preco_atual, snapshot.ticker)
     
-    # 2. Gerar análise IA
-    print(f"[VALUATION] Gerando análise IA...")
-    ai_analysis = gerar_analise_ia(ticker, dados)
+    if snapshot.vencido('fundamentos', agora):
+        print(f"[VALUATION] Iniciando análise de {snapshot.ticker}...")
+        dados = _cronometrar(tempos, 'fundamentos', extrair_dados_investidor10, snapshot.ticker)
+        
+        if dados:
+            snapshot.fundamentos = dados
+            snapshot.fundamentos_em = agora
+            snapshot.preco = Decimal(str(dados['preco']))
+            snapshot.preco_em = agora
+        elif not snapshot.fundamentos:
+            print(f"[VALUATION] ❌ Falha ao extrair dados")
+            return False
+        else:
+            print(f"[VALUATION] Extração falhou, usando fundamentos de {snapshot.fundamentos_em:%d/%m/%Y}")
     
-    # 3. Buscar notícias
-    print(f"[VALUATION] Buscando notícias...")
-    news_summary = buscar_noticias_resumo(ticker)
+    # Preço atual (vale o da raspagem se ela acabou de rodar)
+    if futuro_preco is not None:
+        preco = futuro_preco.result()
+        if preco and snapshot.vencido('preco', agora):
+            snapshot.preco = Decimal(str(preco))
+            snapshot.preco_em = agora
+    return True
+
+
+def _analise_vencida(snapshot, agora):
+    return snapshot.vencido('analise', agora) or snapshot.analise_em < snapshot.fundamentos_em
+
+
+def _etapa_em_paralelo(funcao, *args):
+    """Executa funcao(*args) no pool de etapas; devolve o Future"""
+    return _executor_etapas.submit(_executar_etapa, funcao, *args)
+
+
+def _executar_etapa(funcao, *args):
+    try:
+        return funcao(*args)
+    finally:
+        # Conexão aberta pelo cache da IA na thread do pool não fica pendurada
+        connections.close_all()
+
+
+def _cronometrar(tempos, etapa, funcao, *args):
+    """Executa funcao(*args) registrando em tempos[etapa] a duração em ms"""
+    inicio = time.perf_counter()
+    try:
+        return funcao(*args)
+    finally:
+        tempos[etapa] = round((time.perf_counter() - inicio) * 1000)
+
+
+def _preco_atual(ticker: str):
+    """Preço atual pelo cache compartilhado de cotações (None se indisponível)"""
+    from investments.services.cotacoes import obter_cotacoes
     
-    # 4. Calcular métodos
+    try:
+        cotacao = obter_cotacoes([ticker], fonte='yahoo').get(ticker)
+        return cotacao['preco'] if cotacao else None
+    except Exception as e:
+        print(f"[ERRO] Preço atual {ticker}: {e}")
+        return None
+
+
+def calcular_metodos(dados: dict):
+    """
+    Bazin, Graham, Lynch e a recomendação geral a partir de
+    preco/lpa/pl/roe/dy/vpa. Só cálculo, sem rede.
+    """
     preco = Decimal(str(dados['preco']))
     lpa = Decimal(str(dados['lpa']))
     pl = Decimal(str(dados['pl']))
@@ -394,24 +605,7 @@ def calcular_valuation(ticker: str):
         else:
             status_geral = "AGUARDAR"
     
-    print(f"[VALUATION] ✅ Análise completa!")
-    
-    # ===== RETORNO =====
     return {
-        'ticker': dados['ticker'],
-        'preco_atual': f"R$ {float(preco):.2f}",
-        
-        'dados_base': {
-            'preco': f"R$ {float(preco):.2f}",
-            'lpa': f"R$ {float(lpa):.2f}",
-            'pl': f"{float(pl):.2f}x" if pl > 0 else "N/A",
-            'roe': f"{float(roe):.2f}%" if roe > 0 else "N/A",
-            'dy': f"{float(dy):.2f}%" if dy > 0 else "N/A",
-        },
-        
-        'ai_analysis': ai_analysis,
-        'news_summary': news_summary,
-        
         'bazin': {
             'preco_teto': f"R$ {bazin_teto:.2f}" if bazin_teto else "N/A",
             'status': bazin_status,
@@ -443,4 +637,176 @@ def calcular_valuation(ticker: str):
             'pontos_compra': votos_compra if metodos_validos else 0,
             'pontos_venda': votos_venda if metodos_validos else 0,
         }
-    }
\ No newline at end of file
+    }
+
+
+def montar_resultado(snapshot, tempos=None):
+    """
+    Monta a resposta da API a partir do snapshot (formato usado por valuation.html).
+    tempos: duração em ms de cada etapa refeita nesta chamada.
+    """
+    dados = snapshot.fundamentos
+    preco = float(snapshot.preco)
+    pl, roe, dy = dados['pl'], dados['roe'], dados['dy']
+    
+    return {
+        'ticker': snapshot.ticker,
+        'preco_atual': f"R$ {preco:.2f}",
+        
+        'dados_base': {
+            'preco': f"R$ {preco:.2f}",
+            'lpa': f"R$ {dados['lpa']:.2f}",
+            'pl': f"{pl:.2f}x" if pl > 0 else "N/A",
+            'roe': f"{roe:.2f}%" if roe > 0 else "N/A",
+            'dy': f"{dy:.2f}%" if dy > 0 else "N/A",
+        },
+        
+        'ai_analysis': snapshot.analise_ia or ANALISE_INDISPONIVEL,
+        'news_summary': snapshot.noticias or NOTICIAS_INDISPONIVEIS,
+        
+        **snapshot.metodos,
+        
+        # Quando cada parte foi obtida (o resto veio do snapshot)
+        'atualizado_em': {
+            parte: momento.isoformat() if momento else None
+            for parte, momento in [
+                ('fundamentos', snapshot.fundamentos_em),
+                ('preco', snapshot.preco_em),
+                ('analise', snapshot.analise_em),
+                ('noticias', snapshot.noticias_em),
+            ]
+        },
+        'tempos': tempos or {},
+    }
+
+
+# ------------------------------------------------------------
+# VALUATION EM STREAMING (Server-Sent Events)
+# ------------------------------------------------------------
+def _completar_chat(pedido, validade):
+    """
+    Texto da resposta de uma chamada à OpenAI, pelo cache de respostas
+    (services.cache_llm). Pedidos iguais simultâneos, com ou sem streaming,
+    fazem uma chamada só (single-flight pela chave do pedido).
+    """
+    def chamar():
+        with disjuntor.protegido('openai'):
+            return cliente_openai().chat.completions.create(**pedido).choices[0].message.content
+    
+    return singleflight.executar(
+        f"llm:{cache_llm.chave(pedido)}",
+        lambda: cache_llm.completar(pedido, validade, chamar),
+        espera=ESPERA_VALUATION,
+    )
+
+
+def _transmitir_chat(pedido, validade):
+    """
+    Pedaços de texto de uma chamada à OpenAI com stream=True, na ordem em
+    que chegam (resposta em cache vem inteira, num pedaço só)
+    """
+    def chamar():
+        with disjuntor.protegido('openai'):
+            resposta = cliente_openai().chat.completions.create(**pedido, stream=True)
+            for pedaco in resposta:
+                if pedaco.choices and pedaco.choices[0].delta.content:
+                    yield pedaco.choices[0].delta.content
+    
+    return cache_llm.transmitir(pedido, validade, chamar)
+
+
+def transmitir_valuation(ticker: str):
+    """
+    Valuation em etapas, para o endpoint de streaming. Gera (evento, dados):
+    - 'resultado': fundamentos + Bazin/Graham/Lynch assim que a página é lida
+      (ai_analysis / news_summary = None se ainda vão ser gerados)
+    - 'analise' / 'noticias': {'texto': pedaço} do texto da IA, intercalados
+    - 'fim': textos completos e tempos de cada etapa
+    - 'erro': {'erro': mensagem} se não houver dados para mostrar
+    Usa e atualiza o mesmo ValuationSnapshot de calcular_valuation.
+    """
+    from django.utils import timezone
+    from investments.models import ValuationSnapshot
+    
+    ticker = ticker.strip().upper()
+    inicio = time.perf_counter()
+    tempos = {}
+    snapshot = ValuationSnapshot.objects.filter(ticker=ticker).first() or ValuationSnapshot(ticker=ticker)
+    agora = timezone.now()
+    
+    fila = queue.Queue()
+    textos = {}
+    pendentes = set()
+    
+    def transmitir(etapa, pedido, validade):
+        partes = []
+        inicio_etapa = time.perf_counter()
+        
+        def gerar():
+            for parte in _transmitir_chat(pedido, validade):
+                partes.append(parte)
+                fila.put((etapa, parte))
+            return ''.join(partes)
+        
+        try:
+            # Mesmo single-flight de _completar_chat: quem esperou outra
+            # chamada igual recebe o texto inteiro num pedaço só
+            texto = singleflight.executar(f"llm:{cache_llm.chave(pedido)}", gerar, espera=ESPERA_VALUATION)
+            if texto and not partes:
+                fila.put((etapa, texto))
+            textos[etapa] = texto.strip()
+        except Exception as e:
+            print(f"[ERRO] Streaming {etapa}: {e}")
+        finally:
+            tempos[etapa] = round((time.perf_counter() - inicio_etapa) * 1000)
+            fila.put((etapa, None))
+    
+    # Notícias começam junto com a raspagem
+    if snapshot.vencido('noticias', agora):
+        pendentes.add('noticias')
+        _etapa_em_paralelo(transmitir, 'noticias', _pedido_noticias(ticker), VALIDADE_NOTICIAS)
+    
+    snapshot = _fundamentos_compartilhados(ticker, agora, tempos)
+    if snapshot is None:
+        yield 'erro', {'erro': 'Não foi possível extrair dados do Investidor10 para esta ação'}
+        return
+    
+    dados = {**snapshot.fundamentos, 'preco': float(snapshot.preco)}
+    if _analise_vencida(snapshot, agora):
+        pendentes.add('analise')
+        _etapa_em_paralelo(transmitir, 'analise', _pedido_analise(ticker, dados), VALIDADE_ANALISE)
+    
+    resultado = montar_resultado(snapshot, tempos)
+    if 'analise' in pendentes:
+        resultado['ai_analysis'] = None
+    if 'noticias' in pendentes:
+        resultado['news_summary'] = None
+    tempos['primeiro_resultado'] = round((time.perf_counter() - inicio) * 1000)
+    yield 'resultado', resultado
+    
+    # Textos da IA conforme chegam, das duas chamadas intercaladas
+    while pendentes:
+        try:
+            etapa, parte = fila.get(timeout=ESPERA_VALUATION)
+        except queue.Empty:
+            break
+        if parte is None:
+            pendentes.discard(etapa)
+        else:
+            yield etapa, {'texto': parte}
+    
+    if textos.get('analise'):
+        snapshot.analise_ia = textos['analise']
+        snapshot.analise_em = agora
+    if textos.get('noticias'):
+        snapshot.noticias = textos['noticias']
+        snapshot.noticias_em = agora
+    snapshot.save(update_fields=['analise_ia', 'analise_em', 'noticias', 'noticias_em', 'atualizado_em'])
+    
+    tempos['total'] = round((time.perf_counter() - inicio) * 1000)
+    print(f"[VALUATION] ✅ Streaming de {ticker} completo! Tempos (ms): {tempos}")
+    yield 'fim', {
+        'ai_analysis': snapshot.analise_ia or ANALISE_INDISPONIVEL,
+        'news_summary': snapshot.noticias or NOTICIAS_INDISPONIVEIS,
+        'tempos': tempos,
+    }
@@ -1,3 +1,1511 @@
-from django.test import TestCase
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import numpy as np
+
+from investments import views
+from investments.models import Aporte, CotacaoAtual, IndiceIPCA, Lancamento, PlanejamentoMensal, RespostaLLM, StatusJob, Trava, ValorIndice, ValuationJob, ValuationSnapshot
+from investments.services import cache_llm, cliente_http, concorrencia, cotacoes, disjuntor, fila_valuation, historico_precos, inflacao, investidor10, screener, sgs, singleflight, travas, universo, valuation_openai
+
+
+TEST_DATA = Path(__file__).resolve().parent / 'test_data'
+
+
+class _SGSFixtureHandler(BaseHTTPRequestHandler):
+    """Imita a API do SGS servindo test_data/sgs/<codigo>.json filtrado por data."""
+    requisicoes = []
+    # (codigo, dataInicial) que respondem 503
+    falhas = set()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        codigo = url.path.split('bcdata.sgs.')[-1].split('/')[0]
+        params = parse_qs(url.query)
+        self.requisicoes.append((codigo, params['dataInicial'][0], params['dataFinal'][0]))
+
+        if (codigo, params['dataInicial'][0]) in self.falhas:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        arquivo = TEST_DATA / 'sgs' / f'{codigo}.json'
+        if not arquivo.exists():
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        inicio = datetime.strptime(params['dataInicial'][0], '%d/%m/%Y').date()
+        fim = datetime.strptime(params['dataFinal'][0], '%d/%m/%Y').date()
+        pontos = [
+            p for p in json.loads(arquivo.read_text())
+            if inicio <= datetime.strptime(p['data'], '%d/%m/%Y').date() <= fim
+        ]
+
+        corpo = json.dumps(pontos).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class SyncIndicesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _SGSFixtureHandler)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.servidor.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _SGSFixtureHandler.requisicoes.clear()
+        _SGSFixtureHandler.falhas.clear()
+
+    def sync(self, *series, ate=date(2026, 3, 31)):
+        with override_settings(BCB_SGS_URL=self.url):
+            call_command('sync_indices', *series, ate=ate, stdout=StringIO(), stderr=StringIO())
+
+    def test_baixa_series_e_deriva_ipca(self):
+        self.sync('IPCA', 'CDI')
+
+        self.assertEqual(ValorIndice.objects.filter(codigo=433).count(), 15)
+        self.assertEqual(ValorIndice.objects.filter(codigo=12).count(), 7)
+        self.assertEqual(IndiceIPCA.objects.count(), 15)
+
+        jan_2025 = IndiceIPCA.objects.get(competencia=date(2025, 1, 1))
+        fev_2025 = IndiceIPCA.objects.get(competencia=date(2025, 2, 1))
+        self.assertEqual(jan_2025.variacao, Decimal('0.0016'))
+        self.assertEqual(fev_2025.numero_indice, Decimal('1.0016') * Decimal('1.0131'))
+
+    def test_segunda_sincronizacao_baixa_so_a_cauda(self):
+        self.sync('IPCA')
+        _SGSFixtureHandler.requisicoes.clear()
+
+        self.sync('IPCA', ate=date(2026, 4, 30))
+
+        self.assertEqual(_SGSFixtureHandler.requisicoes, [('433', '02/03/2026', '30/04/2026')])
+        self.assertEqual(ValorIndice.objects.filter(codigo=433).count(), 15)
+
+    def test_serie_diaria_em_janelas_de_dez_anos(self):
+        self.sync('CDI')
+
+        janelas = [r for r in _SGSFixtureHandler.requisicoes if r[0] == '12']
+        self.assertEqual(len(janelas), 3)
+        self.assertEqual(janelas[0][1], '01/01/2000')
+        self.assertEqual(janelas[-1][2], '31/03/2026')
+
+    def test_janela_com_erro_nao_deixa_buraco(self):
+        _SGSFixtureHandler.falhas.add(('12', '01/01/2010'))
+
+        self.sync('CDI')
+        self.assertFalse(ValorIndice.objects.filter(codigo=12).exists())
+
+        _SGSFixtureHandler.falhas.clear()
+        self.sync('CDI')
+        self.assertEqual(ValorIndice.objects.filter(codigo=12).count(), 7)
+
+    def test_serie_sem_dados_nao_falha(self):
+        self.sync('SELIC')
+
+        self.assertFalse(ValorIndice.objects.filter(codigo=sgs.SERIES_SGS['SELIC']['codigo']).exists())
+
+
+def _criar_ipca(inicio, variacoes):
+    """Grava IndiceIPCA mês a mês a partir de 'inicio', como sincronizar_ipca."""
+    acumulado = Decimal(1)
+    for meses, variacao in enumerate(map(Decimal, variacoes)):
+        acumulado = (acumulado * (1 + variacao)).quantize(inflacao.PRECISAO_INDICE)
+        IndiceIPCA.objects.create(competencia=inicio + relativedelta(months=meses), variacao=variacao, numero_indice=acumulado)
+
+
+class _RoteiroHandler(BaseHTTPRequestHandler):
+    """Responde a cada caminho com os status do roteiro, em ordem; depois 200."""
+    protocol_version = 'HTTP/1.1'
+    roteiro = {}
+    requisicoes = []
+
+    def do_GET(self):
+        self.requisicoes.append(self.path)
+        fila = self.roteiro.get(self.path)
+        status, cabecalhos = fila.pop(0) if fila else (200, {})
+        corpo = b'{"ok": true}'
+        self.send_response(status)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class ClienteHttpTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _RoteiroHandler)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.servidor.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _RoteiroHandler.roteiro = {}
+        _RoteiroHandler.requisicoes.clear()
+        # Sessão e métricas novas (127.0.0.1 não tem disjuntor)
+        for patcher in [
+            mock.patch.object(cliente_http, '_sessao', None),
+            mock.patch.object(cliente_http, '_metricas', type(cliente_http._metricas)(cliente_http._metricas.default_factory)),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: cliente_http._sessao and cliente_http._sessao.close())
+
+    def test_retenta_5xx_e_429_com_backoff(self):
+        _RoteiroHandler.roteiro = {'/instavel': [(503, {}), (429, {}), (200, {})]}
+
+        inicio = time.monotonic()
+        response = cliente_http.get(f'{self.url}/instavel')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_RoteiroHandler.requisicoes, ['/instavel'] * 3)
+        # Backoff antes da 3ª tentativa: backoff_factor * 2
+        self.assertGreaterEqual(time.monotonic() - inicio, cliente_http.RETENTATIVAS.backoff_factor * 2)
+
+    def test_desiste_depois_das_retentativas(self):
+        _RoteiroHandler.roteiro = {'/fora': [(503, {})] * 5}
+
+        response = cliente_http.get(f'{self.url}/fora')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(_RoteiroHandler.requisicoes), 1 + cliente_http.RETENTATIVAS.total)
+
+    def test_retry_after_limitado(self):
+        _RoteiroHandler.roteiro = {'/limite': [(429, {'Retry-After': '3600'}), (200, {})]}
+
+        inicio = time.monotonic()
+        with mock.patch.object(cliente_http, 'RETRY_AFTER_MAXIMO', 0.2):
+            response = cliente_http.get(f'{self.url}/limite')
+        segundos = time.monotonic() - inicio
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(segundos, 0.2)
+        self.assertLess(segundos, 2)
+
+    def test_sessao_compartilhada_reusa_conexao_e_conta_metricas(self):
+        _RoteiroHandler.roteiro = {'/erro': [(500, {})] * 3}
+
+        for _ in range(4):
+            cliente_http.get(f'{self.url}/ok')
+        cliente_http.get(f'{self.url}/erro')
+
+        self.assertIs(cliente_http.sessao(), cliente_http.sessao())
+        metricas = cliente_http.estatisticas()['127.0.0.1']
+        self.assertEqual(metricas['requisicoes'], 5)
+        self.assertEqual(metricas['erros'], 1)
+        # 4 + 3 tentativas do /erro numa única conexão keep-alive
+        self.assertEqual(metricas['requisicoes_no_pool'], 7)
+        self.assertEqual(metricas['conexoes_abertas'], 1)
+        self.assertEqual(metricas['taxa_reuso'], round(1 - 1 / 7, 3))
+
+
+class IndiceAcumuladoTest(TestCase):
+    # IPCA de jan/2024 a dez/2024
+    VARIACOES = ['0.0042', '0.0083', '0.0016', '0.0038', '0.0046', '0.0021',
+                 '0.0038', '-0.0002', '0.0044', '0.0056', '0.0039', '0.0052']
+    CASOS = [
+        (date(2024, 3, 15), date(2024, 9, 1)),    # dentro da série
+        (date(2023, 6, 1), date(2024, 4, 1)),     # começa antes da série
+        (date(2024, 10, 5), date(2025, 3, 1)),    # termina depois do último mês publicado
+        (date(2025, 2, 1), date(2025, 6, 1)),     # só meses não publicados
+        (date(2024, 8, 1), date(2024, 5, 1)),     # data posterior a 'ate'
+        (date(2024, 7, 1), date(2024, 7, 20)),    # mesmo mês
+    ]
+
+    def setUp(self):
+        _criar_ipca(date(2024, 1, 1), self.VARIACOES)
+        # Sem sincronização com o BCB: a tabela é a série inteira
+        patcher = mock.patch.object(inflacao, '_garantir_ipca_ate')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fator_mes_a_mes(self, inicio, ate):
+        """Laço antigo: aplica o IPCA de cada mês de inicio até ate-1 (mês sem IPCA não corrige)."""
+        ipca = dict(IndiceIPCA.objects.values_list('competencia', 'variacao'))
+        fator = Decimal(1)
+        competencia, fim = inflacao._ordinal_mes(inicio), inflacao._ordinal_mes(ate)
+        while competencia < fim:
+            fator *= 1 + ipca.get(date(competencia // 12, competencia % 12 + 1, 1), Decimal(0))
+            competencia += 1
+        return fator
+
+    def test_razao_de_indices_igual_ao_laco_mes_a_mes(self):
+        for inicio, ate in self.CASOS:
+            esperado = self.fator_mes_a_mes(inicio, ate)
+            fator = inflacao.fator_correção_ate(inicio.year, inicio.month, ate.year, ate.month)
+            self.assertAlmostEqual(float(fator), float(esperado), places=12, msg=(inicio, ate))
+            indice = inflacao.IndiceAcumulado.carregar(ate)
+            self.assertAlmostEqual(indice.fator(inicio, ate), float(esperado), places=12, msg=(inicio, ate))
+
+    def test_correcao_vetorizada_igual_ao_laco_mes_a_mes(self):
+        ate = date(2025, 1, 10)
+        pares = [(Decimal('1000.00'), inicio) for inicio, _ in self.CASOS] + [(Decimal('250.50'), date(2024, 12, 31))]
+
+        corrigidos = inflacao.corrigir_valores(pares, ate=ate)
+
+        esperados = [float(valor * self.fator_mes_a_mes(data, ate)) for valor, data in pares]
+        np.testing.assert_allclose(corrigidos, esperados, rtol=1e-12)
+        # Aporte posterior a 'ate' (e meses sem IPCA) não é corrigido
+        self.assertEqual(inflacao.corrigir_valores([(Decimal('100'), date(2025, 6, 1))], ate=ate)[0], 100.0)
+
+    def test_serie_vazia_nao_corrige(self):
+        IndiceIPCA.objects.all().delete()
+
+        self.assertEqual(inflacao.corrigir_valores([(Decimal('100'), date(2024, 1, 1))], ate=date(2025, 1, 1))[0], 100.0)
+        self.assertEqual(inflacao.fator_correção_ate(2024, 1, 2025, 1), Decimal(1))
+
+
+class CorrigirAportesTest(TestCase):
+    def setUp(self):
+        self.mes_atual = inflacao._competencia(date.today().year, date.today().month)
+        # 1% ao mês nos últimos 12 meses
+        _criar_ipca(self.mes_atual - relativedelta(months=12), ['0.01'] * 12)
+        patcher = mock.patch.object(inflacao, '_garantir_ipca_ate')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_corrige_aportes_de_todos_os_usuarios_em_lotes(self):
+        for nome in ('ana', 'bruno'):
+            usuario = User.objects.create_user(nome, password='senha')
+            for meses in range(1, 6):
+                Aporte.objects.create(usuario=usuario, data=self.mes_atual - relativedelta(months=meses, days=-4), valor=Decimal('100.00'))
+        saida = StringIO()
+
+        with mock.patch.object(Aporte.objects, 'bulk_update', wraps=Aporte.objects.bulk_update) as bulk_update:
+            call_command('corrigir_aportes', tamanho_lote=3, stdout=saida)
+
+        self.assertEqual(bulk_update.call_args.kwargs['batch_size'], 3)
+        self.assertIn('10 aporte(s) corrigido(s)', saida.getvalue())
+        self.assertIn('linhas/s', saida.getvalue())
+        self.assertFalse(Aporte.objects.filter(valor_corrigido__isnull=True).exists())
+        for aporte in Aporte.objects.all():
+            meses = inflacao._ordinal_mes(self.mes_atual) - inflacao._ordinal_mes(aporte.data)
+            self.assertEqual(aporte.valor_corrigido, Decimal(f"{100 * 1.01 ** meses:.2f}"), aporte.data)
+
+
+def _hoje(dia):
+    """Patch de date.today() no módulo inflacao."""
+    class Data(date):
+        @classmethod
+        def today(cls):
+            return dia
+    return mock.patch.object(inflacao, 'date', Data)
+
+
+class DivulgacaoIPCATest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Série até ago/2026; o IPCA de set/2026 sai em 10/10/2026
+        _criar_ipca(date(2026, 1, 1), ['0.004'] * 8)
+        patcher = mock.patch.object(sgs.cliente_http, 'sessao')
+        self.sessao = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sessao.return_value.get.return_value = mock.Mock(ok=True, status_code=200, json=lambda: [])
+
+    def test_mes_ainda_nao_divulgado_nao_faz_requisicao(self):
+        with _hoje(date(2026, 10, 5)):
+            self.assertEqual(inflacao.ultima_competencia_publicada(), date(2026, 8, 1))
+            self.assertIsNone(inflacao.buscar_ipca(2026, 9))
+            inflacao.fator_correção_ate(2026, 1, 2026, 11)
+
+        self.sessao.assert_not_called()
+
+    def test_divulgacao_atrasada_fica_em_cache_ate_a_retentativa(self):
+        with _hoje(date(2026, 10, 12)):
+            for _ in range(3):
+                self.assertIsNone(inflacao.buscar_ipca(2026, 9))
+            self.assertEqual(self.sessao.return_value.get.call_count, 1)
+
+            with mock.patch('time.time', return_value=time.time() + inflacao.INTERVALO_RETENTATIVA_IPCA - 60):
+                inflacao.buscar_ipca(2026, 9)
+            self.assertEqual(self.sessao.return_value.get.call_count, 1)
+
+            with mock.patch('time.time', return_value=time.time() + inflacao.INTERVALO_RETENTATIVA_IPCA + 1):
+                inflacao.buscar_ipca(2026, 9)
+            self.assertEqual(self.sessao.return_value.get.call_count, 2)
+
+
+class PlanejamentoCorrigidoTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('investidor', password='senha')
+        # IPCA de jan a jul/2026
+        self.variacoes = ['0.0016', '0.0131', '0.0056', '0.0043', '0.0026', '0.0024', '0.0026', '-0.0011', '0.0048']
+        _criar_ipca(date(2026, 1, 1), self.variacoes[:7])
+        self.planejamento = self.criar(self.usuario, '1000.00')
+
+    def criar(self, usuario, valor):
+        planejamento = PlanejamentoMensal.objects.create(usuario=usuario, valor_planejado=Decimal(valor))
+        PlanejamentoMensal.objects.filter(pk=planejamento.pk).update(data_inicio=date(2026, 3, 5))
+        planejamento.refresh_from_db()
+        return planejamento
+
+    def esperado(self, valor, meses):
+        """Valor corrigido pelo IPCA de mar/2026 em diante, 'meses' meses."""
+        return float(self.esperado_decimal(valor, meses))
+
+    def esperado_decimal(self, valor, meses):
+        """Pelos números-índice gravados (fev/2026 é a base), arredondado uma vez."""
+        indices = dict(IndiceIPCA.objects.values_list('competencia', 'numero_indice'))
+        fator = indices[date(2026, 2, 1) + relativedelta(months=meses)] / indices[date(2026, 2, 1)]
+        return round(Decimal(valor) * fator, 2)
+
+    def test_avanca_varios_meses_de_uma_vez(self):
+        with _hoje(date(2026, 8, 20)):
+            self.assertEqual(self.planejamento.calcular_valor_corrigido(), self.esperado('1000', 5))
+        self.assertEqual(self.planejamento.ultimo_ipca_aplicado, date(2026, 7, 1))
+
+        # Chegam ago e set/2026 juntos: avança dois meses a partir do valor gravado
+        IndiceIPCA.objects.all().delete()
+        _criar_ipca(date(2026, 1, 1), self.variacoes)
+        with _hoje(date(2026, 10, 20)):
+            self.assertEqual(self.planejamento.calcular_valor_corrigido(), self.esperado('1000', 7))
+
+        planejamento = PlanejamentoMensal.objects.get(pk=self.planejamento.pk)
+        self.assertEqual(planejamento.ultimo_ipca_aplicado, date(2026, 9, 1))
+        self.assertEqual(planejamento.valor_corrigido, self.esperado_decimal('1000', 7))
+
+    def test_avancar_mes_a_mes_nao_acumula_arredondamento(self):
+        IndiceIPCA.objects.all().delete()
+        _criar_ipca(date(2026, 1, 1), self.variacoes)
+        de_uma_vez = self.criar(User.objects.create_user('de_uma_vez', password='senha'), '1000.28')
+        mes_a_mes = self.criar(User.objects.create_user('mes_a_mes', password='senha'), '1000.28')
+
+        # Um mês de IPCA novo por vez, de abr a out/2026
+        for mes in range(4, 11):
+            with _hoje(date(2026, mes, 20)):
+                mes_a_mes.calcular_valor_corrigido()
+                mes_a_mes = PlanejamentoMensal.objects.get(pk=mes_a_mes.pk)
+        with _hoje(date(2026, 10, 20)):
+            de_uma_vez.calcular_valor_corrigido()
+
+        self.assertEqual(mes_a_mes.ultimo_ipca_aplicado, date(2026, 9, 1))
+        self.assertEqual(mes_a_mes.valor_corrigido, self.esperado_decimal('1000.28', 7))
+        # Arredondando a cada mês daria 1021.67
+        self.assertEqual(mes_a_mes.valor_corrigido, Decimal('1021.66'))
+        self.assertEqual(mes_a_mes.valor_corrigido, PlanejamentoMensal.objects.get(pk=de_uma_vez.pk).valor_corrigido)
+
+    def test_segunda_chamada_no_mes_nao_grava(self):
+        with _hoje(date(2026, 8, 20)):
+            self.planejamento.calcular_valor_corrigido()
+            planejamento = PlanejamentoMensal.objects.get(pk=self.planejamento.pk)
+
+            esperado = self.esperado('1000', 5)
+
+            # Só a consulta do último IPCA gravado
+            with self.assertNumQueries(1):
+                self.assertEqual(planejamento.calcular_valor_corrigido(), esperado)
+
+    def test_mudar_valor_planejado_refaz_a_correcao(self):
+        self.client.force_login(self.usuario)
+        with _hoje(date(2026, 8, 20)):
+            self.planejamento.calcular_valor_corrigido()
+            self.client.post('/investments/planejamento/', {'valor_planejado': '2000,00'})
+
+            planejamento = PlanejamentoMensal.objects.get(pk=self.planejamento.pk)
+            self.assertIsNone(planejamento.valor_corrigido)
+            self.assertEqual(planejamento.calcular_valor_corrigido(), self.esperado('2000', 5))
+
+    def test_admin_lista_sem_consulta_por_planejamento(self):
+        admin = User.objects.create_superuser('admin', password='senha')
+        self.client.force_login(admin)
+
+        def consultas():
+            with CaptureQueriesContext(connection) as contexto:
+                self.assertEqual(self.client.get('/admin/investments/planejamentomensal/').status_code, 200)
+            return len(contexto)
+
+        with _hoje(date(2026, 8, 20)):
+            poucos = consultas()
+            for i in range(5):
+                self.criar(User.objects.create_user(f'outro{i}', password='senha'), '500.00')
+            self.assertEqual(consultas(), poucos)
+
+
+class IndiceAtivosTest(TestCase):
+    def setUp(self):
+        self.indice = universo.IndiceAtivos('v1', [
+            {'ticker': 'VALE3', 'nome': 'Vale', 'tipo': 'stock'},
+            {'ticker': 'PETR4', 'nome': 'Petrobras PN', 'tipo': 'stock'},
+            {'ticker': 'HGLG11', 'nome': 'CSHG Logística', 'tipo': 'fii'},
+            {'ticker': 'BBAS3', 'nome': 'Banco do Brasil', 'tipo': 'stock'},
+            {'ticker': 'PETR3', 'nome': 'Petróleo Brasileiro', 'tipo': 'stock'},
+        ])
+
+    def tickers(self, *args, **kwargs):
+        return [a['ticker'] for a in self.indice.buscar(*args, **kwargs)]
+
+    def test_prefixo_de_ticker_vem_primeiro(self):
+        self.assertEqual(self.tickers('petr'), ['PETR3', 'PETR4'])
+        self.assertEqual(self.tickers('brasil'), ['BBAS3', 'PETR3'])
+
+    def test_nome_sem_acento(self):
+        self.assertEqual(self.tickers('logistica'), ['HGLG11'])
+        self.assertEqual(self.tickers('petroleo'), ['PETR3'])
+
+    def test_filtro_e_limite(self):
+        self.assertEqual(self.tickers('1', filtro=lambda a: not a['ticker'].endswith('11')), [])
+        self.assertEqual(len(self.tickers('a', limite=2)), 2)
+
+
+class UniversoSnapshotTest(TransactionTestCase):
+    ATIVOS = [{'ticker': 'PETR4', 'nome': 'Petrobras PN', 'tipo': 'stock'}]
+
+    def setUp(self):
+        cache.clear()
+        # O download roda no pool: os testes executam o que foi submetido
+        patcher = mock.patch.object(universo, '_executor')
+        self.executor = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sem_lista_nao_baixa_na_requisicao_e_usa_busca_da_brapi(self):
+        resposta = mock.Mock(status_code=200, json=lambda: {'stocks': [
+            {'stock': 'PETR4', 'name': 'Petrobras PN'}, {'stock': 'PETR11', 'name': 'Fundo'},
+        ]})
+
+        with mock.patch.object(universo, 'baixar_universo') as baixar, \
+                mock.patch.object(universo.cliente_http, 'get', return_value=resposta) as get:
+            self.assertIsNone(universo.obter_snapshot())
+            resultados = universo.buscar_ativos('PETR', filtro=lambda a: a['tipo'] == 'stock')
+
+        baixar.assert_not_called()
+        self.assertEqual(get.call_args.kwargs['params'], {'search': 'PETR'})
+        self.assertEqual([a['ticker'] for a in resultados], ['PETR4'])
+        # Uma só atualização disparada para as duas requisições
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+    def test_lista_vencida_serve_a_anterior_enquanto_atualiza(self):
+        antigo = {'versao': 'v0', 'baixado_em': time.time() - universo.VALIDADE - 1, 'ativos': self.ATIVOS}
+        cache.set(universo.CHAVE_CACHE, antigo)
+
+        for _ in range(2):
+            self.assertEqual(universo.obter_snapshot()['versao'], 'v0')
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+        with mock.patch.object(universo, 'baixar_universo', return_value=self.ATIVOS + [
+            {'ticker': 'VALE3', 'nome': 'Vale', 'tipo': 'stock'},
+        ]):
+            funcao, *argumentos = self.executor.submit.call_args.args
+            funcao(*argumentos)
+
+        self.assertFalse(travas.ativa(f"{universo.CHAVE_CACHE}:atualizando"))
+        self.assertEqual(len(universo.obter_snapshot()['ativos']), 2)
+
+
+class HistoricoPrecosTest(SimpleTestCase):
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(HISTORICO_PRECOS_DIR=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def registros(self, *dias_e_precos):
+        registros = np.zeros(len(dias_e_precos), dtype=historico_precos.REGISTRO)
+        registros['data'] = [np.datetime64(d, 'D') for d, _ in dias_e_precos]
+        registros['fechamento'] = [p for _, p in dias_e_precos]
+        return registros
+
+    def test_anexa_so_dias_novos(self):
+        historico_precos.anexar('PETR4', self.registros(('2026-03-02', 30.0), ('2026-03-03', 31.0)))
+        novos = historico_precos.anexar('PETR4', self.registros(('2026-03-03', 99.0), ('2026-03-04', 32.0)))
+
+        self.assertEqual(novos, 1)
+        self.assertEqual(list(historico_precos.ler('PETR4')['fechamento']), [30.0, 31.0, 32.0])
+        self.assertEqual(historico_precos.ultima_data('PETR4'), date(2026, 3, 4))
+
+    def test_historico_alinhado_por_data(self):
+        historico_precos.anexar('PETR4', self.registros(('2026-03-02', 30.0), ('2026-03-04', 32.0)))
+        historico_precos.anexar('VALE3', self.registros(('2026-03-03', 60.0), ('2026-03-04', 61.0)))
+
+        datas, valores = historico_precos.historico(['PETR4', 'VALE3', 'XXXX3'], inicio=date(2026, 3, 3))
+
+        self.assertEqual(list(datas.astype(str)), ['2026-03-03', '2026-03-04'])
+        np.testing.assert_array_equal(valores, [[np.nan, 60.0, np.nan], [32.0, 61.0, np.nan]])
+
+    def test_atualizacao_confere_o_ultimo_dia_e_anexa(self):
+        historico_precos.anexar('PETR4', self.registros(('2026-03-02', 30.0), ('2026-03-03', 31.0)))
+        baixados = {'PETR4': self.registros(('2026-03-03', 31.0), ('2026-03-04', 32.0))}
+
+        with mock.patch.object(historico_precos, 'baixar_historico', return_value=baixados) as baixar:
+            novos = historico_precos.atualizar_historico(['PETR4'], ate=date(2026, 3, 4))
+
+        self.assertEqual(novos, {'PETR4': 1})
+        self.assertEqual(baixar.call_args.args[1], date(2026, 3, 3))
+        self.assertEqual(list(historico_precos.ler('PETR4')['fechamento']), [30.0, 31.0, 32.0])
+
+    def test_split_reescreve_a_serie_ajustada(self):
+        historico_precos.anexar('PETR4', self.registros(('2026-03-02', 30.0), ('2026-03-03', 31.0)))
+        # Desdobramento 1:2 depois de 03/03: o Yahoo devolve o passado já ajustado
+        sobreposicao = {'PETR4': self.registros(('2026-03-03', 15.5), ('2026-03-04', 16.0))}
+        completo = {'PETR4': self.registros(('2026-03-02', 15.0), ('2026-03-03', 15.5), ('2026-03-04', 16.0))}
+
+        with mock.patch.object(historico_precos, 'baixar_historico', side_effect=[sobreposicao, completo]) as baixar:
+            novos = historico_precos.atualizar_historico(['PETR4'], ate=date(2026, 3, 4))
+
+        self.assertEqual(novos, {'PETR4': 1})
+        self.assertEqual(baixar.call_args.args[1], date(2026, 3, 2))
+        self.assertEqual(list(historico_precos.ler('PETR4')['fechamento']), [15.0, 15.5, 16.0])
+
+
+class ExecucaoComPrazoTest(SimpleTestCase):
+    def test_atrasada_e_falha_usam_fallback(self):
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+
+        def falha():
+            raise RuntimeError('fora do ar')
+
+        resultados, atrasadas = concorrencia.executar_com_prazo(
+            {'rapida': lambda: 1, 'lenta': lambda: liberar.wait(5) and 2, 'falha': falha},
+            prazo=0.1,
+            fallbacks={'lenta': lambda: 'último conhecido'},
+        )
+
+        self.assertEqual(resultados, {'rapida': 1, 'lenta': 'último conhecido', 'falha': None})
+        self.assertEqual(atrasadas, ['lenta', 'falha'])
+
+
+def _em_processos(chamada, n=4):
+    """
+    Roda chamada() em n processos de verdade (fork), largando todos juntos.
+    Retorna a lista de resultados (ou 'erro: ...').
+    """
+    contexto = multiprocessing.get_context('fork')
+    largada = contexto.Event()
+    saidas = contexto.Queue()
+
+    def rodar():
+        largada.wait(10)
+        try:
+            saidas.put(chamada())
+        except Exception as e:
+            saidas.put(f"erro: {type(e).__name__}: {e}")
+        finally:
+            connections.close_all()
+
+    # Cada processo abre a própria conexão com o banco de teste
+    connections.close_all()
+    processos = [contexto.Process(target=rodar) for _ in range(n)]
+    for processo in processos:
+        processo.start()
+    largada.set()
+    resultados = [saidas.get(timeout=30) for _ in processos]
+    for processo in processos:
+        processo.join(10)
+    return resultados
+
+
+class _CacheEmArquivo:
+    """Cache compartilhado entre processos (FileBasedCache num diretório temporário)."""
+
+    def setUp(self):
+        super().setUp()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': diretorio.name,
+        }})
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+
+class TravasTest(TestCase):
+    def test_so_um_adquire(self):
+        dono = travas.adquirir('teste', 10)
+
+        self.assertTrue(dono)
+        self.assertIsNone(travas.adquirir('teste', 10))
+        self.assertTrue(travas.ativa('teste'))
+
+    def test_trava_vencida_e_assumida(self):
+        velho = travas.adquirir('teste', 10)
+        Trava.objects.update(expira_em=timezone.now() - timedelta(seconds=1))
+
+        self.assertFalse(travas.ativa('teste'))
+        novo = travas.adquirir('teste', 10)
+        self.assertTrue(novo)
+
+        # O dono antigo não solta a trava de quem assumiu
+        travas.liberar('teste', velho)
+        self.assertTrue(travas.ativa('teste'))
+        travas.liberar('teste', novo)
+        self.assertFalse(travas.ativa('teste'))
+
+
+class SingleFlightTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def em_paralelo(self, chamada, n=5):
+        """Roda chamada() em n threads; retorna lista de (resultado, exceção)."""
+        saidas = []
+
+        def rodar():
+            try:
+                saidas.append((chamada(), None))
+            except Exception as e:
+                saidas.append((None, e))
+
+        threads = [threading.Thread(target=rodar) for _ in range(n)]
+        for thread in threads:
+            thread.start()
+        return threads, saidas
+
+    def test_threads_simultaneas_compartilham_uma_execucao(self):
+        liberar = threading.Event()
+        funcao = mock.Mock(side_effect=lambda: liberar.wait(5) and 42)
+
+        threads, saidas = self.em_paralelo(lambda: singleflight.executar('teste:valor', funcao))
+        time.sleep(0.1)
+        liberar.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(funcao.call_count, 1)
+        self.assertEqual(saidas, [(42, None)] * 5)
+
+    def test_excecao_do_lider_chega_a_todos(self):
+        liberar = threading.Event()
+
+        def falha():
+            liberar.wait(5)
+            raise ValueError('brapi fora')
+
+        threads, saidas = self.em_paralelo(lambda: singleflight.executar('teste:erro', falha))
+        time.sleep(0.1)
+        liberar.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(saidas), 5)
+        self.assertTrue(all(isinstance(erro, ValueError) for _, erro in saidas))
+        # Resultado de erro publicado para outros processos
+        self.assertIn('erro', cache.get('singleflight:teste:erro:resultado'))
+
+    def test_outro_processo_com_a_trava_publica_o_resultado(self):
+        travas.adquirir('singleflight:teste:processo', 30)
+        threading.Timer(0.1, cache.set, args=('singleflight:teste:processo:resultado', {'valor': 7})).start()
+        funcao = mock.Mock(return_value=99)
+
+        self.assertEqual(singleflight.executar('teste:processo', funcao, espera=5), 7)
+        funcao.assert_not_called()
+
+    def test_falha_publicada_por_outro_processo(self):
+        travas.adquirir('singleflight:teste:falha', 30)
+        cache.set('singleflight:teste:falha:resultado', {'erro': 'ValueError: brapi fora'})
+
+        with self.assertRaises(singleflight.FalhaNoLider):
+            singleflight.executar('teste:falha', mock.Mock(), espera=5)
+
+    def test_lider_de_outro_processo_sem_resposta_executa_sozinho(self):
+        travas.adquirir('singleflight:teste:prazo', 30)
+        funcao = mock.Mock(return_value=3)
+
+        inicio = time.monotonic()
+        self.assertEqual(singleflight.executar('teste:prazo', funcao, espera=0.3), 3)
+
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.3)
+        funcao.assert_called_once()
+
+    def test_trava_livre_descarta_resultado_da_rodada_anterior(self):
+        funcao = mock.Mock(return_value='novo')
+        cache.set('singleflight:teste:rodada:resultado', {'valor': 'antigo'})
+
+        self.assertEqual(singleflight.executar('teste:rodada', funcao), 'novo')
+        self.assertFalse(travas.ativa('singleflight:teste:rodada'))
+        self.assertEqual(cache.get('singleflight:teste:rodada:resultado'), {'valor': 'novo'})
+
+
+class SingleFlightProcessosTest(_CacheEmArquivo, TransactionTestCase):
+    def test_processos_simultaneos_compartilham_uma_execucao(self):
+        with tempfile.NamedTemporaryFile() as registro:
+            def buscar():
+                # Anota cada execução no arquivo (O_APPEND) e demora para segurar a trava
+                with open(registro.name, 'a') as arquivo:
+                    arquivo.write(f"{os.getpid()}\n")
+                time.sleep(0.5)
+                return 'cotacoes'
+
+            resultados = _em_processos(lambda: singleflight.executar('teste:corrida', buscar, espera=10))
+
+            execucoes = Path(registro.name).read_text().splitlines()
+
+        self.assertEqual(len(execucoes), 1)
+        self.assertEqual(resultados, ['cotacoes'] * 4)
+
+
+class InicializacaoTest(SimpleTestCase):
+    def test_importar_app_nao_carrega_modulos_pesados(self):
+        from investments.management.commands.startup_profile import medir
+
+        medicao = medir('investments')
+
+        self.assertEqual(medicao['pesados'], [])
+
+
+class ValuationSnapshotTest(TransactionTestCase):
+    # As etapas da IA passam pelo single-flight (trava no banco) nas threads do pool
+    DADOS = {'ticker': 'PETR4', 'preco': 30.0, 'lpa': 5.0, 'pl': 6.0, 'roe': 20.0, 'dy': 10.0, 'vpa': 25.0}
+
+    def setUp(self):
+        cache.clear()
+        for nome, retorno in [
+            ('extrair_dados_investidor10', dict(self.DADOS)),
+            ('gerar_analise_ia', 'Análise'),
+            ('buscar_noticias_resumo', 'Notícias'),
+            ('_preco_atual', 33.0),
+        ]:
+            patcher = mock.patch.object(valuation_openai, nome, return_value=retorno)
+            setattr(self, nome.strip('_'), patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def envelhecer(self, **partes):
+        agora = timezone.now()
+        ValuationSnapshot.objects.filter(ticker='PETR4').update(
+            **{f"{parte}_em": agora - idade for parte, idade in partes.items()}
+        )
+
+    def test_segunda_chamada_serve_do_snapshot(self):
+        valuation_openai._calcular_valuation('PETR4')
+        resultado = valuation_openai._calcular_valuation('PETR4')
+
+        self.assertEqual(self.extrair_dados_investidor10.call_count, 1)
+        self.assertEqual(self.gerar_analise_ia.call_count, 1)
+        self.assertEqual(self.buscar_noticias_resumo.call_count, 1)
+        self.assertEqual(resultado['ai_analysis'], 'Análise')
+        self.assertEqual(resultado['preco_atual'], 'R$ 30.00')
+
+    def test_refaz_so_as_partes_vencidas(self):
+        valuation_openai._calcular_valuation('PETR4')
+        self.envelhecer(preco=timedelta(hours=1), noticias=timedelta(days=1))
+
+        resultado = valuation_openai._calcular_valuation('PETR4')
+
+        self.assertEqual(self.extrair_dados_investidor10.call_count, 1)
+        self.assertEqual(self.gerar_analise_ia.call_count, 1)
+        self.assertEqual(self.buscar_noticias_resumo.call_count, 2)
+        self.assertEqual(resultado['preco_atual'], 'R$ 33.00')
+        self.assertEqual(resultado['bazin']['status'], 'COMPRAR')
+
+    def test_falha_na_extracao_usa_fundamentos_anteriores(self):
+        valuation_openai._calcular_valuation('PETR4')
+        self.envelhecer(fundamentos=timedelta(days=10))
+        self.extrair_dados_investidor10.return_value = None
+
+        resultado = valuation_openai._calcular_valuation('PETR4')
+
+        self.assertEqual(resultado['dados_base']['lpa'], 'R$ 5.00')
+
+    def test_snapshot_criado_por_outro_worker_no_meio(self):
+        def extrair_enquanto_outro_grava(ticker):
+            ValuationSnapshot.objects.create(ticker=ticker, fundamentos={'preco': 1.0})
+            return dict(self.DADOS)
+
+        self.extrair_dados_investidor10.side_effect = extrair_enquanto_outro_grava
+
+        resultado = valuation_openai._calcular_valuation('PETR4')
+
+        self.assertEqual(resultado['ticker'], 'PETR4')
+        self.assertEqual(ValuationSnapshot.objects.get(ticker='PETR4').fundamentos['lpa'], 5.0)
+
+    def test_etapas_rodam_sobrepostas(self):
+        def lenta(segundos, retorno):
+            def funcao(*args):
+                time.sleep(segundos)
+                return retorno
+            return funcao
+
+        self.extrair_dados_investidor10.side_effect = lenta(0.2, dict(self.DADOS))
+        self.gerar_analise_ia.side_effect = lenta(0.2, 'Análise')
+        self.buscar_noticias_resumo.side_effect = lenta(0.3, 'Notícias')
+
+        tempos = valuation_openai._calcular_valuation('PETR4')['tempos']
+
+        self.assertEqual(set(tempos), {'fundamentos', 'analise', 'noticias', 'preco', 'total'})
+        # Em sequência seriam 700 ms; notícias correm junto com extração + análise
+        self.assertLess(tempos['total'], 600)
+
+    def test_streaming_envia_resultado_antes_dos_textos(self):
+        def chat(pedido, validade):
+            yield 'Parte 1. '
+            yield 'Parte 2.'
+
+        with mock.patch.object(valuation_openai, '_transmitir_chat', side_effect=chat):
+            eventos = list(valuation_openai.transmitir_valuation('petr4'))
+
+        nomes = [nome for nome, _ in eventos]
+        self.assertEqual(nomes[0], 'resultado')
+        self.assertIsNone(eventos[0][1]['ai_analysis'])
+        self.assertEqual(nomes.count('analise'), 2)
+        self.assertEqual(nomes.count('noticias'), 2)
+        self.assertEqual(eventos[-1][0], 'fim')
+        self.assertEqual(eventos[-1][1]['ai_analysis'], 'Parte 1. Parte 2.')
+        self.assertEqual(ValuationSnapshot.objects.get(ticker='PETR4').noticias, 'Parte 1. Parte 2.')
+
+    def test_streams_simultaneos_compartilham_raspagem_e_ia(self):
+        def extrair(ticker):
+            time.sleep(0.3)
+            return dict(self.DADOS)
+
+        def chat(pedido, validade):
+            time.sleep(0.2)
+            yield 'Parte 1. '
+            time.sleep(0.1)
+            yield 'Parte 2.'
+
+        self.extrair_dados_investidor10.side_effect = extrair
+        eventos = {}
+
+        def assistir(nome):
+            try:
+                eventos[nome] = list(valuation_openai.transmitir_valuation('PETR4'))
+            finally:
+                connections.close_all()
+
+        with mock.patch.object(valuation_openai, '_transmitir_chat', side_effect=chat) as transmitir_chat:
+            threads = [threading.Thread(target=assistir, args=(nome,)) for nome in ('ana', 'bruno')]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(10)
+
+        self.assertEqual(self.extrair_dados_investidor10.call_count, 1)
+        # Análise e notícias: uma chamada de cada para os dois streams
+        self.assertEqual(transmitir_chat.call_count, 2)
+        for nome in ('ana', 'bruno'):
+            evento, dados = eventos[nome][-1]
+            self.assertEqual(evento, 'fim')
+            self.assertEqual(dados['ai_analysis'], 'Parte 1. Parte 2.')
+            self.assertEqual(dados['news_summary'], 'Parte 1. Parte 2.')
+
+
+class FilaValuationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('investidor', password='senha')
+        self.client.force_login(self.usuario)
+        # O pool não roda nos testes: o job é executado na própria thread
+        patcher = mock.patch.object(fila_valuation, '_executor')
+        self.executor = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(fila_valuation._na_fila.clear)
+
+    def transmitir(self, *eventos):
+        return mock.patch.object(valuation_openai, 'transmitir_valuation', side_effect=lambda ticker: iter(eventos))
+
+    def enviar(self, ticker='PETR4'):
+        response = self.client.post('/investments/api/valuation/jobs/', {'ticker': ticker})
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_envio_responde_com_id_e_consulta_traz_resultado(self):
+        job = self.enviar()
+        self.assertEqual(self.enviar()['job_id'], job['job_id'])
+        self.assertEqual(self.executor.submit.call_count, 1)
+        self.assertEqual(self.client.get(job['url']).json()['posicao'], 1)
+
+        with self.transmitir(
+            ('resultado', {'ticker': 'PETR4', 'ai_analysis': None, 'news_summary': None}),
+            ('analise', {'texto': 'Barata.'}),
+            ('fim', {'ai_analysis': 'Barata.', 'news_summary': 'Sem notícias.', 'tempos': {'total': 10}}),
+        ):
+            fila_valuation.executar_job(job['job_id'])
+
+        situacao = self.client.get(job['url']).json()
+        self.assertEqual(situacao['status'], StatusJob.CONCLUIDO)
+        self.assertEqual(situacao['resultado']['ai_analysis'], 'Barata.')
+        self.assertEqual(situacao['resultado']['news_summary'], 'Sem notícias.')
+
+        estatisticas = fila_valuation.estatisticas()
+        self.assertEqual((estatisticas['amostra'], estatisticas['pendentes']), (1, 0))
+        self.assertIsNotNone(estatisticas['duracao_segundos']['p95'])
+
+    def test_erro_na_extracao_encerra_job(self):
+        job = self.enviar()
+        with self.transmitir(('erro', {'erro': 'Sem dados'})):
+            fila_valuation.executar_job(job['job_id'])
+
+        situacao = self.client.get(job['url']).json()
+        self.assertEqual((situacao['status'], situacao['erro']), (StatusJob.ERRO, 'Sem dados'))
+
+    def test_job_de_outro_usuario_nao_aparece(self):
+        outro = User.objects.create_user('outro', password='senha')
+        job = ValuationJob.objects.create(usuario=outro, ticker='VALE3')
+
+        self.assertEqual(self.client.get(f'/investments/api/valuation/jobs/{job.pk}/').status_code, 404)
+
+    def test_job_pendente_esquecido_e_reenviado(self):
+        job = self.enviar()
+        fila_valuation._na_fila.clear()
+        ValuationJob.objects.filter(pk=job['job_id']).update(criado_em=timezone.now() - timedelta(minutes=5))
+
+        self.client.get(job['url'])
+
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+
+
+class FilaValuationConcorrenciaTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(fila_valuation._na_fila.clear)
+
+    def test_mesmo_ticker_de_usuarios_diferentes_executa_uma_vez(self):
+        liberar = threading.Event()
+        chamadas = []
+
+        def transmitir(ticker):
+            chamadas.append(ticker)
+            yield 'resultado', {'ticker': ticker, 'ai_analysis': None, 'news_summary': None}
+            liberar.wait(5)
+            yield 'fim', {'ai_analysis': 'Barata.', 'news_summary': 'Sem notícias.', 'tempos': {}}
+
+        jobs = [
+            ValuationJob.objects.create(usuario=User.objects.create_user(nome), ticker='PETR4')
+            for nome in ('ana', 'bruno', 'carla')
+        ]
+        with mock.patch.object(valuation_openai, 'transmitir_valuation', side_effect=transmitir):
+            threads = [threading.Thread(target=fila_valuation._executar, args=(job.pk,)) for job in jobs]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.05)
+            liberar.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(chamadas, ['PETR4'])
+        for job in ValuationJob.objects.all():
+            self.assertEqual(job.status, StatusJob.CONCLUIDO)
+            self.assertEqual(job.resultado['ai_analysis'], 'Barata.')
+
+
+class ScreenerTest(TestCase):
+    def criar(self, ticker, **fundamentos):
+        dados = {'preco': 10.0, 'lpa': 1.0, 'pl': 10.0, 'roe': 10.0, 'dy': 5.0, 'vpa': 8.0, **fundamentos}
+        return ValuationSnapshot.objects.create(
+            ticker=ticker, fundamentos=dados, preco=Decimal(str(dados['preco'])),
+            fundamentos_em=timezone.now(), preco_em=timezone.now() - timedelta(hours=1),
+        )
+
+    def test_mesmo_resultado_de_calcular_metodos(self):
+        gerador = np.random.default_rng(7)
+        n = 300
+        colunas = {'ticker': np.array([f"T{i}" for i in range(n)])}
+        for campo in screener.CAMPOS:
+            valores = gerador.uniform(0.5, 40, n).round(2)
+            # Zeros: métodos sem dados suficientes
+            valores[gerador.random(n) < 0.15] = 0
+            colunas[campo] = valores
+        colunas['preco'][colunas['preco'] == 0] = 1.0
+
+        metricas = screener.avaliar(colunas)
+
+        for i in range(n):
+            esperado = valuation_openai.calcular_metodos({c: colunas[c][i] for c in screener.CAMPOS})
+            for metodo in screener.METODOS + ('recomendacao',):
+                self.assertEqual(screener.STATUS[metricas[metodo][i]], esperado[metodo]['status'], (i, metodo))
+            self.assertEqual(metricas['pontos_compra'][i], esperado['recomendacao']['pontos_compra'])
+
+    def test_ranking_filtra_ordena_e_usa_cotacao_mais_recente(self):
+        self.criar('BARA3', preco=5.0, dy=12.0)
+        self.criar('CARA3', preco=80.0, dy=1.0, roe=3.0)
+        self.criar('MEIO3', dy=7.0)
+        CotacaoAtual.objects.create(ticker='MEIO3', preco=Decimal('4.00'), atualizado_em=timezone.now())
+
+        ranking = screener.ranking()
+        # MEIO3 a R$ 4 (cotação nova) tem mais margem Graham que BARA3
+        self.assertEqual([r['ticker'] for r in ranking['resultados']], ['MEIO3', 'BARA3', 'CARA3'])
+        self.assertEqual(ranking['resultados'][0]['preco'], 4.0)
+        self.assertEqual(ranking['resultados'][2]['recomendacao']['status'], 'VENDER')
+
+        filtrado = screener.ranking(ordenar_por='-dy', dy_min=6)
+        self.assertEqual([r['ticker'] for r in filtrado['resultados']], ['BARA3', 'MEIO3'])
+
+        self.criar('NOVA3', preco=3.0, dy=20.0)
+        self.assertEqual(screener.ranking(ordenar_por='-dy', limite=1)['resultados'][0]['ticker'], 'NOVA3')
+
+    def test_ordenacao_invalida(self):
+        with self.assertRaises(ValueError):
+            screener.ranking(ordenar_por='nome')
+
+
+class CacheLLMTest(TestCase):
+    PEDIDO = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'PETR4'}], 'temperature': 0.5}
+
+    def test_mesmo_pedido_chama_a_api_uma_vez(self):
+        chamar = mock.Mock(return_value='Resposta')
+
+        for _ in range(2):
+            self.assertEqual(cache_llm.completar(self.PEDIDO, timedelta(hours=1), chamar), 'Resposta')
+        cache_llm.completar({**self.PEDIDO, 'temperature': 0.7}, timedelta(hours=1), chamar)
+
+        self.assertEqual(chamar.call_count, 2)
+        self.assertEqual(RespostaLLM.objects.get(chave=cache_llm.chave(self.PEDIDO)).acessos, 1)
+
+    def test_vencida_chama_de_novo_mas_replay_serve(self):
+        cache_llm.gravar(self.PEDIDO, 'Antiga', timedelta(seconds=-1))
+        chamar = mock.Mock(return_value='Nova')
+
+        with override_settings(LLM_CACHE_MODO='replay'):
+            self.assertEqual(cache_llm.completar(self.PEDIDO, timedelta(hours=1), chamar), 'Antiga')
+            with self.assertRaises(cache_llm.RespostaAusente):
+                cache_llm.completar({**self.PEDIDO, 'model': 'outro'}, timedelta(hours=1), chamar)
+        self.assertEqual(chamar.call_count, 0)
+
+        self.assertEqual(cache_llm.completar(self.PEDIDO, timedelta(hours=1), chamar), 'Nova')
+
+    def test_streaming_grava_texto_completo(self):
+        pedacos = lambda: iter(['Parte 1. ', 'Parte 2.'])
+
+        primeira = list(cache_llm.transmitir({**self.PEDIDO, 'stream': True}, timedelta(hours=1), pedacos))
+        segunda = list(cache_llm.transmitir(self.PEDIDO, timedelta(hours=1), mock.Mock()))
+
+        self.assertEqual(primeira, ['Parte 1. ', 'Parte 2.'])
+        self.assertEqual(segunda, ['Parte 1. Parte 2.'])
+
+    @override_settings(LLM_CACHE_MODO='replay')
+    def test_valuation_em_replay_nao_acessa_a_rede(self):
+        dados = {'preco': 30.0, 'lpa': 5.0, 'pl': 6.0, 'roe': 20.0, 'dy': 10.0, 'vpa': 25.0}
+        cache_llm.gravar(valuation_openai._pedido_analise('PETR4', dados), 'Gravada', timedelta(days=1))
+
+        with mock.patch.object(valuation_openai, 'cliente_openai', side_effect=AssertionError('rede')):
+            self.assertEqual(valuation_openai.gerar_analise_ia('PETR4', dados), 'Gravada')
+            self.assertEqual(valuation_openai.buscar_noticias_resumo('PETR4'), valuation_openai.NOTICIAS_INDISPONIVEIS)
+
+
+class CotacoesCacheTest(TransactionTestCase):
+    TIPOS = {'PETR4': 'ACOES', 'MXRF11': 'FUNDOS', 'BTC': 'CRIPTOMOEDAS'}
+
+    def setUp(self):
+        cache.clear()
+        self.preco = 10.0
+        self.liberar = threading.Event()
+        self.liberar.set()
+        self.buscar = mock.Mock(side_effect=self.responder)
+        for patcher in [
+            mock.patch.dict(cotacoes.FONTES, {'brapi': self.buscar}),
+            mock.patch.dict(cotacoes._estatisticas, {'hit': 0, 'stale': 0, 'miss': 0}),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.inicio = time.time()
+
+    def responder(self, tickers):
+        self.liberar.wait(5)
+        return {t: {'symbol': t, 'regularMarketPrice': self.preco} for t in tickers}
+
+    def aos(self, segundos):
+        return mock.patch('time.time', return_value=self.inicio + segundos)
+
+    def obter(self):
+        return cotacoes.obter_cotacoes(list(self.TIPOS), tipos=self.TIPOS)
+
+    def aguardar_revalidacao(self, *tickers):
+        limite = time.monotonic() + 5
+        while any(travas.ativa(f"cotacao:brapi:{t}:atualizando") for t in tickers):
+            self.assertLess(time.monotonic(), limite, 'revalidação não terminou')
+            time.sleep(0.01)
+
+    def precos(self, resultado):
+        return {t: dados['regularMarketPrice'] for t, dados in resultado.items()}
+
+    def test_ttl_por_tipo_de_ativo(self):
+        with self.aos(0):
+            self.obter()
+        self.assertEqual(cotacoes.estatisticas_cache(), {'hit': 0, 'stale': 0, 'miss': 3})
+
+        # 45 s: só a cripto (30 s) venceu
+        with self.aos(45):
+            self.obter()
+            self.aguardar_revalidacao('BTC')
+        self.assertEqual(self.buscar.call_args.args[0], ['BTC'])
+        self.assertEqual(cotacoes.estatisticas_cache(), {'hit': 2, 'stale': 1, 'miss': 3})
+
+        # 61 s: a ação (60 s) venceu; o fundo (1 h) e a cripto revalidada seguem frescos
+        with self.aos(61):
+            self.obter()
+            self.aguardar_revalidacao('PETR4')
+        self.assertEqual(self.buscar.call_args.args[0], ['PETR4'])
+        self.assertEqual(self.buscar.call_count, 3)
+        self.assertEqual(cotacoes.estatisticas_cache(), {'hit': 4, 'stale': 2, 'miss': 3})
+
+    def test_fresco_velho_e_ausente(self):
+        with self.aos(0):
+            self.assertEqual(self.precos(self.obter()), {'PETR4': 10.0, 'MXRF11': 10.0, 'BTC': 10.0})
+
+        self.preco = 11.0
+        with self.aos(10):
+            # Fresco: não vai à fonte
+            self.assertEqual(self.precos(self.obter()), {'PETR4': 10.0, 'MXRF11': 10.0, 'BTC': 10.0})
+            self.assertEqual(self.buscar.call_count, 1)
+
+        with self.aos(3601):
+            # Velho: devolve o valor anterior e revalida em segundo plano
+            self.assertEqual(self.precos(self.obter()), {'PETR4': 10.0, 'MXRF11': 10.0, 'BTC': 10.0})
+            self.aguardar_revalidacao(*self.TIPOS)
+            self.assertEqual(self.precos(self.obter()), {'PETR4': 11.0, 'MXRF11': 11.0, 'BTC': 11.0})
+
+        self.assertEqual(self.buscar.call_count, 2)
+        self.assertEqual(cotacoes.estatisticas_cache(), {'hit': 6, 'stale': 3, 'miss': 3})
+
+    def test_uma_revalidacao_por_chave_velha(self):
+        with self.aos(0):
+            self.obter()
+
+        self.liberar.clear()
+        with self.aos(61):
+            # Enquanto a revalidação está presa na fonte, as próximas só servem o velho
+            for _ in range(3):
+                self.assertEqual(self.precos(self.obter())['PETR4'], 10.0)
+            # Uma busca só, com as duas chaves velhas (ação e cripto)
+            self.assertEqual(self.buscar.call_count, 2)
+            self.assertEqual(self.buscar.call_args.args[0], ['PETR4', 'BTC'])
+
+            self.liberar.set()
+            self.aguardar_revalidacao('PETR4', 'BTC')
+
+        self.assertEqual(self.buscar.call_count, 2)
+        self.assertEqual(cotacoes.estatisticas_cache(), {'hit': 3, 'stale': 6, 'miss': 3})
+
+
+class BuscarCotacoesBrapiTest(SimpleTestCase):
+    def test_lotes_de_no_maximo_20_mapeados_por_simbolo(self):
+        tickers = [f'T{i:02d}3' for i in range(45)]
+
+        def responder(url, **kwargs):
+            lote = url.rsplit('/', 1)[-1].split(',')
+            # Fora de ordem, símbolo em minúsculas e um ticker sem cotação
+            resultados = [{'symbol': t.lower() if t == 'T203' else t, 'regularMarketPrice': float(t[1:3])}
+                          for t in reversed(lote) if t != 'T073']
+            return mock.Mock(ok=True, json=lambda: {'results': resultados})
+
+        with mock.patch.object(cotacoes.cliente_http, 'get', side_effect=responder) as get:
+            resultado = cotacoes.buscar_cotacoes_brapi(tickers + ['t003', ''])
+
+        lotes = [c.args[0].rsplit('/', 1)[-1].split(',') for c in get.call_args_list]
+        self.assertEqual([len(lote) for lote in lotes], [20, 20, 5])
+        self.assertEqual(sum(lotes, []), tickers)
+        self.assertEqual(sorted(resultado), sorted(set(tickers) - {'T073'}))
+        self.assertEqual(resultado['T203']['regularMarketPrice'], 20.0)
+        self.assertEqual(resultado['T443']['regularMarketPrice'], 44.0)
+
+
+class CotacaoAtualTest(TransactionTestCase):
+    # O comando chama close_old_connections: fora da transação do TestCase
+    def setUp(self):
+        cache.clear()
+        self.ana = User.objects.create_user('ana', password='senha')
+        self.bruno = User.objects.create_user('bruno', password='senha')
+        self.precos = {'PETR4': 37.5, 'VALE3': 61.2}
+        patcher = mock.patch.object(cotacoes, 'buscar_cotacoes_brapi', side_effect=self.brapi)
+        self.buscar = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def brapi(self, tickers):
+        return {
+            t: {'symbol': t, 'regularMarketPrice': self.precos[t], 'longName': f'{t} S.A.', 'logourl': ''}
+            for t in tickers if t in self.precos
+        }
+
+    def lancar(self, usuario, tipo, ticker, quantidade):
+        Lancamento.objects.create(
+            usuario=usuario, tipo_operacao=tipo, tipo_ativo='ACOES', ticker=ticker, nome_ativo=ticker or 'CDB',
+            data=date(2026, 1, 5), quantidade=Decimal(quantidade), preco=Decimal('10'), total=Decimal('10') * Decimal(quantidade),
+        )
+
+    def test_tickers_em_carteira_une_posicoes_positivas(self):
+        self.lancar(self.ana, 'COMPRA', 'PETR4', '100')
+        self.lancar(self.ana, 'VENDA', 'PETR4', '100')
+        self.lancar(self.ana, 'COMPRA', 'MGLU3', '50')
+        self.lancar(self.ana, 'VENDA', 'MGLU3', '50')
+        self.lancar(self.ana, 'COMPRA', 'VALE3', '10')
+        self.lancar(self.ana, 'COMPRA', '', '1')
+        # A posição zerada de Ana não tira o PETR4 de Bruno
+        self.lancar(self.bruno, 'COMPRA', 'petr4', '5')
+        self.lancar(self.bruno, 'COMPRA', 'ITUB4', '10')
+        self.lancar(self.bruno, 'VENDA', 'ITUB4', '10')
+
+        self.assertEqual(cotacoes.tickers_em_carteira(), ['PETR4', 'VALE3'])
+
+    def test_segunda_rodada_atualiza_no_lugar(self):
+        self.assertEqual(cotacoes.atualizar_cotacoes_atuais(['PETR4', 'VALE3']), 2)
+        primeira = CotacaoAtual.objects.get(ticker='VALE3').atualizado_em
+
+        self.precos = {'PETR4': 38.0}
+        self.assertEqual(cotacoes.atualizar_cotacoes_atuais(['PETR4', 'VALE3']), 1)
+
+        self.assertEqual(CotacaoAtual.objects.count(), 2)
+        self.assertEqual(CotacaoAtual.objects.get(ticker='PETR4').preco, Decimal('38.0'))
+        # Sem cotação nesta rodada: fica a linha anterior
+        self.assertEqual(CotacaoAtual.objects.get(ticker='VALE3').preco, Decimal('61.2'))
+        self.assertEqual(CotacaoAtual.objects.get(ticker='VALE3').atualizado_em, primeira)
+
+    def test_comando_uma_vez(self):
+        self.lancar(self.ana, 'COMPRA', 'PETR4', '100')
+        self.lancar(self.bruno, 'COMPRA', 'VALE3', '10')
+        self.lancar(self.bruno, 'COMPRA', 'XXXX3', '1')
+        saida = StringIO()
+
+        call_command('atualizar_cotacoes', '--uma-vez', '--tamanho-lote', '2', stdout=saida)
+
+        self.assertEqual(sorted(c.args[0] for c in self.buscar.call_args_list), [['PETR4', 'VALE3'], ['XXXX3']])
+        self.assertEqual(
+            dict(CotacaoAtual.objects.values_list('ticker', 'preco')),
+            {'PETR4': Decimal('37.5'), 'VALE3': Decimal('61.2')},
+        )
+        self.assertIn('2/3 cotação(ões) atualizada(s)', saida.getvalue())
+
+
+class BuscarCotacoesApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('investidor', password='senha'))
+        self.download = mock.patch('yfinance.download', side_effect=self.fechamentos).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def fechamentos(self, simbolos, **kwargs):
+        """DataFrame como o de yf.download(group_by='column'): XXXX3 sem preço."""
+        import pandas as pd
+
+        precos = {'PETR4.SA': [37.1, 37.456], 'VALE3.SA': [61.0, 60.5], 'XXXX3.SA': [np.nan, np.nan]}
+        colunas = pd.MultiIndex.from_product([['Close', 'Open'], simbolos])
+        return pd.DataFrame(
+            [[precos[s][i] for _ in range(2) for s in simbolos] for i in range(2)],
+            index=pd.to_datetime(['2026-10-14', '2026-10-15']), columns=colunas,
+        )
+
+    def test_lote_numa_chamada_com_erros_por_ticker(self):
+        response = self.client.get('/investments/api/buscar-cotacoes/', {'tickers': 'petr4, VALE3.SA,XXXX3,PETR4'})
+
+        self.assertEqual(response.status_code, 200)
+        dados = response.json()
+        self.assertEqual(self.download.call_count, 1)
+        self.assertEqual(self.download.call_args.args[0], ['PETR4.SA', 'VALE3.SA', 'XXXX3.SA'])
+        self.assertEqual(dados['cotacoes']['PETR4'], {'ticker': 'PETR4', 'nome': 'PETR4', 'preco': 37.46, 'moeda': 'BRL'})
+        self.assertEqual(dados['cotacoes']['VALE3']['preco'], 60.5)
+        self.assertEqual(dados['erros'], {'XXXX3': 'Dados não disponíveis'})
+
+    def test_limite_de_tickers(self):
+        tickers = ','.join(f'T{i:03d}3' for i in range(views.MAX_TICKERS_COTACAO + 1))
+
+        response = self.client.get('/investments/api/buscar-cotacoes/', {'tickers': tickers})
+
+        self.assertEqual(response.status_code, 400)
+        self.download.assert_not_called()
+        self.assertEqual(self.client.get('/investments/api/buscar-cotacoes/').status_code, 400)
+
+    def test_cotacao_unica_mantem_formato(self):
+        response = self.client.get('/investments/api/buscar-cotacao/', {'ticker': 'vale3.sa'})
+        self.assertEqual(response.json(), {'ticker': 'VALE3', 'nome': 'VALE3', 'preco': 60.5, 'moeda': 'BRL'})
+
+        response = self.client.get('/investments/api/buscar-cotacao/', {'ticker': 'XXXX3'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'erro': 'Dados não disponíveis', 'ticker': 'XXXX3.SA', 'preco': 0})
+
+
+class DisjuntorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.disjuntor = disjuntor.Disjuntor('teste', latencia_maxima=1)
+
+    def depois_de(self, segundos):
+        return mock.patch.object(disjuntor.time, 'time', return_value=time.time() + segundos)
+
+    def test_abre_com_erros_e_fecha_depois_das_sondas(self):
+        for _ in range(disjuntor.MIN_CHAMADAS):
+            self.assertTrue(self.disjuntor.permitir())
+            self.disjuntor.registrar(False, 0.1)
+
+        self.assertEqual(self.disjuntor.estado, disjuntor.ABERTO)
+        self.assertFalse(self.disjuntor.permitir())
+
+        with self.depois_de(disjuntor.TEMPO_ABERTO + 1):
+            self.assertTrue(self.disjuntor.permitir())
+            # Uma sonda por vez
+            self.assertFalse(self.disjuntor.permitir())
+            for _ in range(disjuntor.SONDAS_PARA_FECHAR):
+                self.disjuntor.registrar(True, 0.1)
+                self.disjuntor.permitir()
+
+        self.assertEqual(self.disjuntor.estado, disjuntor.FECHADO)
+
+    def test_chamada_lenta_conta_como_falha(self):
+        for _ in range(disjuntor.MIN_CHAMADAS):
+            self.disjuntor.registrar(True, 2.0)
+
+        self.assertEqual(self.disjuntor.situacao()['estado'], disjuntor.ABERTO)
+
+    def test_abertura_vale_para_outros_processos(self):
+        self.disjuntor._abrir(time.time())
+
+        outro_processo = disjuntor.Disjuntor('teste', latencia_maxima=1)
+        self.assertFalse(outro_processo.permitir())
+
+    def test_meio_aberto_uma_sonda_no_cluster(self):
+        self.disjuntor._abrir(time.time())
+        outro_processo = disjuntor.Disjuntor('teste', latencia_maxima=1)
+        terceiro = disjuntor.Disjuntor('teste', latencia_maxima=1)
+
+        with self.depois_de(disjuntor.TEMPO_ABERTO + 1):
+            self.assertTrue(outro_processo.permitir())
+            # A vaga da sonda é do outro processo: os demais continuam falhando rápido
+            self.assertFalse(self.disjuntor.permitir())
+            self.assertFalse(terceiro.permitir())
+            self.assertEqual(terceiro.situacao()['estado'], disjuntor.MEIO_ABERTO)
+
+            outro_processo.registrar(True, 0.1)
+            self.assertTrue(terceiro.permitir())
+            self.assertFalse(outro_processo.permitir())
+            terceiro.registrar(True, 0.1)
+
+            # Duas sondas boas (em processos diferentes) fecham para todos
+            self.assertTrue(self.disjuntor.permitir())
+            self.assertEqual(self.disjuntor.situacao()['estado'], disjuntor.FECHADO)
+
+    def test_sonda_que_falha_reabre_para_todos(self):
+        self.disjuntor._abrir(time.time())
+        outro_processo = disjuntor.Disjuntor('teste', latencia_maxima=1)
+
+        with self.depois_de(disjuntor.TEMPO_ABERTO + 1):
+            self.assertTrue(outro_processo.permitir())
+            outro_processo.registrar(False, 0.1)
+            self.assertFalse(self.disjuntor.permitir())
+            self.assertEqual(self.disjuntor.situacao()['estado'], disjuntor.ABERTO)
+
+    def test_brapi_aberta_serve_ultima_cotacao_sem_rede(self):
+        brapi = disjuntor.obter('brapi')
+        brapi._abrir(time.time())
+        self.addCleanup(setattr, brapi, 'estado', disjuntor.FECHADO)
+        CotacaoAtual.objects.create(ticker='ZZZZ3', preco=Decimal('12.34'), atualizado_em=timezone.now() - timedelta(days=2))
+
+        with mock.patch.object(cotacoes.cliente_http, 'sessao', side_effect=AssertionError('rede')):
+            resultado = cotacoes.obter_cotacoes(['ZZZZ3'])
+
+        self.assertEqual(resultado['ZZZZ3']['regularMarketPrice'], 12.34)
+        self.assertIsNone(cache.get(cotacoes._chave('brapi', 'ZZZZ3')))
+
+
+class DisjuntorProcessosTest(_CacheEmArquivo, TransactionTestCase):
+    def test_meio_aberto_uma_sonda_entre_processos(self):
+        disjuntor.Disjuntor('teste', latencia_maxima=1)._abrir(time.time())
+
+        with mock.patch.object(disjuntor.time, 'time', return_value=time.time() + disjuntor.TEMPO_ABERTO + 1):
+            permitidas = _em_processos(lambda: disjuntor.Disjuntor('teste', latencia_maxima=1).permitir())
+
+        self.assertEqual(sorted(permitidas), [False, False, False, True])
+        self.assertTrue(travas.ativa('disjuntor:teste:sonda'))
+
+
+class Investidor10ParserTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def html(self, nome):
+        return (TEST_DATA / 'investidor10' / f'{nome}.html').read_text(encoding='utf-8')
+
+    def test_le_cards_e_tabela_de_indicadores(self):
+        dados = investidor10.parsear_indicadores(self.html('petr4'))
+
+        self.assertEqual(dados, {'preco': 37.45, 'lpa': 8.27, 'pl': 4.53, 'roe': 24.71, 'dy': 14.38, 'vpa': 33.44})
+        self.assertTrue(investidor10.validar(dados))
+
+    def test_sem_dividendos_e_valores_negativos(self):
+        dados = investidor10.parsear_indicadores(self.html('mglu3'))
+
+        self.assertEqual(dados, {'preco': 9.12, 'lpa': -0.74, 'pl': -12.4, 'roe': -4.1, 'dy': 0.0, 'vpa': 1.63})
+        self.assertTrue(investidor10.validar(dados))
+
+    def test_numeros_no_formato_brasileiro(self):
+        self.assertEqual(investidor10._numero('R$ 1.234,56'), 1234.56)
+        self.assertEqual(investidor10._numero('-'), 0.0)
+        self.assertIsNone(investidor10._numero('1,2 Bi'))
+
+    def test_layout_alterado_cai_para_ia(self):
+        resposta = mock.Mock(status_code=200, text=self.html('layout_alterado'), headers={})
+        extraidos = {'ticker': 'VALE3', 'preco': 61.2, 'lpa': 9.0, 'pl': 6.8, 'roe': 20.0, 'dy': 8.0, 'vpa': 40.0}
+
+        with mock.patch.object(valuation_openai.cliente_http, 'get', return_value=resposta), \
+                mock.patch.object(valuation_openai, '_extrair_com_ia', return_value=extraidos) as ia, \
+                mock.patch.object(investidor10, 'contar') as contar:
+            dados = valuation_openai.extrair_dados_investidor10('VALE3')
+
+        self.assertFalse(investidor10.validar(investidor10.parsear_indicadores(resposta.text)))
+        ia.assert_called_once()
+        contar.assert_called_once_with('ia')
+        self.assertEqual(dados['preco'], 61.2)
+
+    def test_parser_dispensa_ia(self):
+        resposta = mock.Mock(status_code=200, text=self.html('petr4'), headers={})
+
+        with mock.patch.object(valuation_openai.cliente_http, 'get', return_value=resposta), \
+                mock.patch.object(valuation_openai, '_extrair_com_ia') as ia, \
+                mock.patch.object(investidor10, 'contar') as contar:
+            dados = valuation_openai.extrair_dados_investidor10('PETR4')
+
+        ia.assert_not_called()
+        contar.assert_called_once_with('parser')
+        self.assertEqual(dados['ticker'], 'PETR4')
+
+    def test_pagina_reaproveitada_por_intervalo_e_304(self):
+        pagina = mock.Mock(status_code=200, text=self.html('petr4'), headers={'ETag': '"v1"'})
+        nao_modificada = mock.Mock(status_code=304, text='', headers={})
+
+        with mock.patch.object(investidor10.cliente_http, 'get', side_effect=[pagina, nao_modificada]) as get:
+            self.assertEqual(investidor10.baixar_pagina('PETR4'), (200, pagina.text))
+            # Dentro do intervalo mínimo: nem pergunta ao site
+            self.assertEqual(investidor10.baixar_pagina('PETR4'), (200, pagina.text))
+            self.assertEqual(get.call_count, 1)
+
+            with mock.patch.object(investidor10.time, 'time', return_value=time.time() + investidor10.INTERVALO_MINIMO + 1):
+                self.assertEqual(investidor10.baixar_pagina('PETR4'), (200, pagina.text))
+
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(get.call_args.kwargs['headers']['If-None-Match'], '"v1"')
@@ -16,11 +16,23 @@ urlpatterns = [
     
     # APIs
     path('api/buscar-ativos/', views.buscar_ativos_api, name='buscar_ativos_api'),
+    path('api/universo-ativos/', views.universo_ativos_api, name='universo_ativos_api'),
     path('api/buscar-cotacao/', views.buscar_cotacao_api, name='buscar_cotacao_api'),
+    path('api/buscar-cotacoes/', views.buscar_cotacoes_api, name='buscar_cotacoes_api'),
     path('api/salvar-lancamentos/', views.salvar_lancamentos, name='salvar_lancamentos'),
+    path('api/cotacoes/estatisticas/', views.estatisticas_cotacoes_api, name='estatisticas_cotacoes_api'),
+    path('api/http/estatisticas/', views.estatisticas_http_api, name='estatisticas_http_api'),
+    path('api/status-provedores/', views.status_provedores_api, name='status_provedores_api'),
+    path('status-provedores/', views.status_provedores, name='status_provedores'),
     
     # VALUATION
     path('valuation/', views.valuation_page, name='valuation'),
     path('api/buscar-acoes-valuation/', views.buscar_acoes_valuation_api, name='buscar_acoes_valuation_api'),
     path('api/calcular-valuation/', views.calcular_valuation_api, name='calcular_valuation_api'),
+    path('api/calcular-valuation/stream/', views.calcular_valuation_stream_api, name='calcular_valuation_stream_api'),
+    path('api/valuation/estatisticas/', views.estatisticas_valuation_api, name='estatisticas_valuation_api'),
+    path('api/valuation/jobs/', views.enviar_valuation_api, name='enviar_valuation_api'),
+    path('api/valuation/jobs/<int:pk>/', views.valuation_job_api, name='valuation_job_api'),
+    path('api/valuation/jobs/estatisticas/', views.estatisticas_fila_valuation_api, name='estatisticas_fila_valuation_api'),
+    path('api/screener/', views.screener_api, name='screener_api'),
 ]
\ No newline at end of file
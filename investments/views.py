@@ -1,12 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseNotModified
 from .models import Aporte, Lancamento, PlanejamentoMensal
 from .forms import AporteForm
 from decimal import Decimal
 from django.views.decorators.http import require_http_methods
-import requests
+from investments.services import cliente_http
 
 
 @login_required
@@ -32,9 +33,12 @@ def adicionar_aporte(request):
     else:
         form = AporteForm()
     
+    from investments.services.universo import url_exportacao
+    
     return render(request, 'investments/adicionar.html', {
         'form': form,
-        'proximo_valor': proximo_valor
+        'proximo_valor': proximo_valor,
+        'universo_url': url_exportacao()
     })
 
 
@@ -110,82 +114,134 @@ def deletar_lancamento(request, pk):
 @login_required
 def buscar_ativos_api(request):
     """
-    Busca ativos APENAS na API brapi.dev (suporta Ações e FIIs)
-    Se API falhar, retorna vazio - sem fallback
+    Busca ativos (Ações e FIIs) no índice local do universo da brapi.dev
+    A lista completa é baixada uma vez por dia (services.universo); cada
+    tecla digitada é respondida da memória, sem ida à API.
     """
+    from investments.services import universo
+    
     query = request.GET.get('q', '').strip().upper()
     
     if len(query) < 2:
         return JsonResponse({'resultados': []})
     
-    try:
-        url = f"https://brapi.dev/api/quote/list?search={query}"
-        response = requests.get(url, timeout=3)
-        
-        if response.ok:
-            data = response.json()
-            stocks = data.get('stocks', [])
-            
-            resultados = []
-            for stock in stocks[:15]:
-                ticker = stock.get('stock', '')
-                nome = stock.get('name', ticker)
-                
-                # FIIs terminam em 11 (HGLG11, MXRF11)
-                # Ações terminam em 3, 4, 5, 6 (PETR3, VALE3)
-                tipo = 'fii' if ticker.endswith('11') else 'stock'
-                
-                resultados.append({
-                    'ticker': ticker,
-                    'nome': nome,
-                    'tipo': tipo
-                })
-            
-            return JsonResponse({'resultados': resultados})
+    resultados = [
+        {'ticker': ativo['ticker'], 'nome': ativo['nome'], 'tipo': ativo['tipo']}
+        for ativo in universo.buscar_ativos(query, limite=15)
+    ]
+    return JsonResponse({'resultados': resultados})
+
+
+@login_required
+def universo_ativos_api(request):
+    """
+    Exporta a lista completa de ativos para o filtro no navegador
+    O parâmetro ?v=<versao> só muda quando a lista muda, então a resposta
+    versionada pode ficar em cache no navegador por um dia.
+    """
+    from investments.services import universo
     
-    except Exception as e:
-        print(f"[ERRO] Busca API: {e}")
+    snapshot = universo.obter_snapshot()
+    if not snapshot:
+        return JsonResponse({'versao': None, 'ativos': []}, status=503)
+    
+    etag = f'"{snapshot["versao"]}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({
+            'versao': snapshot['versao'],
+            'ativos': [[a['ticker'], a['nome']] for a in snapshot['ativos']],
+        })
+    
+    response['ETag'] = etag
+    if request.GET.get('v') == snapshot['versao']:
+        response['Cache-Control'] = f'private, max-age={universo.VALIDADE}, immutable'
+    else:
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# Máximo de tickers por chamada de buscar_cotacoes_api
+MAX_TICKERS_COTACAO = 50
+
+
+def _cotacoes_yahoo(tickers):
+    """
+    Cotações de vários tickers numa só ida ao Yahoo (via cache compartilhado).
+    Retorna (cotacoes, erros): {TICKER: dados} e {TICKER: mensagem}.
+    """
+    from investments.services.cotacoes import obter_cotacoes
+    
+    encontradas = obter_cotacoes(tickers, fonte='yahoo')
+    
+    cotacoes, erros = {}, {}
+    for ticker in tickers:
+        cotacao = encontradas.get(ticker)
+        if cotacao:
+            cotacoes[ticker] = {
+                'ticker': ticker,
+                'nome': cotacao['nome'],
+                'preco': cotacao['preco'],
+                'moeda': 'BRL'
+            }
+        else:
+            erros[ticker] = 'Dados não disponíveis'
+    return cotacoes, erros
+
+
+@login_required
+def buscar_cotacoes_api(request):
+    """
+    Cotações de vários ativos de uma vez: ?tickers=PETR4,VALE3,HGLG11
+    
+    ENSINO: Por que não yf.Ticker(...).info?
+    - .info baixa o quoteSummary inteiro só para ler o preço, um ticker por vez
+    - yf.download traz o preço de todos os tickers numa única chamada
+    
+    Resposta: {'cotacoes': {TICKER: {...}}, 'erros': {TICKER: motivo}}
+    """
+    tickers = []
+    for ticker in request.GET.get('tickers', '').split(','):
+        ticker = ticker.strip().upper().replace('.SA', '')
+        if ticker and ticker not in tickers:
+            tickers.append(ticker)
     
-    # Se API falhar, retorna vazio
-    return JsonResponse({'resultados': []})
+    if not tickers:
+        return JsonResponse({'erro': 'Tickers não informados'}, status=400)
+    if len(tickers) > MAX_TICKERS_COTACAO:
+        return JsonResponse({'erro': f'Máximo de {MAX_TICKERS_COTACAO} tickers por chamada'}, status=400)
+    
+    try:
+        cotacoes, erros = _cotacoes_yahoo(tickers)
+        return JsonResponse({'cotacoes': cotacoes, 'erros': erros})
+    except Exception as e:
+        print(f"[ERRO] Buscar cotações: {e}")
+        return JsonResponse({'erro': str(e)}, status=500)
 
 
 @login_required
 def buscar_cotacao_api(request):
     """
-    Busca cotação via yfinance
+    Cotação de um único ativo (mesmo caminho de buscar_cotacoes_api)
     
-    ENSINO: Por que yfinance e não brapi.dev?
-    - yfinance é mais confiável para cotações em tempo real
-    - Suporta tanto ações quanto FIIs
-    - Fallback automático se cotação não disponível
+    A cotação passa pelo cache compartilhado (services.cotacoes), então
+    vários usuários consultando o mesmo ticker geram uma só chamada.
     """
-    import yfinance as yf
-    
-    ticker = request.GET.get('ticker', '').strip().upper()
+    ticker = request.GET.get('ticker', '').strip().upper().replace('.SA', '')
     
     if not ticker:
         return JsonResponse({'erro': 'Ticker não informado'}, status=400)
     
     try:
-        # Adicionar sufixo .SA se não tiver
-        if not ticker.endswith('.SA'):
-            ticker = f"{ticker}.SA"
-        
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        cotacoes, erros = _cotacoes_yahoo([ticker])
         
-        if 'currentPrice' in info:
-            return JsonResponse({
-                'ticker': ticker.replace('.SA', ''),
-                'nome': info.get('longName', ''),
-                'preco': float(info.get('currentPrice', 0) or info.get('regularMarketPrice', 0)),
-                'moeda': 'BRL'
-            })
+        if ticker in cotacoes:
+            return JsonResponse(cotacoes[ticker])
         else:
             return JsonResponse({
-                'erro': 'Dados não disponíveis',
-                'ticker': ticker,
+                'erro': erros[ticker],
+                'ticker': f"{ticker}.SA",
                 'preco': 0
             }, status=404)
             
@@ -194,6 +250,47 @@ def buscar_cotacao_api(request):
         return JsonResponse({'erro': str(e), 'preco': 0}, status=500)
 
 
+@staff_member_required
+def estatisticas_cotacoes_api(request):
+    """Contadores de hit/stale/miss do cache de cotações (deste worker)"""
+    from investments.services.cotacoes import estatisticas_cache
+    
+    return JsonResponse(estatisticas_cache())
+
+
+@staff_member_required
+def estatisticas_http_api(request):
+    """Métricas por host do cliente HTTP compartilhado (reuso de conexão, latência)"""
+    return JsonResponse(cliente_http.estatisticas())
+
+
+@staff_member_required
+def status_provedores(request):
+    """Página interna: estado do disjuntor, taxa de erro e latência de cada provedor externo"""
+    from investments.services import disjuntor
+    
+    return render(request, 'investments/status_provedores.html', {
+        'estados': disjuntor.estados(),
+        'janela': disjuntor.JANELA,
+    })
+
+
+@staff_member_required
+def status_provedores_api(request):
+    """Estado do disjuntor de cada provedor externo (mesmos dados da página de status)"""
+    from investments.services import disjuntor
+    
+    return JsonResponse(disjuntor.estados())
+
+
+@staff_member_required
+def estatisticas_valuation_api(request):
+    """Quantas extrações do Investidor10 o parser resolveu, quantas caíram na IA e quantas falharam"""
+    from investments.services.investidor10 import estatisticas
+    
+    return JsonResponse(estatisticas())
+
+
 @login_required
 def salvar_lancamentos(request):
     """Salva múltiplos lançamentos"""
@@ -252,41 +349,22 @@ def salvar_lancamentos(request):
 def buscar_acoes_valuation_api(request):
     """
     API para autocomplete na página de valuation
-    Busca APENAS na API - sem fallback
+    Responde do índice local do universo de ativos (apenas ações, sem FIIs)
     """
+    from investments.services import universo
+    
     query = request.GET.get('q', '').strip().upper()
     
     if len(query) < 1:
         return JsonResponse({'resultados': []})
     
-    try:
-        url = f"https://brapi.dev/api/quote/list?search={query}"
-        response = requests.get(url, timeout=3)
-        
-        if response.ok:
-            data = response.json()
-            stocks = data.get('stocks', [])
-            
-            resultados = []
-            for stock in stocks[:15]:
-                ticker = stock.get('stock', '')
-                nome = stock.get('name', ticker)
-                
-                # Para valuation, filtrar apenas ações (não FIIs)
-                if not ticker.endswith('11'):
-                    resultados.append({
-                        'ticker': ticker,
-                        'nome': nome,
-                        'label': f"{ticker} - {nome}"
-                    })
-            
-            return JsonResponse({'resultados': resultados})
-    
-    except Exception as e:
-        print(f"[ERRO] Busca valuation: {e}")
-    
-    # Se API falhar, retorna vazio
-    return JsonResponse({'resultados': []})
+    # Para valuation, filtrar apenas ações (não FIIs)
+    acoes = universo.buscar_ativos(query, limite=15, filtro=lambda a: not a['ticker'].endswith('11'))
+    resultados = [
+        {'ticker': a['ticker'], 'nome': a['nome'], 'label': f"{a['ticker']} - {a['nome']}"}
+        for a in acoes
+    ]
+    return JsonResponse({'resultados': resultados})
 
 
 @login_required
@@ -340,11 +418,118 @@ def calcular_valuation_api(request):
         }, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+def calcular_valuation_stream_api(request):
+    """
+    Valuation em streaming (Server-Sent Events)
+    Fundamentos e métodos chegam assim que a página do Investidor10 é lida;
+    análise IA e notícias vêm depois, em pedaços, conforme a OpenAI gera.
+    """
+    import json
+    from django.http import StreamingHttpResponse
+    from investments.services.valuation_openai import transmitir_valuation
+    
+    ticker = request.GET.get('ticker', '').strip().upper().replace('.SA', '')
+    
+    if not ticker:
+        return JsonResponse({'erro': 'Ticker não informado'}, status=400)
+    
+    def eventos():
+        try:
+            for evento, dados in transmitir_valuation(ticker):
+                yield f"event: {evento}\ndata: {json.dumps(dados)}\n\n"
+        except Exception as e:
+            print(f"[ERRO] Valuation streaming: {e}")
+            yield f"event: erro\ndata: {json.dumps({'erro': 'Erro ao calcular valuation'})}\n\n"
+    
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Sem buffer em proxy (nginx), senão os eventos chegam todos no fim
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def enviar_valuation_api(request):
+    """
+    Coloca o valuation na fila local e responde na hora com o id do job
+    (o cálculo roda no pool da fila, sem prender este worker).
+    A página consulta valuation_job_api até o status final.
+    """
+    from django.urls import reverse
+    from investments.services import fila_valuation
+    
+    ticker = request.POST.get('ticker', '').strip().upper().replace('.SA', '')
+    
+    if not ticker:
+        return JsonResponse({'erro': 'Ticker não informado'}, status=400)
+    
+    job = fila_valuation.enviar(request.user, ticker)
+    return JsonResponse({
+        'job_id': job.pk,
+        'status': job.status,
+        'url': reverse('valuation_job_api', args=[job.pk]),
+    }, status=202)
+
+
+@login_required
+@require_http_methods(["GET"])
+def valuation_job_api(request, pk):
+    """Andamento de um job de valuation do usuário (resultado parcial enquanto executa)"""
+    from .models import ValuationJob
+    from investments.services import fila_valuation
+    
+    job = get_object_or_404(ValuationJob, pk=pk, usuario=request.user)
+    return JsonResponse(fila_valuation.consultar(job))
+
+
+@login_required
+@require_http_methods(["GET"])
+def screener_api(request):
+    """
+    Ranking de ações por Bazin, Graham e Lynch sobre os fundamentos em cache
+    Filtros: recomendacao, dy_min, roe_min, pl_max, peg_max
+    Ordem: ordenar (pontos, margem_graham, -dy...) e limite
+    """
+    from investments.services import screener
+    
+    try:
+        filtros = {
+            nome: float(request.GET[nome].replace(',', '.'))
+            for nome in ('dy_min', 'roe_min', 'pl_max', 'peg_max')
+            if request.GET.get(nome)
+        }
+        limite = min(int(request.GET.get('limite') or screener.LIMITE_PADRAO), 500)
+        resultado = screener.ranking(
+            ordenar_por=request.GET.get('ordenar') or 'pontos',
+            limite=max(limite, 1),
+            recomendacao=request.GET.get('recomendacao'),
+            **filtros,
+        )
+    except ValueError as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+    
+    return JsonResponse(resultado)
+
+
+@staff_member_required
+def estatisticas_fila_valuation_api(request):
+    """Profundidade da fila de valuations e espera/duração dos últimos jobs"""
+    from investments.services.fila_valuation import estatisticas
+    
+    return JsonResponse(estatisticas())
+
+
 @login_required
 def valuation_page(request):
     """Página de análise de valuation"""
+    from investments.services.universo import url_exportacao
+    
     return render(request, 'investments/valuation.html', {
-        'page_title': 'Análise de Valuation'
+        'page_title': 'Análise de Valuation',
+        'universo_url': url_exportacao()
     })
 
 
@@ -366,6 +551,7 @@ def configurar_planejamento(request):
                 if planejamento:
                     # Atualizar existente
                     planejamento.valor_planejado = valor_decimal
+                    planejamento.redefinir_correcao()
                     planejamento.save()
                     messages.success(request, 'Planejamento atualizado com sucesso! ✅')
                 else:
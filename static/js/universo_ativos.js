@@ -0,0 +1,40 @@
+// Universo de ativos da B3 para o autocomplete
+// Baixa uma vez a lista versionada (/investments/api/universo-ativos/?v=...)
+// e filtra no navegador; enquanto não carregar, as páginas usam a API.
+const UniversoAtivos = {
+    ativos: null,
+
+    async carregar(url) {
+        if (!url) return;
+        try {
+            const response = await fetch(url, { credentials: 'same-origin' });
+            if (!response.ok) return;
+            const data = await response.json();
+            this.ativos = data.ativos.map(([ticker, nome]) => ({
+                ticker: ticker,
+                nome: nome,
+                tipo: ticker.endsWith('11') ? 'fii' : 'stock',
+                texto: this.normalizar(ticker + ' ' + nome)
+            }));
+        } catch (error) {
+            console.error('Erro ao carregar universo de ativos:', error);
+        }
+    },
+
+    normalizar(texto) {
+        return texto.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+    },
+
+    // Mesma ordem do servidor: prefixo de ticker primeiro, depois ticker/nome contendo a busca.
+    // Retorna null se a lista ainda não foi carregada.
+    buscar(query, limite = 15, filtro = null) {
+        if (!this.ativos) return null;
+        const prefixo = query.trim().toUpperCase();
+        const termo = this.normalizar(query.trim());
+        const aceitos = filtro ? this.ativos.filter(filtro) : this.ativos;
+
+        const porPrefixo = aceitos.filter(a => a.ticker.startsWith(prefixo));
+        const contendo = aceitos.filter(a => !a.ticker.startsWith(prefixo) && a.texto.includes(termo));
+        return porPrefixo.concat(contendo).slice(0, limite);
+    }
+};